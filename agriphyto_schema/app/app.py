@@ -3,20 +3,15 @@ import streamlit as st
 from agriphyto_schema.app.utils import (
     filter_dt_nomenclatures,
     filter_dt_variables,
-    load_dico,
-    load_nomenclature,
+    load_catalog,
+    paginate,
 )
 from agriphyto_schema.constants import (
-    AGRIPHYTO_DICO_NAME,
     COLNAME_CODE,
     COLNAME_LIBELLE,
     COLNAME_OUT_DB,
     COLNAME_OUT_NOMENCLATURE,
     COLNAME_OUT_TABLE,
-    COLNAME_TABLE,
-    COLNAME_VARIABLE,
-    DIR2DATA,
-    DIR2NOMENCLATURES,
 )
 
 
@@ -40,18 +35,19 @@ st.markdown(
 
 # text_search = st.text_input("Search", value="")
 
-dico = load_dico(DIR2DATA / f"{AGRIPHYTO_DICO_NAME}.csv")
-
-
-all_nomenclatures = load_nomenclature(
-    DIR2NOMENCLATURES / "all_nomenclatures.csv"
-)
+# shared by all the sessions, must not be modified
+catalog = load_catalog()
+dico = catalog.dico
 
 tab_variables, tab_nomenclatures = st.tabs(["Variables", "Nomenclatures"])
 
 with tab_variables:
     # Filtrage des données
-    filtered_dico = filter_dt_variables(dico)
+    filtered_rows = filter_dt_variables(dico, catalog.dico_search_index)
+    # only the displayed page is sent to the browser
+    page_dico, page_rows = paginate(
+        dico, filtered_rows, catalog.dico_ranks, key="variables"
+    )
 
     # Database output logic
     config = {
@@ -60,7 +56,7 @@ with tab_variables:
     }
     # Affichage du dataframe principal avec selection des événements
     event = st.dataframe(
-        filtered_dico,
+        page_dico,
         column_config=config,
         hide_index=True,
         on_select="rerun",
@@ -72,16 +68,17 @@ with tab_variables:
         selected_row_index = event.selection.rows[0]
 
         # Récupération des informations de la ligne sélectionnée
-        if selected_row_index < len(filtered_dico):
-            selected_row = filtered_dico.iloc[selected_row_index]
+        if selected_row_index < len(page_rows):
+            # position of the selected row in the dictionary
+            selected_row = dico.iloc[page_rows[selected_row_index]]
             db_name = selected_row.get(COLNAME_OUT_DB, "")
             clean_variable_name = selected_row.get(COLNAME_OUT_NOMENCLATURE, "")
             table_name = selected_row.get(COLNAME_OUT_TABLE, "")
-            selected_nomenclature = all_nomenclatures[
-                (all_nomenclatures[COLNAME_OUT_DB] == db_name)
-                & (all_nomenclatures[COLNAME_TABLE] == table_name)
-                & (all_nomenclatures[COLNAME_VARIABLE] == clean_variable_name)
-            ]
+            # slice of the modalities of the nomenclature, without scanning
+            # all the nomenclatures
+            selected_nomenclature = catalog.modalities(
+                db_name, table_name, clean_variable_name
+            )
             # Vérification si une nomenclature existe et n'est pas vide
             if (
                 clean_variable_name
@@ -105,21 +102,15 @@ with tab_variables:
     )
 
 with tab_nomenclatures:
-    all_nomenclatures_simple = all_nomenclatures.copy()
-    all_nomenclatures_simple[COLNAME_VARIABLE] = (
-        all_nomenclatures_simple[COLNAME_VARIABLE]
-        .astype(str)
-        .apply(lambda x: x.split("__")[-1])
+    # the variable names without their table are precomputed by create-dico
+    filtered_rows = filter_dt_nomenclatures(
+        catalog.nomenclatures_table, catalog.nomenclature_search_index
     )
-    filtered_nomenclatures = filter_dt_nomenclatures(
-        all_nomenclatures_simple[
-            [
-                COLNAME_TABLE,
-                COLNAME_VARIABLE,
-                COLNAME_LIBELLE,
-                COLNAME_CODE,
-            ]
-        ]
+    page_nomenclatures, _ = paginate(
+        catalog.nomenclatures_table,
+        filtered_rows,
+        catalog.nomenclatures_table_ranks,
+        key="nomenclatures",
     )
     config_nomenclatures_df = {
         "Preview": st.column_config.ImageColumn(),
@@ -127,7 +118,7 @@ with tab_nomenclatures:
     }
     # Affichage du dataframe principal avec selection des événements
     event_nomenclature = st.dataframe(
-        filtered_nomenclatures,
+        page_nomenclatures,
         column_config=config_nomenclatures_df,
         hide_index=True,
         on_select="rerun",
@@ -0,0 +1,153 @@
+"""
+Catalog of the data displayed by the application, shared by all the sessions.
+
+`st.cache_data` returns a new copy of the cached DataFrames (unpickled) at every
+call, so that each rerun of each session held its own copy of the data
+dictionary and of the nomenclatures (~1.2MB per rerun, measured with
+tracemalloc). A `Catalog` is loaded once per process with `st.cache_resource`
+and read by all the sessions without copies: it holds the tables and their
+indexes, and the filters of the application only compute positions of rows.
+
+The catalog is read-only: its tables must not be modified in place (with the
+copy-on-write of pandas, the frames derived from them never modify them).
+
+With the "sqlite" backend (see `agriphyto_schema.data.sqlite_catalog`), the
+tables are read from the SQLite catalog, and the search boxes and the lookups of
+the modalities are SQL queries on its indexes.
+
+The tables are displayed page by page: the catalog holds the rank of each row
+in the order of each column, so that the selected rows are sorted by sorting
+their integer ranks, and only the rows of the displayed page are sent to the
+browser.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agriphyto_schema.app.search_index import SearchIndex
+from agriphyto_schema.constants import (
+    APP_CATALOG_BACKEND,
+    CATALOG_BACKENDS,
+    COLNAME_CODE,
+    COLNAME_LIBELLE,
+    COLNAME_OUT_LIBELLE,
+    COLNAME_OUT_VARIABLE,
+    COLNAME_TABLE,
+    COLNAME_VARIABLE,
+    COLNAME_VARIABLE_NAME,
+)
+from agriphyto_schema.data.app_artifacts import (
+    NomenclatureIndex,
+    read_app_dico,
+    read_app_nomenclatures,
+)
+from agriphyto_schema.data.sqlite_catalog import (
+    SqliteCatalog,
+    path2sqlite_catalog,
+)
+
+
+def sort_ranks(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """
+    Return the rank of each row of a DataFrame in the ascending order of each of
+    its columns, the missing values last.
+    """
+    ranks = {}
+    for column in df.columns:
+        order = (
+            df[column]
+            .reset_index(drop=True)
+            .sort_values(kind="stable", na_position="last")
+            .index.to_numpy()
+        )
+        ranks[column] = np.empty(len(df), dtype=np.int64)
+        ranks[column][order] = np.arange(len(df))
+    return ranks
+
+
+def sort_rows(
+    rows: np.ndarray, ranks: np.ndarray, descending: bool = False
+) -> np.ndarray:
+    """
+    Sort positions of rows given the ranks of all the rows in the sort order,
+    see `sort_ranks`. The descending order is the reversed ascending order.
+    """
+    rows = rows[np.argsort(ranks[rows], kind="stable")]
+    return rows[::-1] if descending else rows
+
+
+def page_bounds(n_rows: int, page: int, page_size: int) -> tuple[int, int]:
+    """
+    Return the start and stop positions of the rows of a page, numbered from 1.
+    """
+    start = min((page - 1) * page_size, n_rows)
+    return start, min(start + page_size, n_rows)
+
+
+class Catalog:
+    """
+    Load the data dictionary and the nomenclatures of the application with
+    their indexes.
+
+    Parameters
+    ----------
+    dir2data : Path | None, optional
+        The directory of the application artifacts, by default DIR2DATA.
+    backend : str, optional
+        "parquet" to load the parquet artifacts and index them in memory, or
+        "sqlite" to query the SQLite catalog, by default APP_CATALOG_BACKEND.
+
+    Raises
+    ------
+    ValueError
+        If the backend is unknown.
+    """
+
+    def __init__(
+        self, dir2data: Path | None = None, backend: str = APP_CATALOG_BACKEND
+    ):
+        if backend not in CATALOG_BACKENDS:
+            msg = f"Unknown catalog backend {backend}, expected one of {CATALOG_BACKENDS}"
+            raise ValueError(msg)
+        self.backend = backend
+        if backend == "sqlite":
+            self.store = SqliteCatalog(path2sqlite_catalog(dir2data))
+            self.dico = self.store.variables()
+            self.nomenclatures = self.store.nomenclatures()
+            self.dico_search_index = self.store.variables_index
+            self.nomenclature_search_index = self.store.modalities_index
+        else:
+            self.store = None
+            self.dico = read_app_dico(dir2data)
+            self.nomenclatures = read_app_nomenclatures(dir2data=dir2data)
+            self.dico_search_index = SearchIndex(
+                self.dico, [COLNAME_OUT_LIBELLE, COLNAME_OUT_VARIABLE]
+            )
+            self.nomenclature_search_index = SearchIndex(
+                self.nomenclatures, [COLNAME_LIBELLE]
+            )
+            self.nomenclature_index = NomenclatureIndex(self.nomenclatures)
+        # nomenclatures tab: the variable names without their table
+        self.nomenclatures_table = self.nomenclatures[
+            [
+                COLNAME_TABLE,
+                COLNAME_VARIABLE_NAME,
+                COLNAME_LIBELLE,
+                COLNAME_CODE,
+            ]
+        ].rename(columns={COLNAME_VARIABLE_NAME: COLNAME_VARIABLE})
+        self.dico_ranks = sort_ranks(self.dico)
+        self.nomenclatures_table_ranks = sort_ranks(self.nomenclatures_table)
+
+    def modalities(
+        self, db_name: str, table_name: str, nomenclature: str
+    ) -> pd.DataFrame:
+        """
+        Return the modalities of a nomenclature, see `NomenclatureIndex.get` and
+        `SqliteCatalog.modalities`.
+        """
+        if self.store is not None:
+            return self.store.modalities(db_name, table_name, nomenclature)
+        return self.nomenclature_index.get(db_name, table_name, nomenclature)
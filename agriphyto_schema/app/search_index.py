@@ -0,0 +1,140 @@
+"""
+Trigram index of the text columns searched in the application.
+
+The search boxes of the application used to lowercase the searched columns and
+run a regex over all their rows on every rerun. A `SearchIndex` is built once
+when the data is loaded:
+
+- the searched values of each row are lowercased, stripped of their accents and
+  joined in a document delimited by SEARCH_SEPARATOR (`\\0label\\0variable\\0`),
+- each trigram of the documents is mapped to the sorted positions of the rows
+  containing it.
+
+A literal query is answered by intersecting the postings of its trigrams, then
+checking the few candidate rows for the whole substring. The anchors of a query
+(`^total`, `surface$`) are searched as the separator around the values, so
+that prefix and suffix queries also use the index. The other regular
+expressions are matched on the normalized values of every row (slower path).
+
+The search returns the positions of the matching rows: the searched DataFrame
+is never copied.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from agriphyto_schema.constants import SEARCH_SEPARATOR, SEARCH_TRIGRAM_SIZE
+from agriphyto_schema.utils import fold, literal_query
+
+
+def _trigrams(text: str) -> set[str]:
+    return {
+        text[i : i + SEARCH_TRIGRAM_SIZE]
+        for i in range(len(text) - SEARCH_TRIGRAM_SIZE + 1)
+    }
+
+
+class SearchIndex:
+    """
+    Trigram index of some text columns of a DataFrame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The searched DataFrame, the positions returned by `search` are the
+        positions of its rows.
+    columns : list[str]
+        The searched columns, a row matches if one of its values matches.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: list[str]):
+        self.columns = columns
+        self.n_rows = len(df)
+        # the missing values never match
+        self.values = {
+            column: pd.Series(
+                [
+                    fold(value) if isinstance(value, str) else ""
+                    for value in df[column]
+                ],
+                dtype="str",
+            )
+            for column in columns
+        }
+        self.documents = [
+            SEARCH_SEPARATOR + SEARCH_SEPARATOR.join(values) + SEARCH_SEPARATOR
+            for values in zip(*self.values.values(), strict=True)
+        ]
+        postings = {}
+        for row, document in enumerate(self.documents):
+            for trigram in _trigrams(document):
+                postings.setdefault(trigram, []).append(row)
+        self.postings = {
+            trigram: np.array(rows, dtype=np.int64)
+            for trigram, rows in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        Return the sorted positions of the rows matching a query, a substring or
+        a regular expression searched case and accent insensitively. An invalid
+        regular expression is searched as a substring.
+        """
+        query = query.strip()
+        if not query:
+            return np.arange(self.n_rows)
+        substring = literal_query(query)
+        if substring is not None:
+            return self.search_substring(substring)
+        pattern = fold(query)
+        try:
+            return self.search_regex(pattern)
+        except (re.error, ValueError):
+            # invalid regular expression
+            return self.search_substring(pattern)
+
+    def search_substring(self, substring: str) -> np.ndarray:
+        """
+        Return the positions of the rows whose document contains a normalized
+        substring, checking only the rows having all its trigrams.
+        """
+        trigrams = _trigrams(substring)
+        if len(trigrams) == 0:
+            candidates = np.arange(self.n_rows)
+        else:
+            # intersect the shortest postings first
+            postings = sorted(
+                (
+                    self.postings.get(trigram, np.array([], dtype=np.int64))
+                    for trigram in trigrams
+                ),
+                key=len,
+            )
+            candidates = postings[0]
+            for rows in postings[1:]:
+                if len(candidates) == 0:
+                    break
+                candidates = np.intersect1d(
+                    candidates, rows, assume_unique=True
+                )
+        is_match = np.fromiter(
+            (substring in self.documents[row] for row in candidates),
+            dtype=bool,
+            count=len(candidates),
+        )
+        return candidates[is_match]
+
+    def search_regex(self, pattern: str) -> np.ndarray:
+        """
+        Return the positions of the rows with a normalized value matching a
+        regular expression.
+        """
+        is_match = np.zeros(self.n_rows, dtype=bool)
+        for values in self.values.values():
+            is_match |= values.str.contains(pattern).to_numpy(dtype=bool)
+        return np.flatnonzero(is_match)
@@ -1,9 +1,14 @@
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from agriphyto_schema.app.catalog import Catalog, page_bounds, sort_rows
+from agriphyto_schema.app.search_index import SearchIndex
 from agriphyto_schema.constants import (
+    APP_DEFAULT_PAGE_SIZE,
+    APP_PAGE_SIZES,
     COLNAME_LIBELLE,
     COLNAME_OUT_DB,
     COLNAME_OUT_LIBELLE,
@@ -13,17 +18,22 @@ from agriphyto_schema.constants import (
 
 
 # credits: https://blog.streamlit.io/auto-generate-a-dataframe-filtering-ui-in-streamlit-with-filter_dataframe/
-def filter_dt_variables(df: pd.DataFrame) -> pd.DataFrame:
+def filter_dt_variables(
+    df: pd.DataFrame, search_index: SearchIndex | None = None
+) -> np.ndarray:
     """
     Adds a UI on top of a dataframe to let viewers filter columns
 
     Args:
         df (pd.DataFrame): Original dataframe
+        search_index (SearchIndex | None): Index of the label and variable
+            columns of df, built if not given
 
     Returns:
-        pd.DataFrame: Filtered dataframe
+        np.ndarray: Positions of the filtered rows of df
     """
-    df = df.copy()
+    # positions of the selected rows, df is never subset
+    rows = np.arange(len(df))
     modification_container = st.container()
 
     with modification_container:
@@ -31,58 +41,55 @@ def filter_dt_variables(df: pd.DataFrame) -> pd.DataFrame:
 
         # Filter in the label and variable columns using text
         user_text_input = right.text_input(
-            f"Match exact ou regex sur les colonnes {COLNAME_OUT_LIBELLE} ou {COLNAME_OUT_VARIABLE} (non sensible à la casse)",
+            f"Match exact ou regex sur les colonnes {COLNAME_OUT_LIBELLE} ou {COLNAME_OUT_VARIABLE} (non sensible à la casse ni aux accents)",
         )
         if user_text_input:
-            df = df[
-                (
-                    df[COLNAME_OUT_LIBELLE]
-                    .astype(str)
-                    .str.lower()
-                    .str.contains(user_text_input.strip())
+            if search_index is None:
+                search_index = SearchIndex(
+                    df, [COLNAME_OUT_LIBELLE, COLNAME_OUT_VARIABLE]
                 )
-                | (
-                    df[COLNAME_OUT_VARIABLE]
-                    .astype(str)
-                    .str.lower()
-                    .str.contains(user_text_input.strip())
-                )
-            ]
+            rows = search_index.search(user_text_input)
         # Optional filters
         modify = st.checkbox(
             "Ajout d'un filtre par table ou par base de données"
         )
         if modify:
             # Filter on database
-            db_choices = list(df[COLNAME_OUT_DB].unique())
+            db_names = df[COLNAME_OUT_DB].iloc[rows]
+            db_choices = list(db_names.unique())
             user_cat_input = right.multiselect(
                 f"Values for {COLNAME_OUT_DB}",
                 db_choices,
-                default=list(df[COLNAME_OUT_DB].unique()),
+                default=db_choices,
             )
-            df = df[df[COLNAME_OUT_DB].isin(user_cat_input)]
+            rows = rows[db_names.isin(user_cat_input).to_numpy()]
             # Filter on Table
+            table_names = df[COLNAME_OUT_TABLE].iloc[rows]
+            table_choices = list(table_names.unique())
             user_cat_input = right.multiselect(
                 f"Values for {COLNAME_OUT_TABLE}",
-                df[COLNAME_OUT_TABLE].unique(),
-                default=list(df[COLNAME_OUT_TABLE].unique()),
+                table_choices,
+                default=table_choices,
             )
-            df = df[df[COLNAME_OUT_TABLE].isin(user_cat_input)]
+            rows = rows[table_names.isin(user_cat_input).to_numpy()]
 
-    return df
+    return rows
 
 
-def filter_dt_nomenclatures(df: pd.DataFrame) -> pd.DataFrame:
+def filter_dt_nomenclatures(
+    df: pd.DataFrame, search_index: SearchIndex | None = None
+) -> np.ndarray:
     """
     Adds a UI on top of a dataframe to let viewers filter by regex on COLNAME_LIBELLE
 
     Args:
         df (pd.DataFrame): Original dataframe
+        search_index (SearchIndex | None): Index of the COLNAME_LIBELLE column
+            of df, built if not given
 
     Returns:
-        pd.DataFrame: Filtered dataframe
+        np.ndarray: Positions of the filtered rows of df
     """
-    df = df.copy()
     modification_container = st.container()
 
     with modification_container:
@@ -90,30 +97,71 @@ def filter_dt_nomenclatures(df: pd.DataFrame) -> pd.DataFrame:
 
         # Filter in the label and variable columns using text
         user_text_input = right.text_input(
-            f"Match exact ou regex sur la colonne {COLNAME_LIBELLE} (non sensible à la casse)",
+            f"Match exact ou regex sur la colonne {COLNAME_LIBELLE} (non sensible à la casse ni aux accents)",
         )
         if user_text_input:
-            df = df[
-                (
-                    df[COLNAME_LIBELLE]
-                    .astype(str)
-                    .str.lower()
-                    .str.contains(user_text_input.strip())
-                )
-            ]
-    return df
-
+            if search_index is None:
+                search_index = SearchIndex(df, [COLNAME_LIBELLE])
+            return search_index.search(user_text_input)
+    return np.arange(len(df))
+
+
+def paginate(
+    df: pd.DataFrame,
+    rows: np.ndarray,
+    ranks: dict[str, np.ndarray],
+    key: str,
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Adds a UI to sort the filtered rows of a dataframe and select a page
 
-# Loading fonctions with caching
-@st.cache_data  # allow caching (mainly useful for development)
-def load_dico(path2dico: str | Path):
-    return pd.read_csv(path2dico)
+    Only the rows of the page are sent to the browser, the sort is done on the
+    precomputed ranks of the rows (see `sort_ranks`).
 
+    Args:
+        df (pd.DataFrame): Original dataframe
+        rows (np.ndarray): Positions of the filtered rows of df
+        ranks (dict[str, np.ndarray]): Rank of each row of df in the order of
+            each column
+        key (str): Prefix of the keys of the widgets, unique per table
 
-@st.cache_data
-def load_nomenclature(
-    path2nomenclature: str | Path,
-) -> pd.DataFrame:
-    # Lecture du fichier CSV
-    df = pd.read_csv(path2nomenclature)
-    return df
+    Returns:
+        tuple[pd.DataFrame, np.ndarray]: Rows of the page and their positions
+            in df, the i-th selected row of the page is df.iloc[positions[i]]
+    """
+    sort_column, descending, page_size, page = st.columns((3, 2, 2, 2))
+    column = sort_column.selectbox(
+        "Trier par", [None, *ranks], key=f"{key}_sort_column"
+    )
+    is_descending = descending.toggle("Décroissant", key=f"{key}_descending")
+    size = page_size.selectbox(
+        "Lignes par page",
+        APP_PAGE_SIZES,
+        index=APP_PAGE_SIZES.index(APP_DEFAULT_PAGE_SIZE),
+        key=f"{key}_page_size",
+    )
+    n_pages = max(1, -(-len(rows) // size))
+    # the filters may have removed the page of the previous rerun
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    number = page.number_input(
+        f"Page (sur {n_pages})",
+        min_value=1,
+        max_value=n_pages,
+        step=1,
+        key=page_key,
+    )
+    if column is not None:
+        rows = sort_rows(rows, ranks[column], descending=is_descending)
+    start, stop = page_bounds(len(rows), number, size)
+    st.caption(f"Lignes {start + 1 if stop else 0} à {stop} sur {len(rows)}")
+    page_rows = rows[start:stop]
+    return df.iloc[page_rows], page_rows
+
+
+# Loading fonction with caching: the catalog is loaded once per process and
+# shared read-only by all the sessions, without copies
+@st.cache_resource
+def load_catalog(dir2data: Path | None = None) -> Catalog:
+    return Catalog(dir2data)
@@ -9,8 +9,41 @@ DIR2DATA = DIR2ROOT / "data"
 DIR2DICO = DIR2DATA / "raw"
 DIR2SCHEMA = DIR2DATA / "schemas"
 DIR2NOMENCLATURES = DIR2DATA / "nomenclatures"
+DIR2CACHE = DIR2DATA / "cache"
+DIR2SHEET_CACHE = DIR2CACHE / "sheets"
+DIR2VALIDATION_CACHE = DIR2CACHE / "validations"
 
-FILENAME_NOMENCLATURES = "all_nomenclatures.csv"
+FILENAME_MANIFEST = "build_manifest.json"
+# Compact bundle of all the schemas of DIR2SCHEMA, see `data/schema_bundle.py`
+FILENAME_SCHEMA_BUNDLE = "schema_bundle.bin"
+
+# Number of rows of a data file validated at once by `cli validate`
+VALIDATION_CHUNKSIZE = 100_000
+# Memory budget shared by the concurrent validations of `cli validate-batch`
+VALIDATION_MEMORY_BUDGET_MB = 4096
+# Size cap of the validation reports cache, the least recently used reports are
+# evicted beyond it
+VALIDATION_CACHE_SIZE_MB = 512
+# Number of failure cases of a validation sampled in its report
+FAILURE_EXAMPLES_SIZE = 1000
+# Number of schemas loaded from DIR2SCHEMA kept in memory by the schema registry
+SCHEMA_CACHE_SIZE = 128
+# Number of compiled schemas (with their nomenclature checks) kept in memory
+COMPILED_SCHEMA_CACHE_SIZE = 128
+# Largest range of integer codes checked with a lookup table rather than a hash
+CODE_LOOKUP_MAX_RANGE = 2**20
+# Longest code of a nomenclature checked on the data, longer "codes" are
+# free-text descriptions of the modalities
+NOMENCLATURE_CODE_MAX_LENGTH = 16
+# Memory used per cell of a validated chunk: parsed value, coerced copy and
+# check masks (measured ~60 bytes on a 100k rows x 174 columns csv chunk)
+VALIDATION_BYTES_PER_CELL = 64
+
+# Bump this version when a parser change should invalidate the build manifest
+PARSER_VERSION = 2
+# Bump this version when a change of the validation or of the pickled
+# ValidationReport should invalidate the cached validation reports
+VALIDATION_CACHE_VERSION = 1
 
 COLNAME_TABLE = "table"
 COLNAME_VARIABLE = "variable"
@@ -46,6 +79,9 @@ MAP_TYPES = {
 
 # Configurations for loaded dictionaries
 # TODO: document this better or put this into a documented config class
+# The optional "engine" key selects the spreadsheet reader of dico_from_excel:
+# "pandas" (default, pd.read_excel) or "ods_stream" (streaming .ods reader reading
+# only the cols_to_use columns, much faster on large .ods workbooks).
 AVAILABLE_DICOS = {
     # I replaced manually "IDENTIFICATIION" by "IDADMIN" in the nomenclature sheet to be consistent
     #  with the variable sheet
@@ -116,6 +152,7 @@ AVAILABLE_DICOS = {
             "NOMENCLATURE": COLNAME_NOMENCLATURE,
         },
         "parser": "dico_from_excel",
+        "engine": "ods_stream",
     },
     "PKfruits_2015": {
         "filename": "20210726_PKfruits2015_dico_variables.ods",
@@ -128,6 +165,7 @@ AVAILABLE_DICOS = {
             "VALEURS": COLNAME_NOMENCLATURE,
         },
         "parser": "dico_from_excel",
+        "engine": "ods_stream",
     },
     "PKLeg_2013": {
         "filename": "PKLEG13_DESC.ods",
@@ -141,6 +179,7 @@ AVAILABLE_DICOS = {
             "Filtre": COLNAME_NOMENCLATURE_2,
         },
         "parser": "dico_from_excel",
+        "engine": "ods_stream",
     },
     # I manually searched and replaced all ";" code-lable separators in the modalities column
     # with ":" to avoid confusion with the ";" used to separate modalities
@@ -161,6 +200,7 @@ AVAILABLE_DICOS = {
             "MODALITES": COLNAME_NOMENCLATURE,
         },
         "parser": "dico_from_excel",
+        "engine": "ods_stream",
     },
     # I manually searched and replaced all ";" code-lable separators in the modalities column
     # with ":" to avoid confusion with the ";" used to separate modalities
@@ -175,6 +215,7 @@ AVAILABLE_DICOS = {
             "NOMENCLATURE": COLNAME_NOMENCLATURE,
         },
         "parser": "dico_from_excel",
+        "engine": "ods_stream",
     },
     "Phytoleg_2018": {
         "filename": "20210930_DOC_BSVA_Dictionnaire_variables_Phytolégumes2018.ods",
@@ -190,6 +231,7 @@ AVAILABLE_DICOS = {
             "NOMENCLATURE": COLNAME_NOMENCLATURE,
         },
         "parser": "dico_from_excel",
+        "engine": "ods_stream",
     },
 }
 CASD_BOOL_MODALITIES = ['"0 - Non";"1 - Oui"', '"1 - Oui";"0 - Non"', "oui/non"]
@@ -211,3 +253,20 @@ COLNAMES_OUTPUT = [
 ]
 
 AGRIPHYTO_DICO_NAME = "agriphyto_data_dictionary"
+# Typed artifacts loaded by the streamlit application, see `data/app_artifacts.py`
+AGRIPHYTO_NOMENCLATURES_NAME = "agriphyto_nomenclatures"
+# Name of a variable without its table, precomputed in the nomenclatures artifact
+COLNAME_VARIABLE_NAME = "variable_name"
+# Number of rows sent to the browser per page of the application tables
+APP_PAGE_SIZES = [50, 100, 500, 1000]
+APP_DEFAULT_PAGE_SIZE = 100
+# Searched values of a row are joined in a document delimited by this separator
+# and indexed by trigrams, see `app/search_index.py`
+SEARCH_SEPARATOR = "\0"
+SEARCH_TRIGRAM_SIZE = 3
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+# Single-file SQLite catalog, see `data/sqlite_catalog.py`
+FILENAME_SQLITE_CATALOG = "agriphyto_catalog.sqlite"
+CATALOG_BACKENDS = ["parquet", "sqlite"]
+# Backend of the catalog loaded by the streamlit application
+APP_CATALOG_BACKEND = os.getenv("AGRIPHYTO_CATALOG_BACKEND", "parquet")
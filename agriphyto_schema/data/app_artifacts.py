@@ -0,0 +1,203 @@
+"""
+Typed parquet artifacts loaded by the streamlit application.
+
+The application used to parse the csv of the aggregated data dictionary and the
+nomenclature partitions, then derive the name of each nomenclature variable
+without its table with a python lambda per row, on every rerun. `create-dico`
+now also writes:
+
+- `agriphyto_data_dictionary.parquet`: the aggregated data dictionary,
+- `agriphyto_nomenclatures.parquet`: the nomenclatures of all the databases,
+  with the variable name without its table precomputed in COLNAME_VARIABLE_NAME.
+
+The repeated columns (database, table, type, variable) are stored as categorical
+columns. The artifacts are written from the csv outputs, so that they hold the
+same values as `pd.read_csv` of the dictionary and `read_nomenclatures`. The
+nomenclatures of some databases are read with a filter on the database column.
+
+The modalities of each nomenclature are contiguous in the nomenclatures
+artifact: a `NomenclatureIndex` maps each (database, table, nomenclature key)
+to its slice of rows, so that the modalities of the variable selected in the
+application are found without scanning all the nomenclatures.
+"""
+
+from logging import getLogger
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agriphyto_schema.constants import (
+    AGRIPHYTO_DICO_NAME,
+    AGRIPHYTO_NOMENCLATURES_NAME,
+    COLNAME_OUT_DB,
+    COLNAME_OUT_PANDERA_TYPE,
+    COLNAME_OUT_TABLE,
+    COLNAME_TABLE,
+    COLNAME_VARIABLE,
+    COLNAME_VARIABLE_NAME,
+    DIR2DATA,
+)
+from agriphyto_schema.data.nomenclature_store import read_nomenclatures
+
+logger = getLogger(__name__)
+
+DICO_CATEGORICAL_COLUMNS = [
+    COLNAME_OUT_DB,
+    COLNAME_OUT_TABLE,
+    COLNAME_OUT_PANDERA_TYPE,
+]
+NOMENCLATURE_KEY_COLUMNS = [COLNAME_OUT_DB, COLNAME_TABLE, COLNAME_VARIABLE]
+NOMENCLATURE_CATEGORICAL_COLUMNS = [
+    COLNAME_OUT_DB,
+    COLNAME_TABLE,
+    COLNAME_VARIABLE,
+    COLNAME_VARIABLE_NAME,
+]
+
+
+def path2app_dico(dir2data: Path | None = None) -> Path:
+    """Return the path of the data dictionary artifact."""
+    return (dir2data or DIR2DATA) / f"{AGRIPHYTO_DICO_NAME}.parquet"
+
+
+def path2app_nomenclatures(dir2data: Path | None = None) -> Path:
+    """Return the path of the nomenclatures artifact."""
+    return (dir2data or DIR2DATA) / f"{AGRIPHYTO_NOMENCLATURES_NAME}.parquet"
+
+
+def build_app_dico(dico: pd.DataFrame) -> pd.DataFrame:
+    """Encode the repeated columns of the data dictionary as categories."""
+    return dico.astype(dict.fromkeys(DICO_CATEGORICAL_COLUMNS, "category"))
+
+
+def build_app_nomenclatures(nomenclatures: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the variable name without its table (`<table>__<variable>`) to the
+    nomenclatures, make the modalities of each nomenclature contiguous (in the
+    order of their first row) and encode the repeated columns as categories.
+    """
+    groups = nomenclatures.groupby(
+        NOMENCLATURE_KEY_COLUMNS, sort=False, dropna=False
+    ).ngroup()
+    nomenclatures = nomenclatures.iloc[
+        np.argsort(groups.to_numpy(), kind="stable")
+    ].reset_index(drop=True)
+    nomenclatures = nomenclatures.assign(**{
+        COLNAME_VARIABLE_NAME: nomenclatures[COLNAME_VARIABLE]
+        .astype(str)
+        .str.split("__")
+        .str[-1]
+    })
+    return nomenclatures.astype(
+        dict.fromkeys(NOMENCLATURE_CATEGORICAL_COLUMNS, "category")
+    )
+
+
+def write_app_artifacts(dir2data: Path | None = None) -> None:
+    """
+    Write the parquet artifacts of the application from the aggregated data
+    dictionary csv and the nomenclature partitions of dir2data (DIR2DATA by
+    default).
+    """
+    dir2data = dir2data or DIR2DATA
+    dico = pd.read_csv(dir2data / f"{AGRIPHYTO_DICO_NAME}.csv")
+    build_app_dico(dico).to_parquet(path2app_dico(dir2data), index=False)
+    build_app_nomenclatures(
+        read_nomenclatures(dir2nomenclatures=dir2data / "nomenclatures")
+    ).to_parquet(path2app_nomenclatures(dir2data), index=False)
+    logger.info(f"Application artifacts saved to {dir2data}")
+
+
+def read_app_dico(dir2data: Path | None = None) -> pd.DataFrame:
+    """
+    Read the data dictionary artifact, or build it from the csv if it was not
+    written yet.
+    """
+    path2dico = path2app_dico(dir2data)
+    if path2dico.exists():
+        return pd.read_parquet(path2dico)
+    logger.warning(f"No {path2dico}, reading the data dictionary csv")
+    return build_app_dico(
+        pd.read_csv((dir2data or DIR2DATA) / f"{AGRIPHYTO_DICO_NAME}.csv")
+    )
+
+
+def read_app_nomenclatures(
+    db_names: list[str] | None = None, dir2data: Path | None = None
+) -> pd.DataFrame:
+    """
+    Read the nomenclatures artifact, only the rows of db_names if given (all by
+    default), or build it from the partitions if it was not written yet.
+    """
+    path2nomenclatures = path2app_nomenclatures(dir2data)
+    if not path2nomenclatures.exists():
+        logger.warning(
+            f"No {path2nomenclatures}, reading the nomenclature partitions"
+        )
+        return build_app_nomenclatures(
+            read_nomenclatures(
+                db_names, (dir2data or DIR2DATA) / "nomenclatures"
+            )
+        )
+    filters = (
+        [(COLNAME_OUT_DB, "in", db_names)] if db_names is not None else None
+    )
+    return pd.read_parquet(path2nomenclatures, filters=filters)
+
+
+class NomenclatureIndex:
+    """
+    Index the nomenclatures by (database, table, nomenclature key), the key
+    being `<table>__<variable>` as in the Nomenclature column of the data
+    dictionary.
+
+    Parameters
+    ----------
+    nomenclatures : pd.DataFrame
+        The nomenclatures, with the modalities of each nomenclature contiguous
+        as in the nomenclatures artifact.
+
+    Raises
+    ------
+    ValueError
+        If the modalities of a nomenclature are not contiguous.
+    """
+
+    def __init__(self, nomenclatures: pd.DataFrame):
+        self.nomenclatures = nomenclatures
+        keys = [
+            nomenclatures[column].to_numpy(dtype=object)
+            for column in NOMENCLATURE_KEY_COLUMNS
+        ]
+        # first row of each run of modalities with the same key
+        is_start = np.zeros(len(nomenclatures), dtype=bool)
+        is_start[:1] = True
+        for values in keys:
+            is_start[1:] |= values[1:] != values[:-1]
+        starts = np.flatnonzero(is_start)
+        stops = np.append(starts[1:], len(nomenclatures))
+        self.slices = {
+            key: (int(start), int(stop))
+            for key, start, stop in zip(
+                zip(*(values[starts] for values in keys), strict=True),
+                starts,
+                stops,
+                strict=True,
+            )
+        }
+        if len(self.slices) != len(starts):
+            msg = "The modalities of each nomenclature must be contiguous"
+            raise ValueError(msg)
+
+    def get(
+        self, db_name: str, table_name: str, nomenclature: str
+    ) -> pd.DataFrame:
+        """
+        Return the modalities of a nomenclature, a slice of the indexed
+        nomenclatures (empty if the nomenclature is unknown).
+        """
+        start, stop = self.slices.get(
+            (db_name, table_name, nomenclature), (0, 0)
+        )
+        return self.nomenclatures.iloc[start:stop]
@@ -0,0 +1,123 @@
+"""
+Build manifest recording the inputs of the last successful build of each data
+dictionary, so that `parse` and `create-dico` can skip the databases whose inputs
+did not change.
+
+The manifest is a json file in the data directory with two sections:
+- `parse`: for each database, the content hash of the raw dictionary, the hash of
+  its AVAILABLE_DICOS configuration, the parser version and the written schemas
+  (the nomenclature partition of the database must also be on disk),
+- `create_dico`: for each database, the hash of its pandera schema files.
+"""
+
+import hashlib
+import json
+import os
+from logging import getLogger
+from pathlib import Path
+
+from agriphyto_schema.constants import (
+    AVAILABLE_DICOS,
+    DIR2DATA,
+    DIR2DICO,
+    DIR2SCHEMA,
+    FILENAME_MANIFEST,
+    PARSER_VERSION,
+)
+from agriphyto_schema.data.nomenclature_store import path2partition
+from agriphyto_schema.utils import file_sha256
+
+logger = getLogger(__name__)
+
+
+def load_manifest(path2manifest: Path | None = None) -> dict:
+    path2manifest = path2manifest or DIR2DATA / FILENAME_MANIFEST
+    if not path2manifest.exists():
+        return {"parse": {}, "create_dico": {}}
+    with open(path2manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest.setdefault("parse", {})
+    manifest.setdefault("create_dico", {})
+    return manifest
+
+
+def save_manifest(manifest: dict, path2manifest: Path | None = None) -> None:
+    path2manifest = path2manifest or DIR2DATA / FILENAME_MANIFEST
+    # write in a temporary file first so that a crash never leaves a broken manifest
+    path2tmp = path2manifest.with_suffix(".json.tmp")
+    with open(path2tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False, sort_keys=True)
+    os.replace(path2tmp, path2manifest)
+
+
+def list_db_schemas(db_name: str) -> list[Path]:
+    """
+    List the pandera schema files of a database, sorted by name.
+    """
+    return sorted(DIR2SCHEMA.glob(f"{db_name}__*.json"))
+
+
+def dico_fingerprint(db_name: str) -> dict:
+    """
+    Fingerprint the inputs of the parser of a data dictionary.
+
+    Parameters
+    ----------
+    db_name : str
+        The name of the data dictionary (e.g. "RA_2020").
+
+    Returns
+    -------
+    dict
+        The content hash of the raw dictionary file, the hash of its
+        AVAILABLE_DICOS configuration and the parser version.
+    """
+    config = AVAILABLE_DICOS[db_name]
+    config_dump = json.dumps(config, sort_keys=True, ensure_ascii=False)
+    return {
+        "raw_sha256": file_sha256(DIR2DICO / config["filename"]),
+        "config_sha256": hashlib.sha256(config_dump.encode()).hexdigest(),
+        "parser_version": PARSER_VERSION,
+    }
+
+
+def is_dico_up_to_date(
+    db_name: str, manifest: dict, fingerprint: dict | None = None
+) -> bool:
+    """
+    Check if the schemas of a data dictionary were built from the current inputs
+    and are still on disk, as well as its nomenclature partition.
+    """
+    entry = manifest["parse"].get(db_name)
+    if entry is None:
+        return False
+    fingerprint = fingerprint or dico_fingerprint(db_name)
+    if any(entry.get(key) != value for key, value in fingerprint.items()):
+        return False
+    schemas = entry.get("schemas", [])
+    return (
+        len(schemas) > 0
+        and all((DIR2SCHEMA / schema).exists() for schema in schemas)
+        and path2partition(db_name).exists()
+    )
+
+
+def record_dico(db_name: str, manifest: dict, fingerprint: dict) -> None:
+    """
+    Record a successful parse of a data dictionary in the manifest.
+    """
+    manifest["parse"][db_name] = {
+        **fingerprint,
+        "schemas": [path.name for path in list_db_schemas(db_name)],
+    }
+
+
+def schemas_fingerprint(schema_paths: list[Path]) -> str:
+    """
+    Hash the names and contents of a list of schema files.
+    """
+    digest = hashlib.sha256()
+    for schema_path in sorted(schema_paths):
+        digest.update(schema_path.name.encode())
+        digest.update(file_sha256(schema_path).encode())
+    return digest.hexdigest()
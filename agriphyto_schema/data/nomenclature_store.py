@@ -0,0 +1,183 @@
+"""
+Partitioned store of the nomenclatures extracted from the data dictionaries.
+
+The nomenclatures of each database are stored in their own csv partition,
+`agriphyto_schema/data/nomenclatures/<db_name>.csv`, so that re-parsing a
+dictionary only rewrites the partition of its database.
+
+The parsers do not write their partition variable by variable: they append their
+modalities to a `NomenclatureSink` which writes all the nomenclatures of the
+database at once, atomically, when the parse succeeds. The partitions are read
+back with `read_nomenclatures`.
+"""
+
+import os
+from collections.abc import Iterator
+from logging import getLogger
+from pathlib import Path
+
+import pandas as pd
+
+from agriphyto_schema.constants import (
+    COLNAME_CODE,
+    COLNAME_LIBELLE,
+    COLNAME_OUT_DB,
+    COLNAME_TABLE,
+    COLNAME_VARIABLE,
+    DIR2NOMENCLATURES,
+)
+
+logger = getLogger(__name__)
+
+NOMENCLATURE_COLUMNS = [
+    COLNAME_OUT_DB,
+    COLNAME_TABLE,
+    COLNAME_VARIABLE,
+    COLNAME_CODE,
+    COLNAME_LIBELLE,
+]
+
+
+def read_nomenclature_csv(path2nomenclatures: Path) -> pd.DataFrame:
+    """
+    Read a nomenclature csv, keeping all the values as strings so that codes such
+    as "02" or "NA" are kept verbatim.
+    """
+    return pd.read_csv(path2nomenclatures, dtype=str, keep_default_na=False)
+
+
+def path2partition(db_name: str, dir2nomenclatures: Path | None = None) -> Path:
+    """Return the path of the nomenclature partition of a database."""
+    return (dir2nomenclatures or DIR2NOMENCLATURES) / f"{db_name}.csv"
+
+
+def list_partitions(dir2nomenclatures: Path | None = None) -> list[str]:
+    """Return the sorted names of the databases having a nomenclature partition."""
+    return sorted(
+        path.stem
+        for path in (dir2nomenclatures or DIR2NOMENCLATURES).glob("*.csv")
+    )
+
+
+def iter_nomenclatures(
+    db_names: list[str] | None = None, dir2nomenclatures: Path | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the nomenclature partitions one by one.
+
+    Parameters
+    ----------
+    db_names : list[str] | None, optional
+        The databases to read, by default all the databases having a partition.
+        Databases without partition (no nomenclature) are skipped.
+    dir2nomenclatures : Path | None, optional
+        The directory of the partitions, by default
+        agriphyto_schema/data/nomenclatures/.
+
+    Yields
+    ------
+    pd.DataFrame
+        The nomenclatures of each database, in the order of db_names.
+    """
+    if db_names is None:
+        db_names = list_partitions(dir2nomenclatures)
+    for db_name in db_names:
+        path2nomenclatures = path2partition(db_name, dir2nomenclatures)
+        if path2nomenclatures.exists():
+            yield read_nomenclature_csv(path2nomenclatures)
+
+
+def read_nomenclatures(
+    db_names: list[str] | None = None, dir2nomenclatures: Path | None = None
+) -> pd.DataFrame:
+    """
+    Concatenate the nomenclature partitions of several databases, see
+    `iter_nomenclatures`.
+    """
+    nomenclatures = list(iter_nomenclatures(db_names, dir2nomenclatures))
+    if len(nomenclatures) == 0:
+        return pd.DataFrame(columns=NOMENCLATURE_COLUMNS, dtype=str)
+    return pd.concat(nomenclatures, ignore_index=True)
+
+
+class NomenclatureSink:
+    """
+    Buffer the nomenclatures of one database and write its partition in one go.
+
+    The modalities appended to the sink are kept in memory until `commit`, which
+    writes them to a temporary file renamed over the partition of the database.
+    Used as a context manager, the sink commits on success and leaves the
+    partition untouched if the parse fails.
+
+    Parameters
+    ----------
+    db_name : str
+        The name of the data dictionary whose nomenclatures are written.
+    dir2nomenclatures : Path | None, optional
+        The directory of the partitions, by default
+        agriphyto_schema/data/nomenclatures/.
+    """
+
+    def __init__(self, db_name: str, dir2nomenclatures: Path | None = None):
+        self.db_name = db_name
+        self.path2nomenclatures = path2partition(db_name, dir2nomenclatures)
+        self._frames: list[pd.DataFrame] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.commit()
+        else:
+            self._frames = []
+
+    def append(
+        self,
+        modalities_df: pd.DataFrame,
+        table_name: str | list[str],
+        var_names: str | list[str],
+    ) -> None:
+        """
+        Buffer the modalities of one or several variables of a table.
+
+        Parameters
+        ----------
+        modalities_df : pd.DataFrame
+            The modalities, with the code and label columns.
+        table_name : str | list[str]
+            The table of the modalities, one per row or one for all the rows.
+        var_names : str | list[str]
+            The clean variable name of the modalities, one per row or one for all
+            the rows.
+        """
+        if len(modalities_df) == 0:
+            return
+        self._frames.append(
+            pd.DataFrame({
+                COLNAME_OUT_DB: self.db_name,
+                COLNAME_TABLE: table_name,
+                COLNAME_VARIABLE: var_names,
+                COLNAME_CODE: modalities_df[COLNAME_CODE].to_numpy(),
+                COLNAME_LIBELLE: modalities_df[COLNAME_LIBELLE].to_numpy(),
+            })
+        )
+
+    def commit(self) -> None:
+        """
+        Replace the partition of the database by the buffered nomenclatures. The
+        partition is removed if no modality was buffered.
+        """
+        if len(self._frames) == 0:
+            self.path2nomenclatures.unlink(missing_ok=True)
+            return
+        nomenclatures = pd.concat(self._frames, ignore_index=True)
+        path2tmp = self.path2nomenclatures.with_suffix(".csv.tmp")
+        self.path2nomenclatures.parent.mkdir(parents=True, exist_ok=True)
+        nomenclatures.to_csv(path2tmp, index=False)
+        os.replace(path2tmp, self.path2nomenclatures)
+        logger.info(
+            f"Saved {len(nomenclatures)} modalities of {self.db_name} at "
+            f"{self.path2nomenclatures}"
+        )
+        self._frames = []
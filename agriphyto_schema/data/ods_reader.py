@@ -0,0 +1,263 @@
+"""
+Streaming reader for the sheets of OpenDocument spreadsheets (.ods).
+
+`pd.read_excel` with odfpy builds the DOM of the whole `content.xml` of the
+workbook before reading a single sheet. This reader streams `content.xml` with
+`xml.etree.ElementTree.iterparse` instead: only the rows of the requested sheets
+are decoded, only the requested columns are kept and the repeated cells/rows
+(`number-columns-repeated`, `number-rows-repeated`) are expanded lazily. Each row
+is dropped from memory once read.
+
+The cell decoding and the table layout follow `pandas.io.excel._odfreader` and the
+rows are finally parsed by the same `TextParser` as `pd.read_excel`, so that the
+resulting DataFrames are identical to the ones returned by the odf engine.
+"""
+
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+TABLE_NS = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+OFFICE_NS = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+TEXT_NS = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+TAG_TABLE = f"{{{TABLE_NS}}}table"
+TAG_ROW = f"{{{TABLE_NS}}}table-row"
+TAG_CELL = f"{{{TABLE_NS}}}table-cell"
+TAG_COVERED_CELL = f"{{{TABLE_NS}}}covered-table-cell"
+TAG_TEXT_S = f"{{{TEXT_NS}}}s"
+TAG_ANNOTATION = f"{{{OFFICE_NS}}}annotation"
+ATTR_TABLE_NAME = f"{{{TABLE_NS}}}name"
+ATTR_ROWS_REPEATED = f"{{{TABLE_NS}}}number-rows-repeated"
+ATTR_COLUMNS_REPEATED = f"{{{TABLE_NS}}}number-columns-repeated"
+ATTR_VALUE_TYPE = f"{{{OFFICE_NS}}}value-type"
+ATTR_VALUE = f"{{{OFFICE_NS}}}value"
+ATTR_DATE_VALUE = f"{{{OFFICE_NS}}}date-value"
+ATTR_SPACES = f"{{{TEXT_NS}}}c"
+
+EMPTY_VALUE = ""
+
+
+def _cell_string_value(elem: ET.Element) -> str:
+    """Decode the text of a cell, including the run length encoded spaces."""
+    value = []
+    if elem.text:
+        value.append(elem.text.strip("\n"))
+    for fragment in elem:
+        if fragment.tag == TAG_TEXT_S:
+            value.append(" " * int(fragment.get(ATTR_SPACES, 1)))
+        elif fragment.tag != TAG_ANNOTATION:
+            value.append(_cell_string_value(fragment))
+        if fragment.tail:
+            value.append(fragment.tail.strip("\n"))
+    return "".join(value)
+
+
+def _cell_value(cell: ET.Element):  # noqa: C901
+    """Decode the value of a cell as `pandas.io.excel._odfreader` does."""
+    if cell.tag == TAG_COVERED_CELL:
+        return EMPTY_VALUE
+    cell_type = cell.get(ATTR_VALUE_TYPE)
+    if cell_type is None:
+        # a cell without value type can only hold an error such as #N/A
+        return np.nan if "".join(cell.itertext()) == "#N/A" else EMPTY_VALUE
+    cell_text = "".join(cell.itertext())
+    if cell_text == "#N/A":
+        return np.nan
+    if cell_type == "boolean":
+        return cell_text == "TRUE"
+    elif cell_type == "float":
+        cell_value = float(cell.get(ATTR_VALUE))
+        val = int(cell_value)
+        if val == cell_value:
+            return val
+        return cell_value
+    elif cell_type in ("percentage", "currency"):
+        return float(cell.get(ATTR_VALUE))
+    elif cell_type == "string":
+        return _cell_string_value(cell)
+    elif cell_type == "date":
+        return pd.Timestamp(cell.get(ATTR_DATE_VALUE))
+    elif cell_type == "time":
+        return pd.Timestamp(cell_text).time()
+    msg = f"Unrecognized type {cell_type}"
+    raise ValueError(msg)
+
+
+class _SheetRequest:
+    """Accumulate the rows of one sheet, projected on the requested columns."""
+
+    def __init__(self, skiprows: int, usecols: list[str] | None):
+        self.skiprows = skiprows
+        self.usecols = usecols
+        # index in the sheet of the next row
+        self.n_rows = 0
+        # empty rows are only added to the table if a non empty row follows them
+        self.empty_rows = 0
+        self.max_row_len = 0
+        # index of the kept columns in the sheet -> position in the output row
+        self.positions: dict[int, int] | None = None
+        # rows of the sheet from the header row onwards
+        self.table: list[list] = []
+
+    def add_row(self, cells: list[ET.Element], row_repeat: int) -> None:
+        self.n_rows += row_repeat
+        n_kept_rows = min(row_repeat, self.n_rows - self.skiprows)
+        if n_kept_rows <= 0 and self.usecols is not None:
+            # the rows before the header only matter for the table width when
+            # all the columns are read
+            return
+        if self.usecols is not None and self.positions is None:
+            # the header row: project the next rows on the requested columns
+            header = self._read_row(cells)
+            self.positions = {}
+            for i, name in enumerate(header):
+                if name in self.usecols and name not in header[:i]:
+                    self.positions[i] = len(self.positions)
+        table_row = self._read_row(cells)
+        self.max_row_len = max(self.max_row_len, len(table_row))
+        if n_kept_rows <= 0:
+            return
+        if len(table_row) == 0:
+            self.empty_rows += n_kept_rows
+        else:
+            self.table.extend([[EMPTY_VALUE]] * self.empty_rows)
+            self.empty_rows = 0
+            self.table.extend(list(table_row) for _ in range(n_kept_rows))
+
+    def _read_row(self, cells: list[ET.Element]) -> list:
+        """
+        Read a row, keeping only the requested columns once they are known.
+
+        The returned row is empty if all the cells of the row are empty.
+        """
+        positions = self.positions
+        table_row: list = []
+        has_content = False
+        empty_cells = 0
+        col = 0
+        for cell in cells:
+            column_repeat = int(cell.get(ATTR_COLUMNS_REPEATED, 1))
+            if positions is None:
+                value = _cell_value(cell)
+                # queue up empty values, writing only if content succeeds them
+                if value == EMPTY_VALUE:
+                    empty_cells += column_repeat
+                else:
+                    table_row.extend([EMPTY_VALUE] * empty_cells)
+                    empty_cells = 0
+                    table_row.extend([value] * column_repeat)
+            else:
+                kept = [
+                    position
+                    for i, position in positions.items()
+                    if col <= i < col + column_repeat
+                ]
+                if kept or not has_content:
+                    value = _cell_value(cell)
+                    if value != EMPTY_VALUE:
+                        if not has_content:
+                            table_row = [EMPTY_VALUE] * len(positions)
+                            has_content = True
+                        for position in kept:
+                            table_row[position] = value
+            col += column_repeat
+        return table_row
+
+    def to_frame(self) -> pd.DataFrame:
+        width = (
+            len(self.positions)
+            if self.positions is not None
+            else self.max_row_len
+        )
+        # make the table square
+        for row in self.table:
+            if len(row) < width:
+                row.extend([EMPTY_VALUE] * (width - len(row)))
+        if len(self.table) == 0:
+            return pd.DataFrame()
+        parser = TextParser(self.table, header=0, skip_blank_lines=False)
+        return parser.read()
+
+
+def read_ods_sheets(  # noqa: C901
+    path2ods: str | Path,
+    sheets: list[tuple[str, int, list[str] | None]],
+) -> list[pd.DataFrame]:
+    """
+    Read several sheets of an .ods file in one streaming pass over its content.
+
+    Parameters
+    ----------
+    path2ods : str | Path
+        The path to the .ods file.
+    sheets : list[tuple[str, int, list[str] | None]]
+        One (sheet_name, skiprows, usecols) triplet per requested sheet. skiprows
+        is the number of rows to skip before the header row and usecols the names
+        of the header columns to keep (all columns if None).
+
+    Returns
+    -------
+    list[pd.DataFrame]
+        One DataFrame per requested sheet, in the same order.
+    """
+    requests_by_sheet: dict[str, list[_SheetRequest]] = {}
+    requests = []
+    for sheet_name, skiprows, usecols in sheets:
+        request = _SheetRequest(skiprows, usecols)
+        requests_by_sheet.setdefault(sheet_name, []).append(request)
+        requests.append(request)
+    found_sheets = set()
+
+    with (
+        zipfile.ZipFile(path2ods) as archive,
+        archive.open("content.xml") as content,
+    ):
+        current_requests = None
+        # the parsed files are the raw data dictionaries shipped in DIR2DICO
+        events = ET.iterparse(content, events=("start", "end"))  # noqa: S314
+        for event, elem in events:
+            if elem.tag == TAG_TABLE:
+                if event == "start":
+                    sheet_name = elem.get(ATTR_TABLE_NAME)
+                    current_requests = requests_by_sheet.get(sheet_name)
+                    if current_requests is not None:
+                        found_sheets.add(sheet_name)
+                else:
+                    current_requests = None
+                    elem.clear()
+                    if found_sheets == set(requests_by_sheet):
+                        break
+            elif event == "end" and elem.tag == TAG_ROW:
+                if current_requests is not None:
+                    cells = [
+                        cell
+                        for cell in elem
+                        if cell.tag in (TAG_CELL, TAG_COVERED_CELL)
+                    ]
+                    row_repeat = int(elem.get(ATTR_ROWS_REPEATED, 1))
+                    for request in current_requests:
+                        request.add_row(cells, row_repeat)
+                elem.clear()
+
+    missing_sheets = set(requests_by_sheet) - found_sheets
+    if missing_sheets:
+        msg = f"Worksheet(s) {sorted(missing_sheets)} not found in {path2ods}"
+        raise ValueError(msg)
+    return [request.to_frame() for request in requests]
+
+
+def read_ods_sheet(
+    path2ods: str | Path,
+    sheet_name: str,
+    skiprows: int = 0,
+    usecols: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Read one sheet of an .ods file, see `read_ods_sheets`.
+    """
+    return read_ods_sheets(path2ods, [(sheet_name, skiprows, usecols)])[0]
@@ -10,10 +10,14 @@ A schema is named after : the data dictionary name (e.g. RA2020) and the table n
 Schema are saved in agriphyto_schema/schemas/
 """
 
+import json
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from logging import getLogger
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pandera.pandas as pa
 from pandas.api.types import is_numeric_dtype
@@ -25,47 +29,66 @@ from agriphyto_schema.constants import (
     COLNAME_LIBELLE,
     COLNAME_NOMENCLATURE,
     COLNAME_NOMENCLATURE_2,
-    COLNAME_OUT_DB,
+    COLNAME_OUT_NOMENCLATURE,
     COLNAME_PANDERA_TYPE,
     COLNAME_TABLE,
     COLNAME_TYPE,
     COLNAME_VARIABLE,
     DIR2DICO,
-    DIR2NOMENCLATURES,
     DIR2SCHEMA,
-    FILENAME_NOMENCLATURES,
     MAP_TYPES,
     USELESS_MODALITIES,
 )
-from agriphyto_schema.utils import check_db_name, pandera_to_json
+from agriphyto_schema.data.manifest import (
+    dico_fingerprint,
+    is_dico_up_to_date,
+    load_manifest,
+    record_dico,
+    save_manifest,
+)
+from agriphyto_schema.data.nomenclature_store import (
+    NomenclatureSink,
+)
+from agriphyto_schema.data.workbook import WorkbookSession
+from agriphyto_schema.utils import check_db_name, write_pandera_json
 
 logger = getLogger(__name__)
 logger.setLevel("DEBUG")
 
+# separators between modalities, by order of precedence
+MODALITY_SEPARATORS = ["\n", "|", ";", ",", " ou "]
+# separators between the code and the label of a modality, by order of precedence
+CODE_LABEL_SEPARATORS = [" - ", "=", ":"]
+# code:label modalities as formatted in the PK surveys dictionaries
+PATTERN_PK_MODALITY = re.compile(r"(\d{1,4}):(.*?)(?=(?:\d{1,4}:)|$)")
+PATTERN_CODE = re.compile(r"^(\d{1,4})")
+
 
 # typing utils
-def map_type(x):
+def compile_first_match(substrings: list[str]) -> re.Pattern:
     """
-    Map Excel type to Pandera type using MAP_TYPES dictionary."""
-    for k, v in MAP_TYPES.items():
-        if isinstance(x, str) and k.lower() in x.lower():
-            return v
-    return "string"
+    Compile a regex matching the strings containing any of substrings.
 
+    The regex is an alternation of lookaheads, one per substring, tried in the
+    order of substrings: the `lastindex` of a match is the (1-based) index of
+    the first substring of the list contained in the string, whatever its
+    position in the string.
+    """
+    return re.compile(
+        "|".join(
+            f"(?=.*?({re.escape(substring)}))" for substring in substrings
+        ),
+        re.DOTALL,
+    )
 
-def infer_type_from_varname(var_name: str) -> str:
-    """Infer the Pandera type from the variable name.
 
-    Args:
-        var_name (str): The variable name.
-
-    Returns:
-        str: The inferred Pandera type.
-    """
-    pandera_type = "string"  # default
-    if any(
-        pattern in var_name.upper()
-        for pattern in [
+# keys are lowered once, the input types are lowered before matching
+PATTERN_MAP_TYPES = compile_first_match([k.lower() for k in MAP_TYPES])
+MAP_TYPES_VALUES = list(MAP_TYPES.values())
+# variable name patterns of the float variables, then of the string variables
+VARNAME_TYPES = {
+    **dict.fromkeys(
+        [
             "NB",
             "COEF",
             "SUPP",
@@ -77,27 +100,67 @@ def infer_type_from_varname(var_name: str) -> str:
             "DOSE",
             "QTE",
             "QDOSE",
-        ]
-    ):
-        pandera_type = "float"
-    elif any(
-        pattern in var_name.upper()
-        for pattern in ["IDENT", "CODE", "SIRET", "AMM", "ANNEE", "AN"]
-    ):
-        pandera_type = "string"
-    return pandera_type
+        ],
+        "float",
+    ),
+    **dict.fromkeys(["IDENT", "CODE", "SIRET", "AMM", "ANNEE", "AN"], "string"),
+}
+PATTERN_VARNAME_TYPES = compile_first_match(list(VARNAME_TYPES))
+VARNAME_TYPES_VALUES = list(VARNAME_TYPES.values())
 
 
-# Nomenclature parsers and utils
-def remove_db_from_nomenclature(db_name: str):
-    path2all_nomenclatures = DIR2NOMENCLATURES / FILENAME_NOMENCLATURES
-    if path2all_nomenclatures.exists():
-        all_nomenclatures = pd.read_csv(path2all_nomenclatures)
-        all_nomenclatures[all_nomenclatures[COLNAME_OUT_DB] != db_name].to_csv(
-            path2all_nomenclatures, index=False
-        )
+def map_type(x):
+    """
+    Map Excel type to Pandera type using MAP_TYPES dictionary: the type of the
+    first key of MAP_TYPES contained in x (case insensitive)."""
+    if isinstance(x, str):
+        match = PATTERN_MAP_TYPES.match(x.lower())
+        if match:
+            return MAP_TYPES_VALUES[match.lastindex - 1]
+    return "string"
+
 
+def map_types(excel_types: pd.Series) -> pd.Series:
+    """
+    Map a column of Excel types to Pandera types, see `map_type`.
+
+    Each distinct Excel type is mapped only once.
+    """
+    codes, uniques = pd.factorize(excel_types)
+    pandera_types = np.array(
+        [*(map_type(excel_type) for excel_type in uniques), "string"],
+        dtype=object,
+    )
+    # missing types have the code -1, ie. the last "string" type
+    return pd.Series(pandera_types[codes], index=excel_types.index)
+
+
+def infer_type_from_varname(var_name: str) -> str:
+    """Infer the Pandera type from the variable name.
 
+    Args:
+        var_name (str): The variable name.
+
+    Returns:
+        str: The inferred Pandera type.
+    """
+    match = PATTERN_VARNAME_TYPES.match(var_name.upper())
+    if match:
+        return VARNAME_TYPES_VALUES[match.lastindex - 1]
+    return "string"  # default
+
+
+def infer_types_from_varnames(var_names: pd.Series) -> pd.Series:
+    """Infer the Pandera types of a column of variable names, see
+    `infer_type_from_varname`."""
+    return pd.Series(
+        [infer_type_from_varname(var_name) for var_name in var_names],
+        index=var_names.index,
+        dtype=object,
+    )
+
+
+# Nomenclature parsers and utils
 def clean_nomenclature_name(
     var_name: str | float, table_name: str | None = None
 ) -> str:
@@ -147,10 +210,9 @@ def clean_modalities(  # noqa: C901
         DataFrame with the correct columns.
     """
     cleaned_modalites = []
-    modality_separators = ["\n", "|", ";", ",", " ou "]
     # First, split the raw nomenclature based on different delimiters
     splitted_nomenclatures = []
-    for sep in modality_separators:
+    for sep in MODALITY_SEPARATORS:
         if (sep in raw_nomenclature_row) and (len(splitted_nomenclatures) == 0):
             splitted_nomenclatures = raw_nomenclature_row.split(sep)
     splitted_nomenclatures = [
@@ -159,15 +221,14 @@ def clean_modalities(  # noqa: C901
     # try a regex split directly getting back code and labels based on the
     # formatting of PK surveys dictionaries:
     # if the regex split finds at least as many modalities as the previous split, use it
-    pattern = r"(\d{1,4}):(.*?)(?=(?:\d{1,4}:)|$)"
-    regex_split = re.findall(pattern, raw_nomenclature_row)
+    regex_split = PATTERN_PK_MODALITY.findall(raw_nomenclature_row)
     # heuristic to guess if the regex worked better than the modality separators
     # if more split found in regex, use it
     choose_regex = len(regex_split) >= len(splitted_nomenclatures)
     # if a a bad matched code pattern in splitted_nomenclature, use regex split: ex. 'orages' instead of '03:Orages'
     if (len(splitted_nomenclatures) > 0) & (len(regex_split) > 0):
         for mod in splitted_nomenclatures:
-            if not re.match(r"^(\d{1,4})", mod.strip()):
+            if not PATTERN_CODE.match(mod.strip()):
                 choose_regex = True
     if choose_regex:
         nomenclature = pd.DataFrame(
@@ -176,13 +237,12 @@ def clean_modalities(  # noqa: C901
         )
     elif len(splitted_nomenclatures) > 0:
         # Process each modality
-        code_label_separator = [" - ", "=", ":"]
         for mod in splitted_nomenclatures:
             if mod and mod.strip() != "":
                 mod_clean = mod.strip().replace('"', "")
                 # Split on different separators to separate code from label
                 split_done = False
-                for sep in code_label_separator:
+                for sep in CODE_LABEL_SEPARATORS:
                     if (sep in mod_clean) & (not split_done):
                         split_done = True
                         code, label = mod_clean.split(sep, 1)
@@ -218,6 +278,114 @@ def clean_modalities(  # noqa: C901
     return nomenclature
 
 
+def _first_separator(raw: pd.Series, separators: list[str]) -> pd.Series:
+    """
+    Return the first separator of separators found in each string of raw, None
+    if there is none.
+    """
+    first_separator = pd.Series(None, index=raw.index, dtype=object)
+    for sep in reversed(separators):
+        first_separator[raw.str.contains(sep, regex=False)] = sep
+    return first_separator
+
+
+def clean_modalities_batch(
+    raw_nomenclatures: pd.Series, code_first: bool = True
+) -> pd.DataFrame:
+    """
+    Clean and parse the modalities of a whole column of raw nomenclature strings.
+
+    Vectorized version of `clean_modalities` giving the same modalities for each
+    raw nomenclature string, with the same heuristics.
+
+    Parameters
+    ----------
+    raw_nomenclatures : pd.Series
+        The raw nomenclature strings, one per variable.
+    code_first : bool, optional
+        Whether the code appears before the label in the modalities, by default True.
+        Eg. "1 - Label" vs "Label - 1".
+    Returns
+    -------
+    pd.DataFrame
+        A long DataFrame with the columns 'variable' and 'libelle' holding the
+        modalities of all the raw nomenclatures, in order. The index of each
+        modality is the index of its raw nomenclature in raw_nomenclatures, so
+        that the modalities can be joined back to their variables. Raw
+        nomenclatures without modalities have no row.
+    """
+    # work on positions, the index of raw_nomenclatures may not be unique
+    raw = pd.Series(raw_nomenclatures.to_numpy(dtype=object), dtype=object)
+    raw_stripped = raw.str.strip()
+    # split on the first modality separator found in each raw nomenclature
+    modality_separator = _first_separator(raw, MODALITY_SEPARATORS)
+    splitted = [
+        raw[modality_separator == sep].str.split(sep, regex=False).explode()
+        for sep in MODALITY_SEPARATORS
+    ]
+    splitted = pd.concat(splitted).sort_index(kind="stable").astype(object)
+    splitted = splitted[splitted.str.strip() != ""]
+    n_splitted = (
+        splitted.groupby(level=0).size().reindex(raw.index, fill_value=0)
+    )
+    # regex split based on the formatting of PK surveys dictionaries
+    # extractall gives NaN for empty groups where re.findall gives ""
+    regex_split = raw.str.extractall(PATTERN_PK_MODALITY).fillna("")
+    regex_split.columns = [COLNAME_CODE, COLNAME_LIBELLE]
+    regex_split = regex_split.droplevel("match")
+    n_regex = (
+        regex_split.groupby(level=0).size().reindex(raw.index, fill_value=0)
+    )
+    # same heuristics as clean_modalities to choose the regex split
+    bad_code = (
+        (~splitted.str.strip().str.match(PATTERN_CODE))
+        .groupby(level=0)
+        .any()
+        .reindex(raw.index, fill_value=False)
+    )
+    choose_regex = (n_regex >= n_splitted) | (
+        (n_splitted > 0) & (n_regex > 0) & bad_code
+    )
+    regex_modalities = regex_split[choose_regex[regex_split.index].to_numpy()]
+    # split the modalities on their first code label separator
+    splitted = splitted[~choose_regex[splitted.index].to_numpy()]
+    modalities = splitted.str.strip().str.replace('"', "", regex=False)
+    codes = modalities.copy()
+    labels = modalities.copy()
+    code_label_separator = _first_separator(modalities, CODE_LABEL_SEPARATORS)
+    for sep in CODE_LABEL_SEPARATORS:
+        mask = code_label_separator == sep
+        if not mask.any():
+            continue
+        partitions = modalities[mask].str.partition(sep)
+        codes[mask] = partitions[0].str.strip()
+        labels[mask] = partitions[2].str.strip()
+    splitted_modalities = pd.DataFrame({
+        COLNAME_CODE: codes,
+        COLNAME_LIBELLE: labels,
+    })
+    nomenclatures = pd.concat([regex_modalities, splitted_modalities])
+    if not code_first:
+        # Switch column order if nomenclature are of the form:  label - code
+        nomenclatures.columns = [COLNAME_LIBELLE, COLNAME_CODE]
+        nomenclatures = nomenclatures[[COLNAME_CODE, COLNAME_LIBELLE]]
+    # Fallback cases
+    without_modalities = ~raw.index.isin(nomenclatures.index) & (
+        raw_stripped != ""
+    )
+    fallback = pd.DataFrame({
+        COLNAME_CODE: raw[without_modalities],
+        COLNAME_LIBELLE: raw[without_modalities],
+    })
+    nomenclatures = pd.concat([nomenclatures, fallback]).sort_index(
+        kind="stable"
+    )
+    useless = raw_stripped.isin(USELESS_MODALITIES) | (raw_stripped == "")
+    nomenclatures = nomenclatures[~useless[nomenclatures.index].to_numpy()]
+    nomenclatures.index = raw_nomenclatures.index[nomenclatures.index]
+    return nomenclatures
+
+
 # nomenclature parsers
 def nomenclature_from_nomenclature_sheet(
     db_name: str,
@@ -225,6 +393,8 @@ def nomenclature_from_nomenclature_sheet(
     nomenclature_sheet: str,
     skiprows_nomenclature: str,
     cols_to_use_nomenclature: dict | None,
+    session: WorkbookSession | None = None,
+    sink: NomenclatureSink | None = None,
 ) -> dict[str, pd.DataFrame]:
     """
     Parse nomenclatures / modalities from a separate nomenclature sheet in the data dictionary.
@@ -241,16 +411,24 @@ def nomenclature_from_nomenclature_sheet(
         The name of the sheet containing nomenclatures.
     skiprows_nomenclature : str
         The number of rows to skip before reading the nomenclature sheet.
+    session : WorkbookSession | None, optional
+        The session serving the sheets of the data dictionary, by default a new
+        session on filepath2dico.
+    sink : NomenclatureSink | None, optional
+        The sink where the nomenclatures are appended, by default they are only
+        returned.
     Returns
     -------
     dict
         A dictionary mapping variable names to data frames containing the code-label mappings for
         each data modality.
     """
-    modalites_df = pd.read_excel(
-        DIR2DICO / filepath2dico,
-        sheet_name=nomenclature_sheet,
+    if session is None:
+        session = WorkbookSession(filepath2dico)
+    modalites_df = session.read(
+        nomenclature_sheet,
         skiprows=skiprows_nomenclature,
+        usecols=list(cols_to_use_nomenclature or {}) or None,
     )
     modalites_df.rename(columns=cols_to_use_nomenclature, inplace=True)
     # La colonne variable contient à la fois les codes et les libellés des modalités.
@@ -281,31 +459,8 @@ def nomenclature_from_nomenclature_sheet(
                 )
             modalities_df = raw_modalities.reset_index(drop=True)
             all_modalities_df[var_name_clean] = modalities_df
-            #
-            modalities_df[COLNAME_TABLE] = table_name
-            modalities_df[COLNAME_VARIABLE] = var_name_clean
-            modalities_df[COLNAME_OUT_DB] = db_name
-            modalities_df = modalities_df[
-                [
-                    COLNAME_OUT_DB,
-                    COLNAME_TABLE,
-                    COLNAME_VARIABLE,
-                    COLNAME_CODE,
-                    COLNAME_LIBELLE,
-                ]
-            ]
-
-            path2modalites = DIR2NOMENCLATURES / FILENAME_NOMENCLATURES
-            if not path2modalites.exists():
-                # write header
-                modalities_df.to_csv(path2modalites, index=False, mode="w")
-            else:
-                modalities_df.to_csv(
-                    path2modalites, index=False, mode="a", header=False
-                )
-            logger.info(
-                f"Variable {var_name_clean} nomenclature appended in {path2modalites}"
-            )
+            if sink is not None:
+                sink.append(modalities_df, table_name, var_name_clean)
     return all_modalities_df
 
 
@@ -315,6 +470,8 @@ def nomenclature_from_variable_sheet(
     variable_sheet: str,
     cols_to_use: dict,
     skiprows_nomenclature: int,
+    session: WorkbookSession | None = None,
+    sink: NomenclatureSink | None = None,
 ) -> dict[str, pd.DataFrame]:
     """
     Parameters
@@ -330,21 +487,28 @@ def nomenclature_from_variable_sheet(
         A dictionary mapping original column names to standardized column names.
     skiprows : int
         The number of rows to skip before reading the variable sheet.
+    session : WorkbookSession | None, optional
+        The session serving the sheets of the data dictionary, by default a new
+        session on filepath2dico.
+    sink : NomenclatureSink | None, optional
+        The sink where the nomenclatures are appended, by default they are only
+        returned.
     Returns
     -------
     dict
         A dictionary mapping variable names to data frames containing the code-label mappings
         for each data modality.
-        Save nomenclatures into one centralized csv file by append mode in agriphyto_schema/data/nomenclatures/all_nomenclatures.csv
     """
     if COLNAME_NOMENCLATURE not in cols_to_use.values():
         msg = """This function only handles behavior 1) where modalities are in the same sheet as
         variables."""
         raise ValueError(msg)
-    dico = pd.read_excel(
-        DIR2DICO / filepath2dico,
-        sheet_name=variable_sheet,
+    if session is None:
+        session = WorkbookSession(filepath2dico)
+    dico = session.read(
+        variable_sheet,
         skiprows=skiprows_nomenclature,
+        usecols=list(cols_to_use),
     )
     dico.rename(columns=cols_to_use, inplace=True)
     dico = dico[cols_to_use.values()]
@@ -357,51 +521,169 @@ def nomenclature_from_variable_sheet(
     dico_w_modalities = dico[
         dico[COLNAME_NOMENCLATURE].notna() & (dico[COLNAME_NOMENCLATURE] != "")
     ].reset_index(drop=True)
-    for _, row in dico_w_modalities.iterrows():
-        var_name = row[COLNAME_VARIABLE]
-        raw_nomenclature_row = row[COLNAME_NOMENCLATURE]
-        modalities_df = clean_modalities(raw_nomenclature_row, code_first=True)
-        if len(modalities_df) > 0:
-            table_name = row[COLNAME_TABLE]
-            var_name_clean = clean_nomenclature_name(var_name, table_name)
-            all_modalities_df[var_name_clean] = modalities_df
-            modalities_df[COLNAME_TABLE] = table_name
-            modalities_df[COLNAME_VARIABLE] = var_name_clean
-            modalities_df[COLNAME_OUT_DB] = db_name
-            modalities_df = modalities_df[
-                [
-                    COLNAME_OUT_DB,
-                    COLNAME_TABLE,
-                    COLNAME_VARIABLE,
-                    COLNAME_CODE,
-                    COLNAME_LIBELLE,
-                ]
-            ]
-            path2modalites = DIR2NOMENCLATURES / FILENAME_NOMENCLATURES
-            if not path2modalites.exists():
-                # write header
-                modalities_df.to_csv(path2modalites, index=False, mode="w")
-            else:
-                modalities_df.to_csv(
-                    path2modalites, index=False, mode="a", header=False
-                )
-            logger.info(
-                f"Variable {var_name_clean} nomenclature saved at {path2modalites}"
-            )
+    modalities_df = clean_modalities_batch(
+        dico_w_modalities[COLNAME_NOMENCLATURE], code_first=True
+    )
+    var_names_clean = [
+        clean_nomenclature_name(var_name, table_name)
+        for var_name, table_name in zip(
+            dico_w_modalities[COLNAME_VARIABLE],
+            dico_w_modalities[COLNAME_TABLE],
+            strict=True,
+        )
+    ]
+    for i, variable_modalities_df in modalities_df.groupby(level=0, sort=False):
+        all_modalities_df[var_names_clean[i]] = (
+            variable_modalities_df.reset_index(drop=True)
+        )
+    if sink is not None:
+        sink.append(
+            modalities_df,
+            dico_w_modalities.loc[modalities_df.index, COLNAME_TABLE].tolist(),
+            [var_names_clean[i] for i in modalities_df.index],
+        )
 
     return all_modalities_df
 
 
-def parse_dico(db_name: str) -> None:
+def parse_dico(db_name: str, dir2nomenclatures: Path | None = None) -> None:
     parser = AVAILABLE_DICOS[db_name].get("parser")
 
     if parser:
-        eval(parser)(db_name)  # noqa: S307
+        eval(parser)(db_name, dir2nomenclatures=dir2nomenclatures)  # noqa: S307
     else:
         logger.error(f"No parser found for {db_name}")
 
 
-def dico_from_excel(db_name: str) -> None:
+def parse_dicos(
+    db_names: list[str], jobs: int = 1, force: bool = False
+) -> None:
+    """
+    Parse several data dictionaries, optionally in a pool of processes.
+
+    Each dictionary replaces its own nomenclature partition (see
+    `agriphyto_schema.data.nomenclature_store`), so the parsers never write to
+    the same file.
+
+    The dictionaries whose raw file, configuration and parser version did not
+    change since their last parse (as recorded in the build manifest) are skipped.
+
+    Parameters
+    ----------
+    db_names : list[str]
+        The names of the data dictionaries to parse (keys of AVAILABLE_DICOS).
+    jobs : int, optional
+        The number of worker processes, by default 1 (parse sequentially in the
+        current process).
+    force : bool, optional
+        Parse all the dictionaries even if their inputs did not change, by default
+        False.
+    """
+    for db_name in db_names:
+        check_db_name(db_name)
+    manifest = load_manifest()
+    fingerprints = {db_name: dico_fingerprint(db_name) for db_name in db_names}
+    if not force:
+        unchanged_db_names = [
+            db_name
+            for db_name in db_names
+            if is_dico_up_to_date(db_name, manifest, fingerprints[db_name])
+        ]
+        if len(unchanged_db_names) > 0:
+            logger.info(
+                f"Skipping unchanged dictionaries: {unchanged_db_names}"
+            )
+        db_names = [
+            db_name for db_name in db_names if db_name not in unchanged_db_names
+        ]
+    if len(db_names) == 0:
+        return
+    if jobs == 1:
+        for db_name in db_names:
+            parse_dico(db_name)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(parse_dico, db_name): db_name
+                for db_name in db_names
+            }
+            for future in as_completed(futures):
+                # re-raise the worker exception if any
+                future.result()
+                logger.info(f"Done parsing {futures[future]}")
+    for db_name in db_names:
+        record_dico(db_name, manifest, fingerprints[db_name])
+    save_manifest(manifest)
+
+
+def save_table_schemas(
+    variables: pd.DataFrame,
+    schema_names: dict[str, str],
+    descriptions: dict[str, str],
+) -> None:
+    """
+    Build the pandera schema of each table of a data dictionary and save it in
+    agriphyto_schema/data/schemas/.
+
+    The variables are grouped by table once and the columns of each schema are
+    built directly from the rows, with their nomenclature already serialized in
+    the description field (see `agriphyto_schema.utils.pandera_to_json`).
+
+    Parameters
+    ----------
+    variables : pd.DataFrame
+        One row per variable with the columns COLNAME_TABLE, COLNAME_VARIABLE,
+        COLNAME_PANDERA_TYPE, COLNAME_LIBELLE and COLNAME_OUT_NOMENCLATURE, the
+        name of the nomenclature of the variable if any.
+    schema_names : dict[str, str]
+        The name of the schema of each table.
+    descriptions : dict[str, str]
+        The description of the schema of each table.
+    """
+    columns_to_use = [
+        COLNAME_VARIABLE,
+        COLNAME_PANDERA_TYPE,
+        COLNAME_LIBELLE,
+        COLNAME_OUT_NOMENCLATURE,
+    ]
+    for table_name, table_variables in variables.groupby(
+        COLNAME_TABLE, sort=False
+    ):
+        start = time.perf_counter()
+        columns = {}
+        for var_name, pandera_type, title, nomenclature in table_variables[
+            columns_to_use
+        ].itertuples(index=False, name=None):
+            metadata = (
+                None
+                if pd.isna(nomenclature)
+                else {"nomenclature": nomenclature}
+            )
+            columns[var_name] = pa.Column(
+                name=var_name,
+                dtype=pandera_type,
+                nullable=True,
+                title=title,
+                description=json.dumps(metadata),
+            )
+        pandera_schema = pa.DataFrameSchema(
+            columns=columns,
+            strict=True,
+            coerce=True,
+            name=schema_names[table_name],
+            description=descriptions[table_name],
+        )
+        path2schema = DIR2SCHEMA / f"{pandera_schema.name}.json"
+        write_pandera_json(pandera_schema, path2schema)
+        logger.info(
+            f"Saved schema for table {table_name} ({len(table_variables)} "
+            f"variables) to {path2schema} in {time.perf_counter() - start:.3f}s"
+        )
+
+
+def dico_from_excel(
+    db_name: str, dir2nomenclatures: Path | None = None
+) -> None:
     """
     Parse an Excel data dictionary to create a pandera schema for data validation.
     For each variable, output in the pandera schema :
@@ -417,34 +699,70 @@ def dico_from_excel(db_name: str) -> None:
     The behavior is set to 1) if the COLNAME_NOMENCLATURE is in the cols_to_use of the
     AVAILABLE_DICOS[db_name] configuration else 2).
 
+    All the sheets are read at once from a single `WorkbookSession`, with the
+    engine set by the optional "engine" key of the configuration: "pandas"
+    (default) or "ods_stream" for the streaming .ods reader.
+
     Parameters
     ----------
     db_name : str
         The name of the data dictionary (e.g. "RA2020").
+    dir2nomenclatures : Path | None, optional
+        The directory where the nomenclature partition of the database is saved,
+        by default agriphyto_schema/data/nomenclatures/.
 
     Returns
     -------
     None
         Saves the pandera schema JSON files in agriphyto_schema/data/schemas/
-        Saves the nomenclature CSV files in agriphyto_schema/data/nomenclatures/
+        Saves the nomenclature CSV partition in agriphyto_schema/data/nomenclatures/
     """
     check_db_name(db_name)
-    remove_db_from_nomenclature(db_name)
 
     filepath2dico = AVAILABLE_DICOS[db_name]["filename"]
     sheet_name_variables = AVAILABLE_DICOS[db_name]["variable_sheet"]
     cols_to_use = AVAILABLE_DICOS[db_name]["cols_to_use"]
     skiprows = AVAILABLE_DICOS[db_name].get("skiprows", 0)
+    engine = AVAILABLE_DICOS[db_name].get("engine", "pandas")
     # force a list if only on sheet name is provided
     if not isinstance(sheet_name_variables, list):
         sheet_name_variables = [sheet_name_variables]
-
+    with (
+        WorkbookSession(filepath2dico, engine=engine) as session,
+        NomenclatureSink(db_name, dir2nomenclatures) as sink,
+    ):
+        sheets = [
+            (sheet_name, skiprows, list(cols_to_use))
+            for sheet_name in sheet_name_variables
+        ]
+        if COLNAME_NOMENCLATURE not in cols_to_use.values():
+            sheets.append((
+                AVAILABLE_DICOS[db_name]["nomenclature_sheet"],
+                AVAILABLE_DICOS[db_name]["skiprows_nomenclature"],
+                list(AVAILABLE_DICOS[db_name]["cols_to_use_nomenclature"] or {})
+                or None,
+            ))
+        session.prefetch(sheets)
+        _dico_from_excel_sheets(db_name, sheet_name_variables, session, sink)
+
+
+def _dico_from_excel_sheets(
+    db_name: str,
+    sheet_name_variables: list[str],
+    session: WorkbookSession,
+    sink: NomenclatureSink,
+) -> None:
+    """
+    Build the schemas and nomenclatures of each variable sheet read from the
+    session, see `dico_from_excel`.
+    """
+    filepath2dico = AVAILABLE_DICOS[db_name]["filename"]
+    cols_to_use = AVAILABLE_DICOS[db_name]["cols_to_use"]
+    skiprows = AVAILABLE_DICOS[db_name].get("skiprows", 0)
     for sheet_name in sheet_name_variables:
         logger.info(f"Processing sheet {sheet_name} of {filepath2dico}")
-        dico = pd.read_excel(
-            DIR2DICO / filepath2dico,
-            sheet_name=sheet_name,
-            skiprows=skiprows,
+        dico = session.read(
+            sheet_name, skiprows=skiprows, usecols=list(cols_to_use)
         )
         dico.rename(columns=cols_to_use, inplace=True)
         new_cols = cols_to_use.values()
@@ -474,6 +792,8 @@ def dico_from_excel(db_name: str) -> None:
                 variable_sheet=sheet_name,
                 cols_to_use=cols_to_use,
                 skiprows_nomenclature=skiprows,
+                session=session,
+                sink=sink,
             )
         else:
             # behavior 2) nomenclatures in a separate sheet
@@ -490,48 +810,39 @@ def dico_from_excel(db_name: str) -> None:
                 nomenclature_sheet=nomenclature_sheet,
                 skiprows_nomenclature=skiprows_nomenclature,
                 cols_to_use_nomenclature=cols_to_use_nomenclature,
+                session=session,
+                sink=sink,
             )
 
-        dico[COLNAME_PANDERA_TYPE] = dico[COLNAME_TYPE].apply(map_type)
-        for table_name in all_table_names:
-            n_vars = dico[dico[COLNAME_TABLE] == table_name].shape[0]
-            logger.info(f"Table {table_name} has {n_vars} variables")
-            table_dico = dico[dico[COLNAME_TABLE] == table_name].reset_index(
-                drop=True
-            )
-            # Dirty exception for RA2020 where table names have the RA2020 as prefix
-            table_name_clean = table_name.replace("RA2020_", "")
-            # Assemble pandera schema with categories when available
-            pandera_schema = pa.DataFrameSchema(
-                columns={},
-                strict=True,
-                coerce=True,
-                name=f"{db_name}__{table_name_clean}",
-                description=f"Schema for table {table_name} from data dictionary {db_name}",
-            )
-            # Add columns
-            for _, row in table_dico.iterrows():
-                var_name = row.get(COLNAME_VARIABLE)
-                col_schema = pa.Column(
-                    name=var_name,
-                    dtype=row.get(COLNAME_PANDERA_TYPE),
-                    nullable=True,
-                    title=row.get(COLNAME_LIBELLE),
-                )
-                varname_clean = clean_nomenclature_name(
-                    var_name, table_name_clean
-                )
-                if varname_clean in modalities_dic:
-                    # Add strict categories instead of nomenclature dic ?
-                    col_schema.metadata = {"nomenclature": varname_clean}
-                pandera_schema.columns[var_name] = col_schema
-            pandera_to_json(
-                pandera_schema, DIR2SCHEMA / f"{pandera_schema.name}.json"
-            )
-            logger.info(
-                f"""Saved schema for table {table_name} to
-                {DIR2SCHEMA / f"{pandera_schema.name}.json"}"""
+        dico[COLNAME_PANDERA_TYPE] = map_types(dico[COLNAME_TYPE])
+        dico = dico[dico[COLNAME_TABLE].notna()]
+        # Dirty exception for RA2020 where table names have the RA2020 as prefix
+        tables_clean = {
+            table_name: table_name.replace("RA2020_", "")
+            for table_name in all_table_names
+        }
+        # Add strict categories instead of nomenclature dic ?
+        varnames_clean = [
+            clean_nomenclature_name(var_name, tables_clean[table_name])
+            for var_name, table_name in zip(
+                dico[COLNAME_VARIABLE], dico[COLNAME_TABLE], strict=True
             )
+        ]
+        dico[COLNAME_OUT_NOMENCLATURE] = [
+            varname_clean if varname_clean in modalities_dic else None
+            for varname_clean in varnames_clean
+        ]
+        save_table_schemas(
+            dico,
+            schema_names={
+                table_name: f"{db_name}__{table_name_clean}"
+                for table_name, table_name_clean in tables_clean.items()
+            },
+            descriptions={
+                table_name: f"Schema for table {table_name} from data dictionary {db_name}"
+                for table_name in all_table_names
+            },
+        )
 
 
 # CASD CSV parser
@@ -626,8 +937,34 @@ def detect_table_section_from_casd_csv(
     return table_sections
 
 
+def split_casd_variables(lines: list[str]) -> pd.DataFrame:
+    """
+    Split the lines of a table section of a CASD csv dictionary into the
+    variable, label and nomenclature columns. The modalities use the same ";"
+    separator as the columns: all the values after the first two columns are
+    kept whole in the nomenclature column.
+    """
+    table_variables = (
+        pd
+        .Series(lines, dtype="str")
+        .str.strip()
+        .str.split(";", n=2, expand=True)
+        .reindex(columns=range(3))
+    )
+    # a line without modalities has an empty nomenclature
+    table_variables[2] = table_variables[2].fillna("")
+    table_variables.columns = [
+        COLNAME_VARIABLE,
+        COLNAME_LIBELLE,
+        COLNAME_NOMENCLATURE,
+    ]
+    return table_variables
+
+
 # FIXME: refactor to have the same logic for nomenclature building and saving as in dico_from_excel
-def dico_from_casd_csv(db_name: str) -> None:
+def dico_from_casd_csv(
+    db_name: str, dir2nomenclatures: Path | None = None
+) -> None:
     """
     Parse a csv data dictionary from
     `CASD source <https://www.casd.eu/donnees-utilisees-sur-le-casd/>`_ to create a pandera schema
@@ -646,15 +983,17 @@ def dico_from_casd_csv(db_name: str) -> None:
     ----------
     db_name : str
         The name of the data dictionary (e.g. "PHYTOVITI2016").
+    dir2nomenclatures : Path | None, optional
+        The directory where the nomenclature partition of the database is saved,
+        by default agriphyto_schema/data/nomenclatures/.
 
     Returns
     -------
     None
         Saves the pandera schema JSON files in agriphyto_schema/data/schemas/
-        Saves the nomenclature CSV files in agriphyto_schema/data/nomenclatures/
+        Saves the nomenclature CSV partition in agriphyto_schema/data/nomenclatures/
     """
     check_db_name(db_name)
-    remove_db_from_nomenclature(db_name)
 
     # Load configuration from AVAILABLE_DICOS
     filepath2dico = AVAILABLE_DICOS[db_name]["filename"]
@@ -669,6 +1008,11 @@ def dico_from_casd_csv(db_name: str) -> None:
     # Second loop: parse variables for each table section
     with open(DIR2DICO / filepath2dico) as f:
         lines = f.readlines()
+    # the nomenclatures and schemas are only saved once all the tables are parsed
+    sink = NomenclatureSink(db_name, dir2nomenclatures)
+    all_table_variables = []
+    schema_names = {}
+    descriptions = {}
     for table_name, section in table_sections.items():
         table_description = section["table_description"]
         start_line = section["start_line"]
@@ -678,21 +1022,7 @@ def dico_from_casd_csv(db_name: str) -> None:
             f"Processing table {table_name} with variables from line {start_line} to {end_line}"
         )
 
-        # Read the table variables using pandas, forcing only the first 3 columns
-        table_variables_lines = lines[start_line:end_line]
-        # split on ';' and put all nomenclature modalities in the third column
-        table_variables = pd.DataFrame([
-            x.strip().split(";") for x in table_variables_lines
-        ])
-        table_variables[2] = table_variables.iloc[:, 2:].apply(
-            lambda x: ";".join(x.dropna().astype(str)), axis=1
-        )
-        table_variables = table_variables.iloc[:, :3]
-        table_variables.columns = [
-            COLNAME_VARIABLE,
-            COLNAME_LIBELLE,
-            COLNAME_NOMENCLATURE,
-        ]
+        table_variables = split_casd_variables(lines[start_line:end_line])
         # Clean and process the data
         table_variables = table_variables.dropna(
             subset=["variable"]
@@ -708,9 +1038,11 @@ def dico_from_casd_csv(db_name: str) -> None:
             table_variables[COLNAME_LIBELLE].str.strip().str.replace('"', "")
         )
         # add type inference
-        table_variables[COLNAME_TYPE] = table_variables[COLNAME_VARIABLE].apply(
-            infer_type_from_varname
+        table_variables[COLNAME_TYPE] = infer_types_from_varnames(
+            table_variables[COLNAME_VARIABLE]
         )
+        # the schemas use the type inferred from the variable name only
+        table_variables[COLNAME_PANDERA_TYPE] = table_variables[COLNAME_TYPE]
         mask_binary_nomenclature = table_variables[COLNAME_NOMENCLATURE].isin(
             CASD_BOOL_MODALITIES
         )
@@ -730,67 +1062,45 @@ def dico_from_casd_csv(db_name: str) -> None:
         ].reset_index(drop=True)
 
         # extract nomenclature and create files
-        for _, row in table_variables_w_modalities.iterrows():
-            var_name = row[COLNAME_VARIABLE]
-            raw_nomenclature_row = row[COLNAME_NOMENCLATURE]
-            modalities_df = clean_modalities(
-                raw_nomenclature_row, code_first=True
-            )
-            var_name_clean = clean_nomenclature_name(var_name, table_name)
-            modalities_df[COLNAME_TABLE] = table_name
-            modalities_df[COLNAME_VARIABLE] = var_name_clean
-            modalities_df[COLNAME_OUT_DB] = db_name
-            modalities_df = modalities_df[
-                [
-                    COLNAME_OUT_DB,
-                    COLNAME_TABLE,
-                    COLNAME_VARIABLE,
-                    COLNAME_CODE,
-                    COLNAME_LIBELLE,
+        modalities_df = clean_modalities_batch(
+            table_variables_w_modalities[COLNAME_NOMENCLATURE], code_first=True
+        )
+        sink.append(
+            modalities_df,
+            table_name,
+            [
+                clean_nomenclature_name(var_name, table_name)
+                for var_name in table_variables_w_modalities.loc[
+                    modalities_df.index, COLNAME_VARIABLE
                 ]
-            ]
-            # Save nomenclature to CSV
-            path2modalites = DIR2NOMENCLATURES / FILENAME_NOMENCLATURES
-            if not path2modalites.exists():
-                # write header
-                modalities_df.to_csv(path2modalites, index=False, mode="w")
-            else:
-                modalities_df.to_csv(
-                    path2modalites, index=False, mode="a", header=False
-                )
-            logger.info(
-                f"Variable {var_name_clean} nomenclature saved at {path2modalites}"
-            )
+            ],
+        )
 
-        # Create pandera schema
-        pandera_schema = pa.DataFrameSchema(
-            columns={},
-            strict=True,
-            coerce=True,
-            name=f"{db_name}__{table_name}",
-            description=f"""Schema for table {table_name} ({table_description})
-        from data dictionary {db_name}""",
+        # Collect the table variables for the schemas
+        mask_w_modalities = table_variables[COLNAME_VARIABLE].isin(
+            table_variables_w_modalities[COLNAME_VARIABLE]
         )
-        # Add columns to schema
-        for var_info in table_variables.to_dict(orient="records"):
-            var_name = var_info["variable"]
-            col_schema = pa.Column(
-                name=var_name,
-                dtype=infer_type_from_varname(var_name),
-                nullable=True,
-                title=var_info[COLNAME_LIBELLE],
+        table_variables[COLNAME_OUT_NOMENCLATURE] = [
+            clean_nomenclature_name(var_name, table_name)
+            if w_modalities
+            else None
+            for var_name, w_modalities in zip(
+                table_variables[COLNAME_VARIABLE],
+                mask_w_modalities,
+                strict=True,
             )
-            if (
-                var_name
-                in table_variables_w_modalities[COLNAME_VARIABLE].tolist()
-            ):
-                var_name_clean = clean_nomenclature_name(var_name, table_name)
-                col_schema.metadata = {"nomenclature": var_name_clean}
-            pandera_schema.columns[var_name] = col_schema
-        # Save schema
-        pandera_to_json(
-            pandera_schema, DIR2SCHEMA / f"{pandera_schema.name}.json"
-        )
-        logger.info(
-            f"Saved schema for table {table_name} to {DIR2SCHEMA / f'{pandera_schema.name}.json'}"
+        ]
+        table_variables[COLNAME_TABLE] = table_name
+        all_table_variables.append(table_variables)
+        schema_names[table_name] = f"{db_name}__{table_name}"
+        descriptions[
+            table_name
+        ] = f"""Schema for table {table_name} ({table_description})
+        from data dictionary {db_name}"""
+    if len(all_table_variables) > 0:
+        save_table_schemas(
+            pd.concat(all_table_variables, ignore_index=True),
+            schema_names=schema_names,
+            descriptions=descriptions,
         )
+    sink.commit()
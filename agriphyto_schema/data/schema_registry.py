@@ -0,0 +1,153 @@
+"""
+Lazy registry of the pandera schemas of DIR2SCHEMA.
+
+`pandera_from_json` parses the JSON file of a schema and rebuilds its
+`DataFrameSchema` on every call (~70ms for a large table, ~1.5s for all the
+schemas). A `SchemaRegistry` lists the schemas from the names of their files,
+`<db_name>__<table_name>.json`, without opening them, and only loads a schema
+the first time it is requested. The loaded schemas are kept in a LRU cache of
+SCHEMA_CACHE_SIZE entries, and loaded again when their file is modified.
+
+When a bundle of the schemas is given (see `agriphyto_schema.data.schema_bundle`),
+the schemas whose file did not change since they were bundled are loaded from
+the bundle, which is several times faster.
+
+The schemas returned by the registry are shared by all its callers: they must
+not be modified (copy them first, eg. with `copy.deepcopy`).
+"""
+
+import threading
+from collections import OrderedDict
+from logging import getLogger
+from pathlib import Path
+
+import pandera.pandas as pa
+
+from agriphyto_schema.constants import (
+    DIR2DATA,
+    DIR2SCHEMA,
+    FILENAME_SCHEMA_BUNDLE,
+    SCHEMA_CACHE_SIZE,
+)
+from agriphyto_schema.data.schema_bundle import SchemaBundle
+from agriphyto_schema.utils import pandera_from_json
+
+logger = getLogger(__name__)
+
+
+class SchemaRegistry:
+    """
+    Load the pandera schemas of a directory on demand, with a LRU cache.
+
+    Parameters
+    ----------
+    dir2schema : Path | None, optional
+        The directory of the schema files, by default DIR2SCHEMA.
+    maxsize : int, optional
+        The number of schemas kept in memory, by default SCHEMA_CACHE_SIZE.
+    path2bundle : Path | None, optional
+        The bundle of the schemas, used if it exists, by default None (the
+        schemas are loaded from their files).
+    """
+
+    def __init__(
+        self,
+        dir2schema: Path | None = None,
+        maxsize: int = SCHEMA_CACHE_SIZE,
+        path2bundle: Path | None = None,
+    ):
+        self.dir2schema = dir2schema or DIR2SCHEMA
+        self.maxsize = maxsize
+        self.path2bundle = path2bundle
+        # (modification time of the bundle, bundle)
+        self._bundle: tuple[int, SchemaBundle] | None = None
+        # schema name -> (modification time of the file, schema)
+        self._schemas: OrderedDict[str, tuple[int, pa.DataFrameSchema]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def names(self, db_name: str | None = None) -> list[str]:
+        """
+        Return the names, `<db_name>__<table_name>`, of the schemas sorted by
+        file name, only those of a database if db_name is given.
+        """
+        pattern = f"{db_name}__*.json" if db_name is not None else "*.json"
+        return [path.stem for path in sorted(self.dir2schema.glob(pattern))]
+
+    def db_names(self) -> list[str]:
+        """Return the sorted names of the databases having a schema."""
+        return sorted({name.split("__", 1)[0] for name in self.names()})
+
+    def path(self, schema_name: str) -> Path:
+        """Return the file of a schema, which may not exist."""
+        return self.dir2schema / f"{schema_name}.json"
+
+    def __contains__(self, schema_name: str) -> bool:
+        return self.path(schema_name).exists()
+
+    def bundle(self) -> SchemaBundle | None:
+        """Return the bundle of the schemas, or None if there is none."""
+        if self.path2bundle is None or not self.path2bundle.exists():
+            return None
+        mtime_ns = self.path2bundle.stat().st_mtime_ns
+        if self._bundle is None or self._bundle[0] != mtime_ns:
+            try:
+                self._bundle = (mtime_ns, SchemaBundle(self.path2bundle))
+            except ValueError as err:
+                # eg. written by a former version of the bundle format
+                logger.warning(
+                    f"{err}, the schemas are loaded from their files"
+                )
+                return None
+        return self._bundle[1]
+
+    def get(self, schema_name: str) -> pa.DataFrameSchema:
+        """
+        Return the schema of a table, loading it if it is not cached or if its
+        file changed since it was loaded.
+
+        Raises
+        ------
+        ValueError
+            If there is no schema file for this name.
+        """
+        path2schema = self.path(schema_name)
+        try:
+            mtime_ns = path2schema.stat().st_mtime_ns
+        except FileNotFoundError:
+            msg = f"No schema {schema_name} in {self.dir2schema}"
+            raise ValueError(msg) from None
+        with self._lock:
+            cached = self._schemas.get(schema_name)
+            if cached is not None and cached[0] == mtime_ns:
+                self._schemas.move_to_end(schema_name)
+                return cached[1]
+        bundle = self.bundle()
+        if (
+            bundle is not None
+            and schema_name in bundle
+            and bundle.source_mtime_ns(schema_name) == mtime_ns
+        ):
+            schema = bundle.load(schema_name)
+            logger.debug(
+                f"Loaded schema {schema_name} from {bundle.path2bundle}"
+            )
+        else:
+            schema = pandera_from_json(path2schema)
+            logger.debug(f"Loaded schema {schema_name}")
+        with self._lock:
+            self._schemas[schema_name] = (mtime_ns, schema)
+            self._schemas.move_to_end(schema_name)
+            while len(self._schemas) > self.maxsize:
+                self._schemas.popitem(last=False)
+        return schema
+
+    def clear(self) -> None:
+        """Forget the loaded schemas."""
+        with self._lock:
+            self._schemas.clear()
+
+
+# registry shared by the package
+schema_registry = SchemaRegistry(path2bundle=DIR2DATA / FILENAME_SCHEMA_BUNDLE)
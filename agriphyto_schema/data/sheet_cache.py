@@ -0,0 +1,168 @@
+"""
+Cache of the raw spreadsheet sheets read by the parsers.
+
+Reading a sheet of an .ods (odfpy) or .xlsx (openpyxl) file is by far the slowest
+step of the parsing. The first read of a (file, sheet, skiprows, usecols, engine)
+request is stored as a pickled DataFrame snapshot in DIR2SHEET_CACHE, later reads
+load the snapshot (see `agriphyto_schema.data.workbook.WorkbookSession`).
+
+A snapshot is invalidated when the raw file changes: the modification time and size
+are checked first and the content hash is only computed when they differ (eg.
+after a fresh git checkout).
+
+NB: The snapshots are pickles rather than Parquet/Feather files because some
+dictionary columns mix integer codes and strings (eg. the RA2020 modalities sheet),
+which arrow cannot store without coercing them, while the parsers rely on these
+python types.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from logging import getLogger
+from pathlib import Path
+
+import pandas as pd
+
+from agriphyto_schema.constants import DIR2DICO, DIR2SHEET_CACHE
+from agriphyto_schema.utils import file_sha256
+
+logger = getLogger(__name__)
+
+
+def _snapshot_paths(
+    filepath2dico: str | Path,
+    sheet_name: str,
+    skiprows: int,
+    usecols: list[str] | None,
+    engine: str,
+) -> tuple[Path, Path]:
+    key = json.dumps([
+        str(filepath2dico),
+        sheet_name,
+        skiprows,
+        usecols,
+        engine,
+    ])
+    digest = hashlib.sha256(key.encode()).hexdigest()[:24]
+    return (
+        DIR2SHEET_CACHE / f"{digest}.pkl",
+        DIR2SHEET_CACHE / f"{digest}.json",
+    )
+
+
+def _write_json(obj: dict, path: Path) -> None:
+    # write in a temporary file so that concurrent parsers never read a partial file
+    path2tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(path2tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(path2tmp, path)
+
+
+def _is_snapshot_valid(path2raw: Path, path2meta: Path) -> bool:
+    if not path2meta.exists():
+        return False
+    with open(path2meta, encoding="utf-8") as f:
+        meta = json.load(f)
+    stat = path2raw.stat()
+    if (meta["mtime_ns"] == stat.st_mtime_ns) and (
+        meta["size"] == stat.st_size
+    ):
+        return True
+    if meta["sha256"] != file_sha256(path2raw):
+        return False
+    # same content, only refresh the stat information
+    meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    _write_json(meta, path2meta)
+    return True
+
+
+def load_snapshot(
+    filepath2dico: str | Path,
+    sheet_name: str,
+    skiprows: int = 0,
+    usecols: list[str] | None = None,
+    engine: str = "pandas",
+) -> pd.DataFrame | None:
+    """
+    Load the cached snapshot of a sheet of a raw Excel/ODS data dictionary.
+
+    Parameters
+    ----------
+    filepath2dico : str | Path
+        The path to the data dictionary file, relative to DIR2DICO.
+    sheet_name : str
+        The name of the sheet.
+    skiprows : int, optional
+        The number of rows skipped before the header, by default 0.
+    usecols : list[str] | None, optional
+        The columns read, by default all.
+    engine : str, optional
+        The engine used to read the sheet, by default "pandas".
+
+    Returns
+    -------
+    pd.DataFrame | None
+        The sheet content, or None if there is no valid snapshot for this sheet.
+    """
+    path2raw = DIR2DICO / filepath2dico
+    path2snapshot, path2meta = _snapshot_paths(
+        filepath2dico, sheet_name, skiprows, usecols, engine
+    )
+    if path2snapshot.exists() and _is_snapshot_valid(path2raw, path2meta):
+        logger.debug(
+            f"Loading sheet {sheet_name} of {filepath2dico} from cache"
+        )
+        # the snapshots are only written by save_snapshot, in the local data folder
+        return pd.read_pickle(path2snapshot)  # noqa: S301
+    return None
+
+
+def save_snapshot(
+    sheet: pd.DataFrame,
+    filepath2dico: str | Path,
+    sheet_name: str,
+    skiprows: int = 0,
+    usecols: list[str] | None = None,
+    engine: str = "pandas",
+) -> None:
+    """
+    Save the snapshot of a sheet of a raw Excel/ODS data dictionary, see
+    `load_snapshot` for the parameters.
+    """
+    path2raw = DIR2DICO / filepath2dico
+    path2snapshot, path2meta = _snapshot_paths(
+        filepath2dico, sheet_name, skiprows, usecols, engine
+    )
+    DIR2SHEET_CACHE.mkdir(parents=True, exist_ok=True)
+    # write in a temporary file so that concurrent parsers never read a partial pickle
+    path2tmp = path2snapshot.with_suffix(f".{os.getpid()}.tmp")
+    sheet.to_pickle(path2tmp)
+    os.replace(path2tmp, path2snapshot)
+    stat = path2raw.stat()
+    _write_json(
+        {
+            "filename": str(filepath2dico),
+            "sheet_name": sheet_name,
+            "skiprows": skiprows,
+            "usecols": usecols,
+            "engine": engine,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_sha256(path2raw),
+        },
+        path2meta,
+    )
+    logger.info(
+        f"Cached sheet {sheet_name} of {filepath2dico} in {path2snapshot}"
+    )
+
+
+def clear_sheet_cache() -> None:
+    """
+    Remove all the cached sheet snapshots.
+    """
+    if DIR2SHEET_CACHE.exists():
+        shutil.rmtree(DIR2SHEET_CACHE)
+        logger.info(f"Removed sheet cache {DIR2SHEET_CACHE}")
@@ -0,0 +1,441 @@
+"""
+Single-file SQLite catalog of the data dictionary and the nomenclatures.
+
+`create-dico --backend sqlite` writes `agriphyto_catalog.sqlite` in addition to
+the parquet artifacts of the application, from the same csv outputs. It holds:
+
+- the `databases`, `tables`, `variables` and `modalities` tables, the variables
+  and the modalities being indexed by their table (and their nomenclature),
+- the `variables_fts` and `modalities_fts` FTS5 indexes of the searched labels,
+  with the trigram tokenizer.
+
+The ids of the variables and of the modalities are their positions in the data
+dictionary and in the nomenclatures artifact, so that a `SqliteCatalog` returns
+the same frames and the same positions of rows as the parquet backend.
+
+The searched values are folded as by `SearchIndex` (lowercased, without
+accents) and joined in documents delimited by FTS_SEPARATOR. A literal query of
+at least 3 characters is an FTS5 phrase query on the trigram index, anchors
+included. The shorter queries and the regular expressions are matched on every
+row, with a python REGEXP function for the latter.
+
+The catalog is opened read-only and can be shared by threads.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from logging import getLogger
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agriphyto_schema.constants import (
+    AGRIPHYTO_DICO_NAME,
+    COLNAME_CODE,
+    COLNAME_LIBELLE,
+    COLNAME_OUT_DB,
+    COLNAME_OUT_LIBELLE,
+    COLNAME_OUT_NOMENCLATURE,
+    COLNAME_OUT_PANDERA_TYPE,
+    COLNAME_OUT_TABLE,
+    COLNAME_OUT_VARIABLE,
+    COLNAME_TABLE,
+    COLNAME_VARIABLE,
+    COLNAME_VARIABLE_NAME,
+    COLNAMES_OUTPUT,
+    DIR2DATA,
+    FILENAME_SQLITE_CATALOG,
+    SEARCH_SEPARATOR,
+    SEARCH_TRIGRAM_SIZE,
+)
+from agriphyto_schema.data.app_artifacts import (
+    NOMENCLATURE_CATEGORICAL_COLUMNS,
+    build_app_dico,
+    build_app_nomenclatures,
+)
+from agriphyto_schema.data.nomenclature_store import (
+    NOMENCLATURE_COLUMNS,
+    read_nomenclatures,
+)
+from agriphyto_schema.utils import fold, literal_query
+
+logger = getLogger(__name__)
+
+# delimits the values of a document, the null character of SearchIndex is not
+# supported by the tokenizers
+FTS_SEPARATOR = "\x1f"
+SQLITE_SCHEMA = """
+CREATE TABLE databases (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE tables (
+    id INTEGER PRIMARY KEY,
+    database_id INTEGER NOT NULL REFERENCES databases (id),
+    name TEXT NOT NULL,
+    UNIQUE (database_id, name)
+);
+CREATE TABLE variables (
+    id INTEGER PRIMARY KEY,
+    table_id INTEGER NOT NULL REFERENCES tables (id),
+    name TEXT NOT NULL,
+    label TEXT,
+    type TEXT NOT NULL,
+    nomenclature TEXT
+);
+CREATE INDEX variables_table ON variables (table_id, name);
+CREATE TABLE modalities (
+    id INTEGER PRIMARY KEY,
+    table_id INTEGER NOT NULL REFERENCES tables (id),
+    nomenclature TEXT NOT NULL,
+    variable_name TEXT NOT NULL,
+    code TEXT NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE INDEX modalities_nomenclature ON modalities (table_id, nomenclature);
+CREATE VIRTUAL TABLE variables_fts USING fts5(
+    document, label UNINDEXED, variable UNINDEXED, tokenize = 'trigram'
+);
+CREATE VIRTUAL TABLE modalities_fts USING fts5(
+    document, label UNINDEXED, tokenize = 'trigram'
+);
+"""
+# the queries only interpolate constant identifiers, the values are parameters
+SELECT_VARIABLES = f"""
+SELECT
+    databases.name AS "{COLNAME_OUT_DB}",
+    tables.name AS "{COLNAME_OUT_TABLE}",
+    variables.name AS "{COLNAME_OUT_VARIABLE}",
+    variables.label AS "{COLNAME_OUT_LIBELLE}",
+    variables.type AS "{COLNAME_OUT_PANDERA_TYPE}",
+    variables.nomenclature AS "{COLNAME_OUT_NOMENCLATURE}"
+FROM variables
+JOIN tables ON tables.id = variables.table_id
+JOIN databases ON databases.id = tables.database_id
+"""  # noqa: S608
+MODALITY_COLUMNS = [*NOMENCLATURE_COLUMNS, COLNAME_VARIABLE_NAME]
+SELECT_MODALITIES = f"""
+SELECT
+    databases.name AS "{COLNAME_OUT_DB}",
+    tables.name AS "{COLNAME_TABLE}",
+    modalities.nomenclature AS "{COLNAME_VARIABLE}",
+    modalities.code AS "{COLNAME_CODE}",
+    modalities.label AS "{COLNAME_LIBELLE}",
+    modalities.variable_name AS "{COLNAME_VARIABLE_NAME}"
+FROM modalities
+JOIN tables ON tables.id = modalities.table_id
+JOIN databases ON databases.id = tables.database_id
+"""  # noqa: S608
+
+
+def path2sqlite_catalog(dir2data: Path | None = None) -> Path:
+    """Return the path of the SQLite catalog."""
+    return (dir2data or DIR2DATA) / FILENAME_SQLITE_CATALOG
+
+
+def _fts_frame(df: pd.DataFrame, columns: dict[str, str]) -> pd.DataFrame:
+    """
+    Return the rows of a FTS5 table: the document of each row of df and its
+    folded values, the searched columns of df being mapped to their FTS5 column.
+    """
+    # the missing values never match
+    values = {
+        fts_column: [
+            fold(value) if isinstance(value, str) else ""
+            for value in df[column]
+        ]
+        for column, fts_column in columns.items()
+    }
+    documents = [
+        FTS_SEPARATOR + FTS_SEPARATOR.join(row) + FTS_SEPARATOR
+        for row in zip(*values.values(), strict=True)
+    ]
+    return pd.DataFrame({
+        "rowid": np.arange(len(df)),
+        "document": documents,
+        **values,
+    })
+
+
+def write_sqlite_catalog(dir2data: Path | None = None) -> Path:
+    """
+    Write the SQLite catalog from the aggregated data dictionary csv and the
+    nomenclature partitions.
+
+    Parameters
+    ----------
+    dir2data : Path | None, optional
+        The directory of the data dictionary csv, of the nomenclature partitions
+        and of the catalog, by default DIR2DATA.
+
+    Returns
+    -------
+    Path
+        The catalog file.
+    """
+    dir2data = dir2data or DIR2DATA
+    path2catalog = path2sqlite_catalog(dir2data)
+    dico = pd.read_csv(dir2data / f"{AGRIPHYTO_DICO_NAME}.csv")
+    nomenclatures = build_app_nomenclatures(
+        read_nomenclatures(dir2nomenclatures=dir2data / "nomenclatures")
+    ).astype(dict.fromkeys(MODALITY_COLUMNS, "str"))
+    tables = (
+        pd
+        .concat([
+            dico[[COLNAME_OUT_DB, COLNAME_OUT_TABLE]].set_axis(
+                ["database", "name"], axis=1
+            ),
+            nomenclatures[[COLNAME_OUT_DB, COLNAME_TABLE]].set_axis(
+                ["database", "name"], axis=1
+            ),
+        ])
+        .drop_duplicates()
+        .sort_values(["database", "name"])
+        .reset_index(drop=True)
+    )
+    databases = pd.DataFrame({"name": tables["database"].unique()})
+    databases.insert(0, "id", np.arange(len(databases)))
+    tables.insert(0, "id", np.arange(len(tables)))
+    tables["database_id"] = tables["database"].map(
+        databases.set_index("name")["id"]
+    )
+    table_ids = tables.set_index(["database", "name"])["id"]
+
+    def table_id(df: pd.DataFrame, table_column: str) -> np.ndarray:
+        return table_ids.loc[
+            list(zip(df[COLNAME_OUT_DB], df[table_column], strict=True))
+        ].to_numpy()
+
+    variables = pd.DataFrame({
+        "id": np.arange(len(dico)),
+        "table_id": table_id(dico, COLNAME_OUT_TABLE),
+        "name": dico[COLNAME_OUT_VARIABLE],
+        "label": dico[COLNAME_OUT_LIBELLE],
+        "type": dico[COLNAME_OUT_PANDERA_TYPE],
+        "nomenclature": dico[COLNAME_OUT_NOMENCLATURE],
+    })
+    modalities = pd.DataFrame({
+        "id": np.arange(len(nomenclatures)),
+        "table_id": table_id(nomenclatures, COLNAME_TABLE),
+        "nomenclature": nomenclatures[COLNAME_VARIABLE],
+        "variable_name": nomenclatures[COLNAME_VARIABLE_NAME],
+        "code": nomenclatures[COLNAME_CODE],
+        "label": nomenclatures[COLNAME_LIBELLE],
+    })
+    variables_fts = _fts_frame(
+        dico, {COLNAME_OUT_LIBELLE: "label", COLNAME_OUT_VARIABLE: "variable"}
+    )
+    modalities_fts = _fts_frame(nomenclatures, {COLNAME_LIBELLE: "label"})
+
+    path2tmp = path2catalog.with_suffix(".tmp")
+    path2tmp.unlink(missing_ok=True)
+    connection = sqlite3.connect(path2tmp)
+    try:
+        with connection:
+            connection.executescript(SQLITE_SCHEMA)
+            for name, df in [
+                ("databases", databases),
+                ("tables", tables[["id", "database_id", "name"]]),
+                ("variables", variables),
+                ("modalities", modalities),
+                ("variables_fts", variables_fts),
+                ("modalities_fts", modalities_fts),
+            ]:
+                df.to_sql(name, connection, if_exists="append", index=False)
+            connection.execute(
+                "INSERT INTO variables_fts(variables_fts) VALUES ('optimize')"
+            )
+            connection.execute(
+                "INSERT INTO modalities_fts(modalities_fts) VALUES ('optimize')"
+            )
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    os.replace(path2tmp, path2catalog)
+    logger.info(
+        f"SQLite catalog of {len(variables)} variables and {len(modalities)} "
+        f"modalities saved to {path2catalog} "
+        f"({path2catalog.stat().st_size / 2**20:.1f}MB)"
+    )
+    return path2catalog
+
+
+def _regexp(pattern: str, value: str) -> bool:
+    return re.search(pattern, value) is not None
+
+
+class FtsIndex:
+    """
+    Full-text index of a SQLite catalog, searched as a `SearchIndex`.
+
+    Parameters
+    ----------
+    catalog : SqliteCatalog
+        The catalog holding the index.
+    fts_table : str
+        The FTS5 table of the index.
+    columns : list[str]
+        The columns of the folded values matched by the regular expressions.
+    """
+
+    def __init__(
+        self, catalog: "SqliteCatalog", fts_table: str, columns: list[str]
+    ):
+        self.catalog = catalog
+        self.fts_table = fts_table
+        self.columns = columns
+        self.n_rows = catalog.execute(
+            f"SELECT count(*) FROM {fts_table}"  # noqa: S608
+        )[0][0]
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def _rowids(self, where: str, parameters: list[str]) -> np.ndarray:
+        rows = self.catalog.execute(
+            f"SELECT rowid FROM {self.fts_table} WHERE {where} ORDER BY rowid",  # noqa: S608
+            parameters,
+        )
+        return np.array([row for (row,) in rows], dtype=np.int64)
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        Return the sorted positions of the rows matching a query, as
+        `SearchIndex.search`.
+        """
+        query = query.strip()
+        if not query:
+            return np.arange(self.n_rows)
+        substring = literal_query(query)
+        if substring is not None:
+            return self.search_substring(
+                substring.replace(SEARCH_SEPARATOR, FTS_SEPARATOR)
+            )
+        pattern = fold(query)
+        try:
+            re.compile(pattern)
+        except re.error:
+            # invalid regular expression
+            return self.search_substring(pattern)
+        return self.search_regex(pattern)
+
+    def search_substring(self, substring: str) -> np.ndarray:
+        """
+        Return the positions of the rows whose document contains a normalized
+        substring, with a phrase query on the trigram index if it is long enough.
+        """
+        if len(substring) < SEARCH_TRIGRAM_SIZE:
+            return self._rowids("instr(document, ?) > 0", [substring])
+        phrase = '"' + substring.replace('"', '""') + '"'
+        return self._rowids("document MATCH ?", [phrase])
+
+    def search_regex(self, pattern: str) -> np.ndarray:
+        """
+        Return the positions of the rows with a normalized value matching a
+        regular expression.
+        """
+        return self._rowids(
+            " OR ".join(f"{column} REGEXP ?" for column in self.columns),
+            [pattern] * len(self.columns),
+        )
+
+
+class SqliteCatalog:
+    """
+    Query the SQLite catalog written by `write_sqlite_catalog`.
+
+    Parameters
+    ----------
+    path2catalog : Path | None, optional
+        The catalog file, by default DIR2DATA / FILENAME_SQLITE_CATALOG.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the catalog was not written.
+    """
+
+    def __init__(self, path2catalog: Path | None = None):
+        self.path2catalog = path2catalog or path2sqlite_catalog()
+        if not self.path2catalog.exists():
+            msg = (
+                f"No SQLite catalog {self.path2catalog}, "
+                "run `create-dico --backend sqlite`"
+            )
+            raise FileNotFoundError(msg)
+        self.connection = sqlite3.connect(
+            f"{self.path2catalog.as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        self.connection.create_function(
+            "REGEXP", 2, _regexp, deterministic=True
+        )
+        self._lock = threading.Lock()
+        self.variables_index = FtsIndex(
+            self, "variables_fts", ["label", "variable"]
+        )
+        self.modalities_index = FtsIndex(self, "modalities_fts", ["label"])
+
+    def execute(self, sql: str, parameters=()) -> list[tuple]:
+        """Run a query and return its rows."""
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def _select(
+        self,
+        select: str,
+        columns: list[str],
+        id_column: str,
+        ids: np.ndarray | None,
+    ) -> pd.DataFrame:
+        if ids is None:
+            rows = self.execute(f"{select} ORDER BY {id_column}")
+        else:
+            rows = self.execute(
+                f"{select} WHERE {id_column} IN "  # noqa: S608
+                f"(SELECT value FROM json_each(?)) ORDER BY {id_column}",
+                [json.dumps(np.asarray(ids, dtype=np.int64).tolist())],
+            )
+        return pd.DataFrame(rows, columns=columns, dtype="str")
+
+    def variables(self, ids: np.ndarray | None = None) -> pd.DataFrame:
+        """
+        Return the rows of the data dictionary as `read_app_dico`, only those at
+        the positions ids if given (in the order of their positions).
+        """
+        return build_app_dico(
+            self._select(SELECT_VARIABLES, COLNAMES_OUTPUT, "variables.id", ids)
+        )
+
+    def nomenclatures(self, ids: np.ndarray | None = None) -> pd.DataFrame:
+        """
+        Return the modalities of the nomenclatures as `read_app_nomenclatures`,
+        only those at the positions ids if given (in the order of their
+        positions).
+        """
+        return self._select(
+            SELECT_MODALITIES, MODALITY_COLUMNS, "modalities.id", ids
+        ).astype(dict.fromkeys(NOMENCLATURE_CATEGORICAL_COLUMNS, "category"))
+
+    def modalities(
+        self, db_name: str, table_name: str, nomenclature: str
+    ) -> pd.DataFrame:
+        """
+        Return the modalities of a nomenclature, looked up on the index of the
+        modalities by table and nomenclature (empty if it is unknown).
+        """
+        rows = self.execute(
+            f"""
+            {SELECT_MODALITIES}
+            WHERE databases.name = ? AND tables.name = ?
+            AND modalities.nomenclature = ?
+            ORDER BY modalities.id
+            """,
+            [db_name, table_name, nomenclature],
+        )
+        return pd.DataFrame(rows, columns=MODALITY_COLUMNS, dtype="str")
@@ -0,0 +1,168 @@
+"""
+Workbook sessions serving all the sheets read from one raw data dictionary.
+
+A dictionary may be read several times by the parsers: once per variable sheet
+(eg. PKViti_2019, Phytoleg_2018), once more for the nomenclatures when they are in
+the same sheet as the variables and once for a separate nomenclature sheet (eg.
+RA_2020). A `WorkbookSession` opens the raw file at most once and serves every
+requested sheet from this handle, from the snapshot cache (see
+`agriphyto_schema.data.sheet_cache`) or from the sheets already read in the
+session.
+"""
+
+from logging import getLogger
+from pathlib import Path
+
+import pandas as pd
+
+from agriphyto_schema.constants import DIR2DICO
+from agriphyto_schema.data.ods_reader import read_ods_sheets
+from agriphyto_schema.data.sheet_cache import load_snapshot, save_snapshot
+
+logger = getLogger(__name__)
+
+EXCEL_ENGINES = ["pandas", "ods_stream"]
+
+SheetRequest = tuple[str, int, list[str] | None]
+
+
+class WorkbookSession:
+    """
+    Read the sheets of a raw Excel/ODS data dictionary, opening it at most once.
+
+    Parameters
+    ----------
+    filepath2dico : str | Path
+        The path to the data dictionary file, relative to DIR2DICO.
+    engine : str, optional
+        "pandas" to read the sheets with one `pd.ExcelFile` or "ods_stream" to
+        read them with the streaming .ods reader of
+        `agriphyto_schema.data.ods_reader`, by default "pandas".
+    use_cache : bool, optional
+        Whether to read from and write to the snapshot cache, by default True.
+    """
+
+    def __init__(
+        self,
+        filepath2dico: str | Path,
+        engine: str = "pandas",
+        use_cache: bool = True,
+    ):
+        if engine not in EXCEL_ENGINES:
+            msg = f"Accepted engines: {EXCEL_ENGINES}. Got {engine}"
+            raise ValueError(msg)
+        self.filepath2dico = filepath2dico
+        self.path2raw = DIR2DICO / filepath2dico
+        if engine == "ods_stream" and self.path2raw.suffix != ".ods":
+            msg = f"The ods_stream engine only reads .ods files. Got {self.path2raw}"
+            raise ValueError(msg)
+        self.engine = engine
+        self.use_cache = use_cache
+        self._excel_file: pd.ExcelFile | None = None
+        self._sheets: dict[tuple, pd.DataFrame] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+
+    @staticmethod
+    def _key(sheet_name: str, skiprows: int, usecols: list[str] | None):
+        return (sheet_name, skiprows, tuple(usecols) if usecols else None)
+
+    def prefetch(self, sheets: list[SheetRequest]) -> None:
+        """
+        Read several sheets at once. With the ods_stream engine, all the sheets
+        missing from the cache are read in a single pass over the file.
+
+        Parameters
+        ----------
+        sheets : list[tuple[str, int, list[str] | None]]
+            One (sheet_name, skiprows, usecols) triplet per sheet, see `read`.
+        """
+        missing_sheets = []
+        missing_keys = set()
+        for sheet_name, skiprows, usecols in sheets:
+            key = self._key(sheet_name, skiprows, usecols)
+            if key in self._sheets or key in missing_keys:
+                continue
+            snapshot = None
+            if self.use_cache:
+                snapshot = load_snapshot(
+                    self.filepath2dico,
+                    sheet_name,
+                    skiprows,
+                    usecols,
+                    self.engine,
+                )
+            if snapshot is not None:
+                self._sheets[key] = snapshot
+            else:
+                missing_sheets.append((sheet_name, skiprows, usecols))
+                missing_keys.add(key)
+        if len(missing_sheets) == 0:
+            return
+
+        if self.engine == "ods_stream":
+            logger.info(
+                f"Reading sheets {[sheet[0] for sheet in missing_sheets]} of {self.filepath2dico}"
+            )
+            frames = read_ods_sheets(self.path2raw, missing_sheets)
+        else:
+            if self._excel_file is None:
+                logger.info(f"Opening {self.filepath2dico}")
+                self._excel_file = pd.ExcelFile(self.path2raw)
+            frames = [
+                self._excel_file.parse(sheet_name, skiprows=skiprows)
+                for sheet_name, skiprows, _ in missing_sheets
+            ]
+        for (sheet_name, skiprows, usecols), frame in zip(
+            missing_sheets, frames, strict=True
+        ):
+            self._sheets[self._key(sheet_name, skiprows, usecols)] = frame
+            if self.use_cache:
+                save_snapshot(
+                    frame,
+                    self.filepath2dico,
+                    sheet_name,
+                    skiprows,
+                    usecols,
+                    self.engine,
+                )
+
+    def read(
+        self,
+        sheet_name: str,
+        skiprows: int = 0,
+        usecols: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Read a sheet of the data dictionary.
+
+        Parameters
+        ----------
+        sheet_name : str
+            The name of the sheet to read.
+        skiprows : int, optional
+            The number of rows to skip before the header, by default 0.
+        usecols : list[str] | None, optional
+            The columns to keep, by default all. Only used by the ods_stream engine
+            which does not decode the other columns, the pandas engine always
+            returns all the columns.
+
+        Returns
+        -------
+        pd.DataFrame
+            A copy of the sheet content, as returned by `pd.read_excel`, that the
+            caller is free to modify.
+        """
+        key = self._key(sheet_name, skiprows, usecols)
+        if key not in self._sheets:
+            self.prefetch([(sheet_name, skiprows, usecols)])
+        return self._sheets[key].copy()
@@ -1,9 +1,15 @@
+import hashlib
 import json
+import unicodedata
 from pathlib import Path
 
 import pandera.pandas as pa
 
-from agriphyto_schema.constants import AVAILABLE_DICOS
+from agriphyto_schema.constants import (
+    AVAILABLE_DICOS,
+    REGEX_METACHARACTERS,
+    SEARCH_SEPARATOR,
+)
 
 
 # Workaround to save/load pandera schema with metadata
@@ -15,13 +21,28 @@ def pandera_to_json(schema: pa.DataFrameSchema, schema_path: Path):
             metadata["description"] = col.description
         col.description = json.dumps(metadata)
         schema.columns[col.name] = col
+    write_pandera_json(schema, schema_path)
+
+
+def write_pandera_json(schema: pa.DataFrameSchema, schema_path: Path):
+    """
+    Write a pandera schema whose metadata are already in the description fields,
+    see `pandera_to_json`.
+    """
     with open(schema_path, "w", encoding="utf-8") as f:
         f.write(schema.to_json(indent=4, ensure_ascii=False))
 
 
 def pandera_from_json(schema_path: Path):
     schema = pa.DataFrameSchema.from_json(schema_path)
-    # move description fields into metadata
+    return description_to_metadata(schema)
+
+
+def description_to_metadata(schema: pa.DataFrameSchema) -> pa.DataFrameSchema:
+    """
+    Move the metadata stored in the description fields of a schema loaded from
+    JSON back into the metadata of its columns, see `pandera_to_json`.
+    """
     for col in schema.columns.values():
         if col.description:
             metadata = json.loads(col.description)
@@ -33,6 +54,14 @@ def pandera_from_json(schema_path: Path):
     return schema
 
 
+def file_sha256(path: Path) -> str:
+    """
+    Compute the sha256 hex digest of a file content.
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
 def check_db_name(db_name: str) -> None:
     """
     Check if the provided db_name is in AVAILABLE_DICOS.
@@ -49,3 +78,30 @@ def check_db_name(db_name: str) -> None:
     if db_name not in AVAILABLE_DICOS:
         msg = f"Accepted db_name: {list(AVAILABLE_DICOS.keys())}. Got {db_name}"
         raise ValueError(msg)
+
+
+def fold(text: str) -> str:
+    """Lowercase a text and remove its accents, eg. "Élevé" -> "eleve"."""
+    return "".join(
+        char
+        for char in unicodedata.normalize("NFKD", text.lower())
+        if not unicodedata.combining(char)
+    )
+
+
+def literal_query(query: str) -> str | None:
+    """
+    Translate a search query into the folded substring searched in the documents
+    delimited by SEARCH_SEPARATOR, or None if it is a regular expression other
+    than an anchored literal.
+    """
+    is_prefix = query.startswith("^")
+    is_suffix = query.endswith("$") and not query.endswith("\\$")
+    literal = query[int(is_prefix) : len(query) - int(is_suffix)]
+    if REGEX_METACHARACTERS & set(literal):
+        return None
+    return (
+        SEARCH_SEPARATOR * is_prefix
+        + fold(literal)
+        + SEARCH_SEPARATOR * is_suffix
+    )
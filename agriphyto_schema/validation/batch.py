@@ -0,0 +1,312 @@
+"""
+Batch validation of the tables of a data delivery in a pool of processes.
+
+A delivery holds one data file per table (eg. `RA_2020/<table>.csv`).
+`validate_files` maps each file to the schema of its table and validates the
+files concurrently with `validate_file`. The validations are admitted against a
+memory budget: each one is charged the estimated memory of its chunks (see
+`estimate_validation_memory`) and is only started when the running validations
+leave room for it, so that the big tables do not run together while the small
+ones keep the other workers busy.
+"""
+
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from logging import getLogger
+from pathlib import Path
+
+from agriphyto_schema.constants import (
+    VALIDATION_BYTES_PER_CELL,
+    VALIDATION_CHUNKSIZE,
+    VALIDATION_MEMORY_BUDGET_MB,
+)
+from agriphyto_schema.validation.result_cache import (
+    load_report,
+    report_key,
+    save_report,
+)
+from agriphyto_schema.validation.validate import (
+    DATA_FORMATS,
+    ValidationReport,
+    infer_data_format,
+    list_schema_names,
+    validate_file,
+)
+
+logger = getLogger(__name__)
+
+# number of bytes read from the start of a csv file to estimate its row count
+CSV_SAMPLE_SIZE = 2**20
+
+
+def list_data_files(paths: list[Path]) -> list[Path]:
+    """
+    List the data files to validate, looking for csv and parquet files in the
+    given directories.
+    """
+    data_files = []
+    for path in paths:
+        if path.is_dir():
+            data_files.extend(
+                sorted(
+                    child
+                    for child in path.iterdir()
+                    if child.suffix.lower() in DATA_FORMATS
+                )
+            )
+        else:
+            data_files.append(path)
+    return data_files
+
+
+def path2failures(dir2failures: Path, path2data: Path, root: Path) -> Path:
+    """
+    Path of the failure cases of a data file, mirroring the path of the file
+    relative to the delivery root so that the tables of the same name in
+    different directories (eg. `2020/ra.csv` and `2021/ra.csv`) do not
+    overwrite each other's failures.
+    """
+    relative = path2data.relative_to(root)
+    return dir2failures / relative.parent / f"{relative.stem}_failures.csv"
+
+
+def match_schema(
+    path2data: Path, schema_names: list[str], db_name: str | None = None
+) -> str:
+    """
+    Find the schema of a data file from its name, either `<db>__<table>` or
+    `<table>`, case insensitively.
+
+    Parameters
+    ----------
+    path2data : Path
+        The data file, eg. `RA_2020/<table>.csv`.
+    schema_names : list[str]
+        The names of the available schemas, `<db_name>__<table_name>`.
+    db_name : str | None, optional
+        The database of the file, by default looked for in all the databases.
+
+    Raises
+    ------
+    ValueError
+        If no schema or several schemas match the file.
+    """
+    if db_name is not None:
+        schema_names = [
+            name for name in schema_names if name.startswith(f"{db_name}__")
+        ]
+    stem = path2data.stem.lower()
+    candidates = [
+        name
+        for name in schema_names
+        if stem in (name.lower(), name.split("__", 1)[-1].lower())
+    ]
+    if len(candidates) != 1:
+        msg = f"Expected one schema for {path2data}. Got {candidates}"
+        raise ValueError(msg)
+    return candidates[0]
+
+
+def estimate_validation_memory(
+    path2data: Path,
+    chunksize: int = VALIDATION_CHUNKSIZE,
+    data_format: str | None = None,
+    sep: str = ",",
+) -> int:
+    """
+    Estimate the peak memory, in bytes, of the chunked validation of a file.
+
+    The memory of a validation is proportional to the number of cells of a
+    chunk. The number of rows and columns are read from the footer of parquet
+    files; for csv files they are estimated from the header and the mean length
+    of the first lines.
+    """
+    data_format = data_format or infer_data_format(path2data)
+    if data_format == "parquet":
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_metadata(path2data)
+        n_rows, n_columns = metadata.num_rows, metadata.num_columns
+    else:
+        with open(path2data, "rb") as f:
+            sample = f.read(CSV_SAMPLE_SIZE)
+        header = sample.split(b"\n", 1)[0].decode(errors="replace")
+        n_columns = header.count(sep) + 1
+        n_lines = sample.count(b"\n")
+        file_size = path2data.stat().st_size
+        if file_size <= len(sample):
+            n_rows = max(n_lines - 1, 0)
+        else:
+            n_rows = int(file_size * n_lines / len(sample))
+    return min(n_rows, chunksize) * n_columns * VALIDATION_BYTES_PER_CELL
+
+
+def map_with_memory_budget(
+    func: Callable,
+    jobs: list[tuple[tuple, int]],
+    max_workers: int,
+    memory_budget: int,
+) -> Iterator[tuple[tuple, object]]:
+    """
+    Run jobs in a pool of processes without exceeding a memory budget.
+
+    The jobs are admitted from the largest to the smallest: a job is started
+    when a worker is free and the memory of the running jobs plus its own fits
+    in the budget. A job larger than the whole budget runs alone.
+
+    Parameters
+    ----------
+    func : Callable
+        The function run by the workers, it must be picklable.
+    jobs : list[tuple[tuple, int]]
+        The (arguments of func, estimated memory in bytes) of each job.
+    max_workers : int
+        The number of worker processes.
+    memory_budget : int
+        The memory, in bytes, that the running jobs can use together.
+
+    Yields
+    ------
+    tuple[tuple, object]
+        The arguments and the result of each job, as they complete.
+    """
+    pending = sorted(jobs, key=lambda job: job[1], reverse=True)
+    running = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            used_memory = sum(memory for _, memory in running.values())
+            for job in list(pending):
+                if len(running) == max_workers:
+                    break
+                args, memory = job
+                if running and used_memory + memory > memory_budget:
+                    continue
+                if memory > memory_budget:
+                    logger.warning(
+                        f"Job {args} needs {memory / 2**20:.0f}MB, more than "
+                        f"the budget of {memory_budget / 2**20:.0f}MB: running "
+                        "it alone"
+                    )
+                running[executor.submit(func, *args)] = job
+                used_memory += memory
+                pending.remove(job)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                args, _ = running.pop(future)
+                # re-raise the worker exception if any
+                yield args, future.result()
+
+
+def validate_files(
+    paths: list[Path],
+    db_name: str | None = None,
+    jobs: int = 1,
+    memory_budget_mb: int = VALIDATION_MEMORY_BUDGET_MB,
+    chunksize: int = VALIDATION_CHUNKSIZE,
+    sep: str = ",",
+    dir2failures: Path | None = None,
+    check_nomenclatures: bool = True,
+    use_cache: bool = True,
+) -> list[ValidationReport]:
+    """
+    Validate the data files of a delivery against the schemas of their tables.
+
+    Parameters
+    ----------
+    paths : list[Path]
+        The csv or parquet files to validate, or directories containing them.
+        Each file is named after its table, see `match_schema`.
+    db_name : str | None, optional
+        The database of the files, by default the schemas of all the databases
+        are considered.
+    jobs : int, optional
+        The number of worker processes, by default 1 (validate sequentially in
+        the current process).
+    memory_budget_mb : int, optional
+        The memory, in MB, that the concurrent validations can use together, by
+        default VALIDATION_MEMORY_BUDGET_MB.
+    chunksize : int, optional
+        The number of rows validated at once in each file, by default
+        VALIDATION_CHUNKSIZE.
+    sep : str, optional
+        The field separator of csv files, by default ",".
+    dir2failures : Path | None, optional
+        The directory where the failure cases of each file are streamed, to
+        `<file stem>_failures.csv` under the directory of the file relative to
+        the deepest directory containing all the files, by default None (kept
+        in memory).
+    check_nomenclatures : bool, optional
+        Whether to check the codes of the columns having a nomenclature, by
+        default True.
+    use_cache : bool, optional
+        Whether to reuse the cached reports of the unchanged files and to cache
+        the new ones (see `agriphyto_schema.validation.result_cache`), by
+        default True. The cached reports are not used when the failure cases are
+        streamed to dir2failures.
+
+    Returns
+    -------
+    list[ValidationReport]
+        The reports of the files, in the order of `list_data_files(paths)`.
+    """
+    schema_names = list_schema_names()
+    data_files = list_data_files(paths)
+    # the deepest directory containing all the files
+    root = (
+        Path(os.path.commonpath([path.resolve().parent for path in data_files]))
+        if data_files
+        else Path()
+    )
+    # match all the files before validating any, to fail early
+    reports = {}
+    keys = {}
+    validations = []
+    for path2data in data_files:
+        schema_name = match_schema(path2data, schema_names, db_name)
+        if use_cache:
+            keys[path2data] = report_key(
+                schema_name, path2data, None, sep, check_nomenclatures
+            )
+            if dir2failures is None:
+                report = load_report(keys[path2data])
+                if report is not None:
+                    logger.info(f"Loaded the report of {path2data} from cache")
+                    reports[path2data] = report
+                    continue
+        path2file_failures = (
+            path2failures(dir2failures, path2data.resolve(), root)
+            if dir2failures is not None
+            else None
+        )
+        # arguments of validate_file, the row groups of parquet files are
+        # validated sequentially by each worker
+        args = (
+            schema_name,
+            path2data,
+            chunksize,
+            None,
+            sep,
+            1,
+            path2file_failures,
+            check_nomenclatures,
+        )
+        memory = estimate_validation_memory(path2data, chunksize, sep=sep)
+        validations.append((args, memory))
+    if jobs == 1:
+        new_reports = {args[1]: validate_file(*args) for args, _ in validations}
+    else:
+        new_reports = {
+            args[1]: report
+            for args, report in map_with_memory_budget(
+                validate_file,
+                validations,
+                max_workers=jobs,
+                memory_budget=memory_budget_mb * 2**20,
+            )
+        }
+    if use_cache:
+        for path2data, report in new_reports.items():
+            save_report(keys[path2data], report)
+    reports.update(new_reports)
+    return [reports[path2data] for path2data in data_files]
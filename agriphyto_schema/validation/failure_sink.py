@@ -0,0 +1,290 @@
+"""
+Bounded reporting of the failure cases of a validation.
+
+A badly typed file can fail on every row of every column: the failure cases
+returned by pandera for the whole file would then be larger than the data.
+A `FailureSink` receives the failure cases chunk by chunk and only keeps in
+memory:
+
+- the number of failure cases per column and check,
+- a uniform sample of at most `n_examples` failure cases (reservoir sampling).
+
+All the failure cases can also be streamed to a JSON lines, parquet or csv
+file, written as the chunks are validated. The sinks of worker processes are
+merged into the sink of the validation with `FailureSink.merge`.
+"""
+
+from collections import Counter
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agriphyto_schema.constants import FAILURE_EXAMPLES_SIZE
+
+FAILURE_CASE_COLUMNS = [
+    "schema_context",
+    "column",
+    "check",
+    "check_number",
+    "failure_case",
+    "index",
+]
+
+FAILURE_FILE_FORMATS = {
+    ".jsonl": "jsonl",
+    ".parquet": "parquet",
+    ".csv": "csv",
+}
+
+
+def normalize_failure_cases(failure_cases: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give the failure cases the same types in every chunk: the failed values are
+    converted to strings and the check numbers and row positions to nullable
+    integers.
+    """
+    failure_cases = failure_cases[FAILURE_CASE_COLUMNS]
+    return pd.DataFrame({
+        "schema_context": failure_cases["schema_context"].astype(str),
+        "column": failure_cases["column"].astype(str),
+        "check": failure_cases["check"].astype(str),
+        "check_number": pd.to_numeric(failure_cases["check_number"]).astype(
+            "Int64"
+        ),
+        "failure_case": failure_cases["failure_case"]
+        .astype(str)
+        .where(failure_cases["failure_case"].notna()),
+        "index": pd.to_numeric(failure_cases["index"]).astype("Int64"),
+    })
+
+
+class FailureSink:
+    """
+    Count, sample and optionally write the failure cases of a validation.
+
+    Parameters
+    ----------
+    path2failures : Path | None, optional
+        The file where all the failure cases are written, in the format given
+        by its suffix (.jsonl, .parquet or .csv), by default None (only the
+        counts and the sample are kept).
+    n_examples : int, optional
+        The maximal number of failure cases kept in memory, by default
+        FAILURE_EXAMPLES_SIZE.
+    seed : int, optional
+        The seed of the reservoir sampling, by default 0.
+    """
+
+    def __init__(
+        self,
+        path2failures: Path | None = None,
+        n_examples: int = FAILURE_EXAMPLES_SIZE,
+        seed: int = 0,
+    ):
+        self.path2failures = path2failures
+        self.n_examples = n_examples
+        self.n_failure_cases = 0
+        self.counts: Counter[tuple[str, str]] = Counter()
+        self._examples: list[dict] = []
+        self._rng = np.random.default_rng(seed)
+        self._parquet_writer = None
+        self.file_format = None
+        if path2failures is not None:
+            self.file_format = FAILURE_FILE_FORMATS.get(path2failures.suffix)
+            if self.file_format is None:
+                msg = f"Accepted failure files: {list(FAILURE_FILE_FORMATS)}. Got {path2failures}"
+                raise ValueError(msg)
+            path2failures.parent.mkdir(parents=True, exist_ok=True)
+            # the file is appended chunk by chunk
+            path2failures.unlink(missing_ok=True)
+
+    def write(self, failure_cases: pd.DataFrame) -> None:
+        """
+        Record the failure cases of a chunk, as in
+        `pandera.errors.SchemaErrors.failure_cases`.
+        """
+        if len(failure_cases) == 0:
+            return
+        failure_cases = normalize_failure_cases(failure_cases)
+        self.counts.update(
+            failure_cases
+            .groupby(["column", "check"], sort=False)
+            .size()
+            .to_dict()
+        )
+        self._sample(failure_cases)
+        self.n_failure_cases += len(failure_cases)
+        if self.path2failures is not None:
+            self._append(failure_cases)
+
+    def _sample(self, failure_cases: pd.DataFrame) -> None:
+        """
+        Update the sample of the failure cases with the reservoir algorithm: the
+        i-th failure case replaces a random example with probability
+        n_examples / i.
+        """
+        n_filling = min(
+            self.n_examples - len(self._examples), len(failure_cases)
+        )
+        self._examples.extend(failure_cases.iloc[:n_filling].to_dict("records"))
+        if n_filling == len(failure_cases):
+            return
+        # 1-based rank of each remaining failure case among all the seen ones
+        ranks = np.arange(
+            self.n_failure_cases + n_filling + 1,
+            self.n_failure_cases + len(failure_cases) + 1,
+        )
+        slots = self._rng.integers(0, ranks)
+        is_kept = slots < self.n_examples
+        kept = failure_cases.iloc[n_filling:].loc[is_kept].to_dict("records")
+        for slot, example in zip(slots[is_kept], kept, strict=True):
+            self._examples[slot] = example
+
+    def _append(self, failure_cases: pd.DataFrame) -> None:
+        if self.file_format == "jsonl":
+            with open(self.path2failures, "a", encoding="utf-8") as f:
+                failure_cases.to_json(
+                    f, orient="records", lines=True, force_ascii=False
+                )
+        elif self.file_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(failure_cases, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(
+                    self.path2failures, table.schema
+                )
+            self._parquet_writer.write_table(table)
+        else:
+            failure_cases.to_csv(
+                self.path2failures,
+                mode="a",
+                header=not self.path2failures.exists(),
+                index=False,
+            )
+
+    def merge(self, other: "FailureSink") -> None:
+        """
+        Record the failure cases of another closed sink, eg. filled by a worker
+        process: its counts are added, the samples are merged into a uniform
+        sample of all the failure cases, and its failure file, if any, is
+        appended to the failure file of this sink batch by batch, then removed.
+        """
+        self.counts.update(other.counts)
+        n_failure_cases = self.n_failure_cases + other.n_failure_cases
+        if n_failure_cases <= self.n_examples:
+            self._examples.extend(other._examples)
+        elif other.n_failure_cases > 0:
+            # number of the sampled failure cases drawn from this sink
+            n_kept = self._rng.hypergeometric(
+                self.n_failure_cases, other.n_failure_cases, self.n_examples
+            )
+            kept = self._rng.choice(len(self._examples), n_kept, replace=False)
+            other_kept = self._rng.choice(
+                len(other._examples), self.n_examples - n_kept, replace=False
+            )
+            self._examples = [self._examples[i] for i in kept] + [
+                other._examples[i] for i in other_kept
+            ]
+        self.n_failure_cases = n_failure_cases
+        if other.path2failures is None:
+            return
+        if self.path2failures is not None:
+            for failure_cases in iter_failure_cases(other.path2failures):
+                if len(failure_cases) > 0:
+                    self._append(failure_cases)
+        other.path2failures.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """
+        Finish writing the failure file. An empty file is written if there was
+        no failure case.
+        """
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if self.path2failures is not None and not self.path2failures.exists():
+            self._append(
+                normalize_failure_cases(
+                    pd.DataFrame(columns=FAILURE_CASE_COLUMNS)
+                )
+            )
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+                self._parquet_writer = None
+
+    @property
+    def examples(self) -> pd.DataFrame:
+        """
+        The sample of the failure cases, all the failure cases if there are at
+        most n_examples.
+        """
+        return normalize_failure_cases(
+            pd.DataFrame(self._examples, columns=FAILURE_CASE_COLUMNS)
+        )
+
+    def count_table(self) -> pd.DataFrame:
+        """The number of failure cases per column and check, decreasing."""
+        if len(self.counts) == 0:
+            return pd.DataFrame(columns=["column", "check", "n_failure_cases"])
+        return (
+            pd
+            .Series(self.counts, name="n_failure_cases", dtype="int64")
+            .rename_axis(["column", "check"])
+            .sort_values(ascending=False)
+            .reset_index()
+        )
+
+
+def iter_failure_cases(
+    path2failures: Path, chunksize: int = 100_000
+) -> Iterator[pd.DataFrame]:
+    """Read the failure cases written by a `FailureSink` by chunks of rows."""
+    file_format = FAILURE_FILE_FORMATS.get(path2failures.suffix)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        with pq.ParquetFile(path2failures) as parquet_file:
+            for batch in parquet_file.iter_batches(batch_size=chunksize):
+                yield normalize_failure_cases(batch.to_pandas())
+    elif file_format == "csv":
+        with pd.read_csv(
+            path2failures, dtype=str, chunksize=chunksize
+        ) as reader:
+            for failure_cases in reader:
+                yield normalize_failure_cases(failure_cases)
+    elif file_format == "jsonl":
+        with pd.read_json(
+            path2failures,
+            orient="records",
+            lines=True,
+            dtype=False,
+            chunksize=chunksize,
+        ) as reader:
+            for failure_cases in reader:
+                yield normalize_failure_cases(failure_cases)
+    else:
+        msg = f"Accepted failure files: {list(FAILURE_FILE_FORMATS)}. Got {path2failures}"
+        raise ValueError(msg)
+
+
+def read_failure_cases(path2failures: Path) -> pd.DataFrame:
+    """Read the failure cases written by a `FailureSink`."""
+    file_format = FAILURE_FILE_FORMATS.get(path2failures.suffix)
+    if file_format == "jsonl":
+        failure_cases = pd.read_json(
+            path2failures, orient="records", lines=True, dtype=False
+        )
+        if len(failure_cases) == 0:
+            failure_cases = pd.DataFrame(columns=FAILURE_CASE_COLUMNS)
+    elif file_format == "parquet":
+        failure_cases = pd.read_parquet(path2failures)
+    elif file_format == "csv":
+        failure_cases = pd.read_csv(path2failures, dtype=str)
+    else:
+        msg = f"Accepted failure files: {list(FAILURE_FILE_FORMATS)}. Got {path2failures}"
+        raise ValueError(msg)
+    return normalize_failure_cases(failure_cases)
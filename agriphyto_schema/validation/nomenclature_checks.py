@@ -0,0 +1,225 @@
+"""
+Compilation of the nomenclatures into membership checks on the schema columns.
+
+The stored schemas only reference the nomenclature of a column in its metadata
+(`{"nomenclature": "<table>__<variable>"}`), the allowed codes live in the
+nomenclature partition of the database (see
+`agriphyto_schema.data.nomenclature_store`). `compile_schema` loads a schema and
+attaches to each such column a vectorized check of its codes:
+
+- the numeric columns whose codes are integers within a small range (eg.
+  department numbers) are checked with a boolean lookup table indexed by the
+  value minus the smallest code,
+- the other columns are checked with `Series.isin`, which hashes the codes.
+
+Both are vectorized: the lookup table is about twice as fast as `Series.isin`
+on an int64 column (0.17s vs 0.29s for 10M rows).
+
+Only the nomenclatures listing codes are checked. Many nomenclatures of the
+dictionaries only describe the values of their column: a single modality whose
+code is its label (eg. "Code officiel géographique - <a href=...>"), or
+"codes" such as "1 à 360" or "0 ou vide". Checking them would reject valid
+values, so the nomenclatures having a code longer than
+NOMENCLATURE_CODE_MAX_LENGTH or containing spaces are skipped.
+
+The compiled schemas are cached, keyed on the modification times of the schema
+file and of the nomenclature partition, so that repeated validations of a table
+do not rebuild them.
+"""
+
+import copy
+import functools
+from logging import getLogger
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pandera.pandas as pa
+
+from agriphyto_schema.constants import (
+    CODE_LOOKUP_MAX_RANGE,
+    COLNAME_CODE,
+    COLNAME_LIBELLE,
+    COLNAME_VARIABLE,
+    COMPILED_SCHEMA_CACHE_SIZE,
+    NOMENCLATURE_CODE_MAX_LENGTH,
+)
+from agriphyto_schema.data.nomenclature_store import (
+    path2partition,
+    read_nomenclatures,
+)
+from agriphyto_schema.data.schema_registry import schema_registry
+
+logger = getLogger(__name__)
+
+NUMERIC_DTYPES = ["int64", "float64"]
+STRING_DTYPES = ["string[python]", "str", "object"]
+
+
+def isin_codes(series: pd.Series, codes: np.ndarray) -> pd.Series:
+    """Check that the values of a string column are codes of its nomenclature."""
+    return series.isin(codes)
+
+
+def isin_code_range(
+    series: pd.Series, is_code: np.ndarray, min_code: int
+) -> pd.Series:
+    """
+    Check that the values of a numeric column are codes of its nomenclature,
+    given as a lookup table: `is_code[value - min_code]` is True for the codes.
+    """
+    offsets = series.to_numpy(dtype="float64", na_value=np.nan) - min_code
+    in_range = (
+        (offsets >= 0) & (offsets < len(is_code)) & (offsets == offsets.round())
+    )
+    isin = np.zeros(len(offsets), dtype=bool)
+    isin[in_range] = is_code[offsets[in_range].astype("int64")]
+    return pd.Series(isin, index=series.index)
+
+
+def nomenclature_check(
+    nomenclature: str, codes: np.ndarray, dtype: str
+) -> pa.Check | None:
+    """
+    Build the membership check of a column given the codes of its nomenclature.
+
+    Parameters
+    ----------
+    nomenclature : str
+        The nomenclature key, `<table>__<variable>`.
+    codes : np.ndarray
+        The codes of the nomenclature, as strings.
+    dtype : str
+        The dtype of the column.
+
+    Returns
+    -------
+    pa.Check | None
+        The check, or None if the column dtype cannot hold codes (eg. bool) or
+        if no code fits a numeric column.
+    """
+    if dtype in STRING_DTYPES:
+        check_fn = functools.partial(isin_codes, codes=np.unique(codes))
+    elif dtype in NUMERIC_DTYPES:
+        numeric_codes = pd.to_numeric(pd.Series(codes), errors="coerce")
+        numeric_codes = np.unique(numeric_codes[numeric_codes.notna()])
+        is_integer = numeric_codes == numeric_codes.round()
+        if dtype == "int64":
+            numeric_codes = numeric_codes[is_integer]
+        if len(numeric_codes) == 0:
+            logger.debug(f"No {dtype} code in the nomenclature {nomenclature}")
+            return None
+        code_range = numeric_codes[-1] - numeric_codes[0] + 1
+        if is_integer.all() and code_range <= CODE_LOOKUP_MAX_RANGE:
+            min_code = int(numeric_codes[0])
+            is_code = np.zeros(int(code_range), dtype=bool)
+            is_code[numeric_codes.astype("int64") - min_code] = True
+            check_fn = functools.partial(
+                isin_code_range, is_code=is_code, min_code=min_code
+            )
+        else:
+            check_fn = functools.partial(
+                isin_codes, codes=numeric_codes.astype(dtype)
+            )
+    else:
+        return None
+    return pa.Check(
+        check_fn, name="nomenclature", error=f"nomenclature {nomenclature}"
+    )
+
+
+def is_code_list(codes: pd.Series, labels: pd.Series) -> bool:
+    """
+    Return whether the modalities of a nomenclature list codes that can be
+    checked on the data, rather than describing the values of the column.
+    """
+    if len(codes) == 1 and codes.iloc[0] == labels.iloc[0]:
+        return False
+    codes = codes.str.strip()
+    return bool(
+        (codes.str.len() <= NOMENCLATURE_CODE_MAX_LENGTH).all()
+        and not codes.str.contains(r"\s").any()
+    )
+
+
+def _mtime_ns(path: Path) -> int | None:
+    return path.stat().st_mtime_ns if path.exists() else None
+
+
+@functools.lru_cache(maxsize=COMPILED_SCHEMA_CACHE_SIZE)
+def _nomenclature_codes(
+    db_name: str, mtime_ns: int | None
+) -> dict[str, np.ndarray]:
+    nomenclatures = read_nomenclatures([db_name])
+    codes_by_nomenclature = {
+        nomenclature: modalities[COLNAME_CODE].to_numpy()
+        for nomenclature, modalities in nomenclatures.groupby(
+            COLNAME_VARIABLE, sort=False
+        )
+        if is_code_list(modalities[COLNAME_CODE], modalities[COLNAME_LIBELLE])
+    }
+    logger.debug(
+        f"{len(codes_by_nomenclature)} nomenclatures of {db_name} list codes, "
+        f"{nomenclatures[COLNAME_VARIABLE].nunique() - len(codes_by_nomenclature)}"
+        " only describe their values"
+    )
+    return codes_by_nomenclature
+
+
+def nomenclature_codes(db_name: str) -> dict[str, np.ndarray]:
+    """
+    Return the codes of each nomenclature of a database listing codes (see
+    `is_code_list`), as strings, keyed by `<table>__<variable>`. The codes are
+    cached until the partition changes.
+    """
+    return _nomenclature_codes(db_name, _mtime_ns(path2partition(db_name)))
+
+
+@functools.lru_cache(maxsize=COMPILED_SCHEMA_CACHE_SIZE)
+def _compile_schema(
+    schema_name: str, schema_mtime_ns: int, nomenclature_mtime_ns: int | None
+) -> pa.DataFrameSchema:
+    # the checks are added to a copy of the schema shared by the registry
+    schema = copy.deepcopy(schema_registry.get(schema_name))
+    codes_by_nomenclature = nomenclature_codes(schema_name.split("__")[0])
+    n_checks = 0
+    for column in schema.columns.values():
+        nomenclature = (column.metadata or {}).get("nomenclature")
+        if nomenclature not in codes_by_nomenclature:
+            continue
+        check = nomenclature_check(
+            nomenclature,
+            codes_by_nomenclature[nomenclature],
+            str(column.dtype),
+        )
+        if check is not None:
+            column.checks.append(check)
+            n_checks += 1
+    logger.debug(f"Compiled {n_checks} nomenclature checks for {schema_name}")
+    return schema
+
+
+def compile_schema(schema_name: str) -> pa.DataFrameSchema:
+    """
+    Load the schema of a table with the membership checks of its nomenclatures.
+
+    Parameters
+    ----------
+    schema_name : str
+        The name of the schema in DIR2SCHEMA, `<db_name>__<table_name>`.
+
+    Returns
+    -------
+    pa.DataFrameSchema
+        The cached compiled schema, shared by the callers: it must not be
+        modified.
+    """
+    path2schema = schema_registry.path(schema_name)
+    if not path2schema.exists():
+        msg = f"No schema {schema_name} in {schema_registry.dir2schema}"
+        raise ValueError(msg)
+    return _compile_schema(
+        schema_name,
+        path2schema.stat().st_mtime_ns,
+        _mtime_ns(path2partition(schema_name.split("__")[0])),
+    )
@@ -0,0 +1,272 @@
+"""
+Out-of-core validation of parquet files against the schemas of DIR2SCHEMA.
+
+The row groups of a parquet file can be read independently: `validate_parquet`
+validates them in a pool of processes, each worker reading its row group by
+batches of rows and only the columns declared in the schema. The table is never
+materialized as a whole.
+
+Each worker passes the failure cases of its batches to its own `FailureSink`,
+which only keeps their counts and a bounded sample, and streams them to a part
+file when the failure cases are written to disk. The sinks are merged into the
+report as the row groups complete, so that the failure cases of a badly typed
+row group are never held in memory nor sent back from the worker.
+
+The columns of the file absent from the schema are not read: they are reported
+from the parquet footer with the same failure case as a strict pandera schema,
+as are the missing required columns, even if the file has no row group.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logging import getLogger
+from pathlib import Path
+
+import pandas as pd
+import pandera.pandas as pa
+import pyarrow.parquet as pq
+
+from agriphyto_schema.constants import (
+    FAILURE_EXAMPLES_SIZE,
+    VALIDATION_CHUNKSIZE,
+)
+from agriphyto_schema.validation.failure_sink import (
+    FAILURE_CASE_COLUMNS,
+    FailureSink,
+    normalize_failure_cases,
+)
+from agriphyto_schema.validation.validate import (
+    ValidationReport,
+    load_schema,
+    validate_chunk,
+)
+
+logger = getLogger(__name__)
+
+
+def extra_columns_failures(
+    schema: pa.DataFrameSchema, columns: list[str]
+) -> pd.DataFrame | None:
+    """
+    Report the columns of a file that are not in a strict schema, as pandera
+    does when validating the full table.
+    """
+    extra_columns = [
+        column for column in columns if column not in schema.columns
+    ]
+    if not schema.strict or len(extra_columns) == 0:
+        return None
+    return pd.DataFrame({
+        "schema_context": "DataFrameSchema",
+        "column": schema.name,
+        "check": "column_in_schema",
+        "check_number": None,
+        "failure_case": extra_columns,
+        "index": None,
+    })
+
+
+def missing_columns_failures(
+    schema: pa.DataFrameSchema, columns: list[str]
+) -> pd.DataFrame | None:
+    """
+    Report the required columns of a schema that are not in a file, as pandera
+    does when validating the full table.
+    """
+    missing_columns = [
+        name
+        for name, column in schema.columns.items()
+        if column.required and name not in columns
+    ]
+    if len(missing_columns) == 0:
+        return None
+    return pd.DataFrame({
+        "schema_context": "DataFrameSchema",
+        "column": schema.name,
+        "check": "column_in_dataframe",
+        "check_number": None,
+        "failure_case": missing_columns,
+        "index": None,
+    })
+
+
+def path2part(path2failures: Path, row_group: int) -> Path:
+    """Return the part file of the failure cases of a row group."""
+    return path2failures.with_name(
+        f"{path2failures.name}.row_group_{row_group}.parquet"
+    )
+
+
+def validate_row_group(
+    schema_name: str,
+    path2parquet: Path,
+    row_group: int,
+    offset: int,
+    columns: list[str],
+    chunksize: int = VALIDATION_CHUNKSIZE,
+    check_nomenclatures: bool = True,
+    path2failures: Path | None = None,
+    n_examples: int = FAILURE_EXAMPLES_SIZE,
+) -> tuple[int, int, FailureSink, pd.DataFrame]:
+    """
+    Validate one row group of a parquet file, by batches of rows.
+
+    Parameters
+    ----------
+    schema_name : str
+        The name of the schema in DIR2SCHEMA, `<db_name>__<table_name>`.
+    path2parquet : Path
+        The parquet file.
+    row_group : int
+        The index of the row group in the file.
+    offset : int
+        The position in the file of the first row of the row group.
+    columns : list[str]
+        The columns to read.
+    chunksize : int, optional
+        The number of rows validated at once, by default VALIDATION_CHUNKSIZE.
+    check_nomenclatures : bool, optional
+        Whether to check the codes of the columns having a nomenclature, by
+        default True.
+    path2failures : Path | None, optional
+        The parquet file where the failure cases of the rows are streamed, by
+        default None.
+    n_examples : int, optional
+        The number of failure cases sampled in memory, by default
+        FAILURE_EXAMPLES_SIZE.
+
+    Returns
+    -------
+    tuple[int, int, FailureSink, pd.DataFrame]
+        The number of rows and of batches of the row group, the closed sink of
+        the failure cases of its rows (indexed by their position in the file)
+        and its failure cases which do not concern a row (eg. a wrong dtype),
+        once each.
+    """
+    schema = load_schema(schema_name, check_nomenclatures)
+    sink = FailureSink(path2failures, n_examples, seed=row_group)
+    schema_failures = normalize_failure_cases(
+        pd.DataFrame(columns=FAILURE_CASE_COLUMNS)
+    )
+    n_rows = n_batches = 0
+    with pq.ParquetFile(path2parquet) as parquet_file:
+        for batch in parquet_file.iter_batches(
+            batch_size=chunksize, row_groups=[row_group], columns=columns
+        ):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(
+                offset + n_rows, offset + n_rows + len(chunk)
+            )
+            n_rows += len(chunk)
+            n_batches += 1
+            failure_cases = validate_chunk(schema, chunk)
+            if failure_cases is None:
+                continue
+            is_row = failure_cases["index"].notna()
+            sink.write(failure_cases[is_row])
+            # the same failures are reported by every batch
+            schema_failures = pd.concat([
+                schema_failures,
+                normalize_failure_cases(failure_cases[~is_row]),
+            ]).drop_duplicates(ignore_index=True)
+    sink.close()
+    return n_rows, n_batches, sink, schema_failures
+
+
+def validate_parquet(
+    schema_name: str,
+    path2parquet: Path,
+    chunksize: int = VALIDATION_CHUNKSIZE,
+    jobs: int = 1,
+    path2failures: Path | None = None,
+    check_nomenclatures: bool = True,
+) -> ValidationReport:
+    """
+    Validate a parquet file row group by row group against the schema of its
+    table, reading only the columns of the schema.
+
+    Parameters
+    ----------
+    schema_name : str
+        The name of the schema in DIR2SCHEMA, `<db_name>__<table_name>`.
+    path2parquet : Path
+        The parquet file to validate.
+    chunksize : int, optional
+        The number of rows validated at once in a row group, by default
+        VALIDATION_CHUNKSIZE.
+    jobs : int, optional
+        The number of worker processes validating the row groups, by default 1
+        (validate sequentially in the current process).
+    path2failures : Path | None, optional
+        The .jsonl, .parquet or .csv file where the failure cases are streamed,
+        by default None (only a sample is kept in memory).
+    check_nomenclatures : bool, optional
+        Whether to check the codes of the columns having a nomenclature, by
+        default True.
+
+    Returns
+    -------
+    ValidationReport
+        The failure cases of all the row groups, indexed by the position of
+        their row in the file.
+    """
+    schema = load_schema(schema_name)
+    report = ValidationReport(schema_name, path2parquet, path2failures)
+    start = time.perf_counter()
+    metadata = pq.read_metadata(path2parquet)
+    arrow_schema = metadata.schema.to_arrow_schema()
+    # the index written by pandas is not a column of the table
+    index_columns = (arrow_schema.pandas_metadata or {}).get(
+        "index_columns", []
+    )
+    file_columns = [
+        column for column in arrow_schema.names if column not in index_columns
+    ]
+    columns = [column for column in file_columns if column in schema.columns]
+    for failure_cases in [
+        missing_columns_failures(schema, file_columns),
+        extra_columns_failures(schema, file_columns),
+    ]:
+        if failure_cases is not None:
+            report.add_failure_cases(failure_cases)
+
+    row_groups = []
+    offset = 0
+    for row_group in range(metadata.num_row_groups):
+        row_groups.append((row_group, offset))
+        offset += metadata.row_group(row_group).num_rows
+
+    def add_row_group(result: tuple[int, int, FailureSink, pd.DataFrame]):
+        n_rows, n_batches, sink, schema_failures = result
+        report.add_failure_cases(schema_failures)
+        report.add_sink(n_rows, n_batches, sink)
+
+    arguments = [
+        (
+            schema_name,
+            path2parquet,
+            row_group,
+            first_row,
+            columns,
+            chunksize,
+            check_nomenclatures,
+            path2part(path2failures, row_group) if path2failures else None,
+            report.sink.n_examples,
+        )
+        for row_group, first_row in row_groups
+    ]
+    if jobs == 1:
+        for row_group_arguments in arguments:
+            add_row_group(validate_row_group(*row_group_arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(validate_row_group, *row_group_arguments)
+                for row_group_arguments in arguments
+            ]
+            for future in as_completed(futures):
+                add_row_group(future.result())
+    report.close()
+    report.elapsed = time.perf_counter() - start
+    logger.info(report.summary())
+    return report
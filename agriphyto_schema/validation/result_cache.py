@@ -0,0 +1,222 @@
+"""
+Persistent cache of the validation reports.
+
+The same unchanged data files are often validated again against the same
+schemas. A report is cached in DIR2VALIDATION_CACHE under a key made of:
+
+- the content hash of the data file,
+- the content hash of the schema file of the table,
+- the content hash of the nomenclature partition of its database, when the
+  nomenclatures are checked,
+- the options changing the result (data format, csv separator),
+- the versions of the validation code (VALIDATION_CACHE_VERSION) and of
+  pandera, so that an upgrade does not load reports checked or pickled by
+  another version.
+
+Editing the schema of a table therefore only invalidates the reports of this
+table. The content hash of a data file is remembered with its modification time
+and size, so that it is only computed again when they change.
+
+The cache is bounded by VALIDATION_CACHE_SIZE_MB: the least recently used
+reports are evicted beyond it (the modification time of a report file is
+refreshed on each hit).
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from logging import getLogger
+from pathlib import Path
+
+import pandera
+
+from agriphyto_schema.constants import (
+    DIR2VALIDATION_CACHE,
+    VALIDATION_CACHE_SIZE_MB,
+    VALIDATION_CACHE_VERSION,
+    VALIDATION_CHUNKSIZE,
+)
+from agriphyto_schema.data.nomenclature_store import path2partition
+from agriphyto_schema.data.schema_registry import schema_registry
+from agriphyto_schema.utils import file_sha256
+from agriphyto_schema.validation.validate import (
+    ValidationReport,
+    validate_file,
+)
+
+logger = getLogger(__name__)
+
+
+def _write_atomic(content: bytes, path: Path) -> None:
+    # write in a temporary file so that a concurrent reader never reads a
+    # partial file
+    path2tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    path2tmp.write_bytes(content)
+    os.replace(path2tmp, path)
+
+
+def data_fingerprint(path2data: Path) -> str:
+    """
+    Return the content hash of a data file, computed again only if its
+    modification time or size changed since the last call.
+    """
+    path2data = path2data.absolute()
+    digest = hashlib.sha256(str(path2data).encode()).hexdigest()[:24]
+    path2fingerprint = DIR2VALIDATION_CACHE / "fingerprints" / f"{digest}.json"
+    stat = path2data.stat()
+    if path2fingerprint.exists():
+        fingerprint = json.loads(path2fingerprint.read_text(encoding="utf-8"))
+        if (fingerprint["mtime_ns"] == stat.st_mtime_ns) and (
+            fingerprint["size"] == stat.st_size
+        ):
+            return fingerprint["sha256"]
+    logger.info(f"Hashing {path2data}")
+    sha256 = file_sha256(path2data)
+    path2fingerprint.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(
+        json.dumps({
+            "path": str(path2data),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": sha256,
+        }).encode(),
+        path2fingerprint,
+    )
+    return sha256
+
+
+def report_key(
+    schema_name: str,
+    path2data: Path,
+    data_format: str | None = None,
+    sep: str = ",",
+    check_nomenclatures: bool = True,
+) -> str:
+    """
+    Return the cache key of the validation of a data file against a schema, see
+    `agriphyto_schema.validation.validate.validate_file` for the parameters.
+    """
+    nomenclature_version = None
+    if check_nomenclatures:
+        path2nomenclatures = path2partition(schema_name.split("__")[0])
+        if path2nomenclatures.exists():
+            nomenclature_version = file_sha256(path2nomenclatures)
+    key = json.dumps([
+        VALIDATION_CACHE_VERSION,
+        pandera.__version__,
+        schema_name,
+        data_fingerprint(path2data),
+        file_sha256(schema_registry.path(schema_name)),
+        nomenclature_version,
+        data_format or path2data.suffix.lower(),
+        sep,
+    ])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _path2report(key: str) -> Path:
+    return DIR2VALIDATION_CACHE / f"{key}.pkl"
+
+
+def load_report(key: str) -> ValidationReport | None:
+    """
+    Load a cached validation report, or None if there is no report for this key.
+    The failure cases of the report are the sample kept in memory, the failure
+    file of the original validation may have changed since.
+    """
+    path2report = _path2report(key)
+    if not path2report.exists():
+        return None
+    with open(path2report, "rb") as f:
+        # the reports are only written by save_report, in the local data folder
+        report = pickle.load(f)  # noqa: S301
+    # mark the report as recently used
+    os.utime(path2report)
+    report.path2failures = None
+    report.sink.path2failures = None
+    return report
+
+
+def save_report(
+    key: str,
+    report: ValidationReport,
+    max_size_mb: int = VALIDATION_CACHE_SIZE_MB,
+) -> None:
+    """
+    Cache a validation report, then evict the least recently used reports if the
+    cache exceeds max_size_mb.
+    """
+    DIR2VALIDATION_CACHE.mkdir(parents=True, exist_ok=True)
+    _write_atomic(pickle.dumps(report), _path2report(key))
+    evict_reports(max_size_mb)
+
+
+def evict_reports(max_size_mb: int = VALIDATION_CACHE_SIZE_MB) -> None:
+    """Remove the least recently used reports beyond max_size_mb."""
+    reports = []
+    for path2report in DIR2VALIDATION_CACHE.glob("*.pkl"):
+        stat = path2report.stat()
+        reports.append((stat.st_mtime_ns, stat.st_size, path2report))
+    total_size = sum(size for _, size, _ in reports)
+    for _, size, path2report in sorted(reports):
+        if total_size <= max_size_mb * 2**20:
+            break
+        path2report.unlink(missing_ok=True)
+        total_size -= size
+        logger.debug(f"Evicted {path2report} from the validation cache")
+
+
+def validate_file_cached(
+    schema_name: str,
+    path2data: Path,
+    chunksize: int = VALIDATION_CHUNKSIZE,
+    data_format: str | None = None,
+    sep: str = ",",
+    jobs: int = 1,
+    path2failures: Path | None = None,
+    check_nomenclatures: bool = True,
+) -> ValidationReport:
+    """
+    Validate a data file with `validate_file`, returning the cached report if
+    the file, its schema and its nomenclatures did not change since the last
+    validation with the same options.
+
+    The cache is not read when the failure cases are streamed to a file
+    (path2failures), which needs a full validation, but the new report is cached.
+    """
+    key = report_key(
+        schema_name, path2data, data_format, sep, check_nomenclatures
+    )
+    if path2failures is None:
+        start = time.perf_counter()
+        report = load_report(key)
+        if report is not None:
+            logger.info(
+                f"Loaded the report of {path2data} against {schema_name} "
+                f"from cache in {time.perf_counter() - start:.3f}s"
+            )
+            return report
+    report = validate_file(
+        schema_name,
+        path2data,
+        chunksize,
+        data_format,
+        sep,
+        jobs,
+        path2failures,
+        check_nomenclatures,
+    )
+    save_report(key, report)
+    return report
+
+
+def clear_validation_cache() -> None:
+    """
+    Remove all the cached validation reports and data fingerprints.
+    """
+    if DIR2VALIDATION_CACHE.exists():
+        shutil.rmtree(DIR2VALIDATION_CACHE)
+        logger.info(f"Removed validation cache {DIR2VALIDATION_CACHE}")
@@ -0,0 +1,333 @@
+"""
+Chunked validation of data files against the pandera schemas of DIR2SCHEMA.
+
+The extracts of the CASD databases (eg. RA_2020, BTS_2021) do not fit in memory.
+`validate_file` streams a csv or parquet file in chunks of a fixed number of
+rows, validates each chunk against the schema of its table and merges the
+failure cases of all the chunks in a single `ValidationReport`. Only one chunk is
+held in memory at a time.
+"""
+
+import time
+from collections.abc import Iterator
+from logging import getLogger
+from pathlib import Path
+
+import pandas as pd
+import pandera.pandas as pa
+
+from agriphyto_schema.constants import (
+    FAILURE_EXAMPLES_SIZE,
+    VALIDATION_CHUNKSIZE,
+)
+from agriphyto_schema.data.schema_registry import schema_registry
+from agriphyto_schema.validation.failure_sink import (
+    FAILURE_CASE_COLUMNS,
+    FailureSink,
+    read_failure_cases,
+)
+from agriphyto_schema.validation.nomenclature_checks import compile_schema
+
+logger = getLogger(__name__)
+
+DATA_FORMATS = {
+    ".csv": "csv",
+    ".txt": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def list_schema_names() -> list[str]:
+    """Return the sorted names, `<db_name>__<table_name>`, of the schemas."""
+    return schema_registry.names()
+
+
+def load_schema(
+    schema_name: str, check_nomenclatures: bool = False
+) -> pa.DataFrameSchema:
+    """
+    Load the pandera schema of a table from DIR2SCHEMA, through the shared
+    `schema_registry`: the returned schema must not be modified.
+
+    Parameters
+    ----------
+    schema_name : str
+        The name of the schema, `<db_name>__<table_name>`.
+    check_nomenclatures : bool, optional
+        Whether to check the codes of the columns having a nomenclature, see
+        `compile_schema`, by default False.
+    """
+    if check_nomenclatures:
+        return compile_schema(schema_name)
+    return schema_registry.get(schema_name)
+
+
+def infer_data_format(path2data: Path) -> str:
+    """Infer the format of a data file, "csv" or "parquet", from its suffix."""
+    data_format = DATA_FORMATS.get(path2data.suffix.lower())
+    if data_format is None:
+        msg = f"Accepted data files: {list(DATA_FORMATS)}. Got {path2data}"
+        raise ValueError(msg)
+    return data_format
+
+
+def iter_chunks(
+    path2data: Path,
+    chunksize: int = VALIDATION_CHUNKSIZE,
+    data_format: str | None = None,
+    sep: str = ",",
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a data file by chunks of rows.
+
+    Parameters
+    ----------
+    path2data : Path
+        The csv or parquet file to read.
+    chunksize : int, optional
+        The number of rows of each chunk, by default VALIDATION_CHUNKSIZE.
+    data_format : str | None, optional
+        "csv" or "parquet", by default inferred from the file suffix.
+    sep : str, optional
+        The field separator of csv files, by default ",".
+
+    Yields
+    ------
+    pd.DataFrame
+        The chunks of the file, indexed by the position of their rows in the
+        file. The csv values are read as strings, left to the coercion of the
+        schema.
+    """
+    data_format = data_format or infer_data_format(path2data)
+    if data_format == "csv":
+        with pd.read_csv(
+            path2data, sep=sep, dtype=str, chunksize=chunksize
+        ) as reader:
+            yield from reader
+    elif data_format == "parquet":
+        import pyarrow.parquet as pq
+
+        start = 0
+        with pq.ParquetFile(path2data) as parquet_file:
+            for batch in parquet_file.iter_batches(batch_size=chunksize):
+                chunk = batch.to_pandas()
+                chunk.index = pd.RangeIndex(start, start + len(chunk))
+                start += len(chunk)
+                yield chunk
+    else:
+        msg = f"Accepted formats: {sorted(set(DATA_FORMATS.values()))}. Got {data_format}"
+        raise ValueError(msg)
+
+
+class ValidationReport:
+    """
+    Failure cases and throughput of the validation of a data file.
+
+    The failure cases of the chunks are passed to a `FailureSink`, except the
+    failures that do not concern a row (eg. a missing column) which are only
+    passed once. The report keeps their counts per column and check and a sample
+    of them in memory; all of them are streamed to path2failures, if given.
+
+    Parameters
+    ----------
+    schema_name : str
+        The name of the schema, `<db_name>__<table_name>`.
+    path2data : Path
+        The validated data file.
+    path2failures : Path | None, optional
+        The .jsonl, .parquet or .csv file where the failure cases are streamed,
+        by default None.
+    n_examples : int, optional
+        The number of failure cases sampled in memory, by default
+        FAILURE_EXAMPLES_SIZE.
+    """
+
+    def __init__(
+        self,
+        schema_name: str,
+        path2data: Path,
+        path2failures: Path | None = None,
+        n_examples: int = FAILURE_EXAMPLES_SIZE,
+    ):
+        self.schema_name = schema_name
+        self.path2data = path2data
+        self.path2failures = path2failures
+        self.n_rows = 0
+        self.n_chunks = 0
+        self.elapsed = 0.0
+        self.sink = FailureSink(path2failures, n_examples)
+        self._schema_failures: set[tuple] = set()
+
+    def add_chunk(
+        self, n_rows: int, failure_cases: pd.DataFrame | None = None
+    ) -> None:
+        """
+        Record the validation of a chunk.
+
+        Parameters
+        ----------
+        n_rows : int
+            The number of rows of the chunk.
+        failure_cases : pd.DataFrame | None, optional
+            The failure cases of the chunk, as in
+            `pandera.errors.SchemaErrors.failure_cases`, by default None.
+        """
+        self.n_rows += n_rows
+        self.n_chunks += 1
+        if failure_cases is not None:
+            self.add_failure_cases(failure_cases)
+
+    def add_sink(self, n_rows: int, n_chunks: int, sink: FailureSink) -> None:
+        """
+        Record chunks validated elsewhere (eg. in a worker process) whose
+        failure cases of rows were passed to a closed sink, see
+        `FailureSink.merge`. Their failures that do not concern a row must be
+        passed to `add_failure_cases`.
+        """
+        self.n_rows += n_rows
+        self.n_chunks += n_chunks
+        self.sink.merge(sink)
+
+    def add_failure_cases(self, failure_cases: pd.DataFrame) -> None:
+        """
+        Record failure cases, as in `pandera.errors.SchemaErrors.failure_cases`.
+        """
+        if len(failure_cases) == 0:
+            return
+        failure_cases = failure_cases[FAILURE_CASE_COLUMNS].reset_index(
+            drop=True
+        )
+        schema_failures = failure_cases.loc[
+            failure_cases["index"].isna(), FAILURE_CASE_COLUMNS[:-1]
+        ].astype(str)
+        seen = []
+        for position, key in zip(
+            schema_failures.index,
+            schema_failures.itertuples(index=False, name=None),
+            strict=True,
+        ):
+            if key in self._schema_failures:
+                seen.append(position)
+            self._schema_failures.add(key)
+        self.sink.write(failure_cases.drop(index=seen))
+
+    def close(self) -> None:
+        """Finish writing the failure cases, at the end of the validation."""
+        self.sink.close()
+
+    @property
+    def failure_cases(self) -> pd.DataFrame:
+        """
+        All the failure cases if they were streamed to a file, otherwise the
+        sample kept in memory, which holds all of them up to n_examples.
+        """
+        if self.path2failures is not None:
+            return read_failure_cases(self.path2failures)
+        return self.sink.examples
+
+    @property
+    def n_failure_cases(self) -> int:
+        return self.sink.n_failure_cases
+
+    @property
+    def is_valid(self) -> bool:
+        return self.n_failure_cases == 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.n_rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        status = "valid" if self.is_valid else "invalid"
+        return (
+            f"{self.path2data} is {status} against {self.schema_name}: "
+            f"{self.n_failure_cases} failure cases in {self.n_rows} rows "
+            f"({self.n_chunks} chunks, {self.elapsed:.1f}s, "
+            f"{self.rows_per_second:,.0f} rows/s)"
+        )
+
+
+def validate_chunk(
+    schema: pa.DataFrameSchema, chunk: pd.DataFrame
+) -> pd.DataFrame | None:
+    """
+    Validate a chunk against a schema, returning its failure cases, if any.
+    """
+    try:
+        schema.validate(chunk, lazy=True)
+    except pa.errors.SchemaErrors as err:
+        return err.failure_cases
+    return None
+
+
+def validate_file(
+    schema_name: str,
+    path2data: Path,
+    chunksize: int = VALIDATION_CHUNKSIZE,
+    data_format: str | None = None,
+    sep: str = ",",
+    jobs: int = 1,
+    path2failures: Path | None = None,
+    check_nomenclatures: bool = True,
+) -> ValidationReport:
+    """
+    Validate a data file chunk by chunk against the schema of its table.
+
+    The parquet files are validated by `validate_parquet`, reading only the
+    columns of the schema and validating the row groups in parallel.
+
+    Parameters
+    ----------
+    schema_name : str
+        The name of the schema in DIR2SCHEMA, `<db_name>__<table_name>`.
+    path2data : Path
+        The csv or parquet file to validate.
+    chunksize : int, optional
+        The number of rows validated at once, which bounds the memory used by the
+        validation, by default VALIDATION_CHUNKSIZE.
+    data_format : str | None, optional
+        "csv" or "parquet", by default inferred from the file suffix.
+    sep : str, optional
+        The field separator of csv files, by default ",".
+    jobs : int, optional
+        The number of processes validating the row groups of a parquet file, by
+        default 1.
+    path2failures : Path | None, optional
+        The .jsonl, .parquet or .csv file where the failure cases are streamed,
+        by default None (only a sample is kept in memory).
+    check_nomenclatures : bool, optional
+        Whether to check the codes of the columns having a nomenclature, by
+        default True.
+
+    Returns
+    -------
+    ValidationReport
+        The failure cases of all the chunks, indexed by the position of their
+        row in the file.
+    """
+    data_format = data_format or infer_data_format(path2data)
+    if data_format == "parquet":
+        from agriphyto_schema.validation.parquet import validate_parquet
+
+        return validate_parquet(
+            schema_name,
+            path2data,
+            chunksize,
+            jobs,
+            path2failures,
+            check_nomenclatures,
+        )
+    schema = load_schema(schema_name, check_nomenclatures)
+    report = ValidationReport(schema_name, path2data, path2failures)
+    start = time.perf_counter()
+    for chunk in iter_chunks(path2data, chunksize, data_format, sep):
+        report.add_chunk(len(chunk), validate_chunk(schema, chunk))
+        logger.debug(
+            f"Validated {report.n_rows} rows of {path2data}, "
+            f"{report.n_failure_cases} failure cases"
+        )
+    report.close()
+    report.elapsed = time.perf_counter() - start
+    logger.info(report.summary())
+    return report
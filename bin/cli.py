@@ -1,13 +1,17 @@
 #! /usr/bin/env python
 import logging
+from pathlib import Path
 
 import click
 
 from agriphyto_schema.constants import (
     AVAILABLE_DICOS,
+    CATALOG_BACKENDS,
     LOG_LEVEL,
+    VALIDATION_CHUNKSIZE,
+    VALIDATION_MEMORY_BUDGET_MB,
 )
-from agriphyto_schema.data.parse_dicos import parse_dico
+from agriphyto_schema.data.parse_dicos import parse_dicos
 
 logging.basicConfig(
     level=logging.getLevelNamesMapping()[LOG_LEVEL],
@@ -29,26 +33,299 @@ def cli():
     type=click.Choice([*AVAILABLE_DICOS.keys(), "all"]),
     help="Parse an Excel data dictionary to create a pandera schema for data validation.",
 )
-def parse(dico_name: str) -> None:
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of worker processes used to parse the dictionaries concurrently.",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Parse the dictionaries even if their inputs did not change since the last parse.",
+)
+def parse(dico_name: str, jobs: int, force: bool) -> None:
     """
     Parse an Excel or a csv data dictionary to create a pandera schema for data validation. The configurations for each dictionary are in `agriphyto_schema/constants.py`.
     """
 
     if dico_name == "all":
-        for dico in AVAILABLE_DICOS:
-            parse_dico(dico)
+        parse_dicos(list(AVAILABLE_DICOS), jobs=jobs, force=force)
     else:
-        parse_dico(dico_name)
+        parse_dicos([dico_name], jobs=jobs, force=force)
 
 
 @cli.command()
-def create_dico() -> None:
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Rebuild the dictionary rows of every database, even unchanged ones.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of worker processes reading the schema files.",
+)
+@click.option(
+    "--backend",
+    default="parquet",
+    show_default=True,
+    type=click.Choice(CATALOG_BACKENDS),
+    help="Catalog of the application: the parquet artifacts are always written, sqlite also writes a single SQLite file with full-text indexes.",
+)
+def create_dico(force: bool, jobs: int, backend: str) -> None:
     """
-    Create the aggregated data dictionary CSV from all pandera schemas.
+    Create the aggregated data dictionary CSV, the parquet catalog of the application (and the SQLite one with --backend sqlite) and the bundle of all pandera schemas.
     """
+    from agriphyto_schema.data.app_artifacts import write_app_artifacts
     from agriphyto_schema.data.create_agriphyto_dico import aggregate_schemas
+    from agriphyto_schema.data.schema_bundle import write_schema_bundle
+    from agriphyto_schema.data.sqlite_catalog import write_sqlite_catalog
+
+    aggregate_schemas(force=force, jobs=jobs)
+    write_app_artifacts()
+    if backend == "sqlite":
+        write_sqlite_catalog()
+    write_schema_bundle()
+
+
+@cli.command()
+@click.argument("query")
+@click.option(
+    "--nomenclatures",
+    is_flag=True,
+    help="Search the labels of the modalities instead of the labels and names of the variables.",
+)
+@click.option(
+    "--limit",
+    "-n",
+    default=20,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of matching rows displayed.",
+)
+def search(query: str, nomenclatures: bool, limit: int) -> None:
+    """
+    Search the SQLite catalog written by `create-dico --backend sqlite`, case and accent insensitively. The query is a substring, possibly anchored with ^ or $, or a regular expression.
+    """
+    from agriphyto_schema.data.sqlite_catalog import SqliteCatalog
+
+    catalog = SqliteCatalog()
+    if nomenclatures:
+        rows = catalog.modalities_index.search(query)
+        found = catalog.nomenclatures(rows[:limit])
+    else:
+        rows = catalog.variables_index.search(query)
+        found = catalog.variables(rows[:limit])
+    click.echo(f"{len(rows)} matching rows")
+    if len(found) > 0:
+        click.echo(found.to_string(index=False))
+
+
+@cli.command()
+@click.argument("db_name")
+@click.argument("table_name")
+@click.argument("nomenclature")
+def modalities(db_name: str, table_name: str, nomenclature: str) -> None:
+    """
+    Print the modalities of a nomenclature, <table>__<variable> as in the Nomenclature column of the data dictionary, from the SQLite catalog.
+    """
+    from agriphyto_schema.constants import COLNAME_CODE, COLNAME_LIBELLE
+    from agriphyto_schema.data.sqlite_catalog import SqliteCatalog
+
+    found = SqliteCatalog().modalities(db_name, table_name, nomenclature)
+    if len(found) == 0:
+        click.echo(f"No nomenclature {nomenclature} in {db_name}.{table_name}")
+        raise SystemExit(1)
+    click.echo(found[[COLNAME_CODE, COLNAME_LIBELLE]].to_string(index=False))
+
+
+@cli.command()
+def clear_cache() -> None:
+    """
+    Remove the cached snapshots of the raw dictionary sheets and the cached validation reports.
+    """
+    from agriphyto_schema.data.sheet_cache import clear_sheet_cache
+    from agriphyto_schema.validation.result_cache import clear_validation_cache
+
+    clear_sheet_cache()
+    clear_validation_cache()
+
+
+@cli.command()
+@click.option(
+    "--schema",
+    "-s",
+    "schema_name",
+    required=True,
+    help="Name of the schema to validate against, <db>__<table> (see data/schemas/).",
+)
+@click.argument(
+    "path2data",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--chunksize",
+    default=VALIDATION_CHUNKSIZE,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of rows validated at once, bounding the memory used.",
+)
+@click.option(
+    "--sep",
+    default=",",
+    show_default=True,
+    help="Field separator of csv files.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of worker processes validating the row groups of a parquet file.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Stream the failure cases to this .jsonl, .parquet or .csv file.",
+)
+@click.option(
+    "--skip-nomenclatures",
+    is_flag=True,
+    help="Do not check the codes of the columns having a nomenclature.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Validate the file even if its cached report is still valid.",
+)
+def validate(
+    schema_name: str,
+    path2data: Path,
+    chunksize: int,
+    sep: str,
+    jobs: int,
+    output: Path | None,
+    skip_nomenclatures: bool,
+    no_cache: bool,
+) -> None:
+    """
+    Validate a csv or parquet data file chunk by chunk against the pandera schema of its table. Parquet files are validated row group by row group, reading only the columns of the schema. Exits with status 1 if the file is invalid.
+    """
+    from agriphyto_schema.validation.result_cache import validate_file_cached
+    from agriphyto_schema.validation.validate import validate_file
+
+    report = (validate_file if no_cache else validate_file_cached)(
+        schema_name,
+        path2data,
+        chunksize=chunksize,
+        sep=sep,
+        jobs=jobs,
+        path2failures=output,
+        check_nomenclatures=not skip_nomenclatures,
+    )
+    click.echo(report.summary())
+    if not report.is_valid:
+        click.echo(report.sink.count_table().head(20).to_string(index=False))
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.argument(
+    "paths",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, path_type=Path),
+)
+@click.option(
+    "--db",
+    "db_name",
+    type=click.Choice(list(AVAILABLE_DICOS.keys())),
+    help="Database of the files, by default looked for among all the schemas.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of worker processes validating files concurrently.",
+)
+@click.option(
+    "--memory-budget",
+    "memory_budget_mb",
+    default=VALIDATION_MEMORY_BUDGET_MB,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Memory (MB) shared by the concurrent validations.",
+)
+@click.option(
+    "--chunksize",
+    default=VALIDATION_CHUNKSIZE,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of rows validated at once in each file.",
+)
+@click.option(
+    "--sep",
+    default=",",
+    show_default=True,
+    help="Field separator of csv files.",
+)
+@click.option(
+    "--output-dir",
+    "-o",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Stream the failure cases of each file to <output-dir>/<subdirectory>/<file>_failures.csv, mirroring the directories of the files.",
+)
+@click.option(
+    "--skip-nomenclatures",
+    is_flag=True,
+    help="Do not check the codes of the columns having a nomenclature.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Validate the files even if their cached reports are still valid.",
+)
+def validate_batch(
+    paths: tuple[Path, ...],
+    db_name: str | None,
+    jobs: int,
+    memory_budget_mb: int,
+    chunksize: int,
+    sep: str,
+    output_dir: Path | None,
+    skip_nomenclatures: bool,
+    no_cache: bool,
+) -> None:
+    """
+    Validate the csv or parquet files of a delivery, one file per table named after its table, in a pool of processes sharing a memory budget. Exits with status 1 if a file is invalid.
+    """
+    from agriphyto_schema.validation.batch import validate_files
 
-    aggregate_schemas()
+    reports = validate_files(
+        list(paths),
+        db_name=db_name,
+        jobs=jobs,
+        memory_budget_mb=memory_budget_mb,
+        chunksize=chunksize,
+        sep=sep,
+        dir2failures=output_dir,
+        check_nomenclatures=not skip_nomenclatures,
+        use_cache=not no_cache,
+    )
+    for report in reports:
+        click.echo(report.summary())
+    if not all(report.is_valid for report in reports):
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
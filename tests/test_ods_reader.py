@@ -0,0 +1,20 @@
+import pandas as pd
+
+from agriphyto_schema.constants import AVAILABLE_DICOS, DIR2DICO
+from agriphyto_schema.data.ods_reader import read_ods_sheet
+
+
+def test_read_ods_sheet_matches_read_excel():
+    """The streaming reader returns the same sheet as pd.read_excel (odf)."""
+    config = AVAILABLE_DICOS["PKLeg_2013"]
+    path2ods = DIR2DICO / config["filename"]
+    expected = pd.read_excel(path2ods, sheet_name=config["variable_sheet"])
+
+    result = read_ods_sheet(path2ods, config["variable_sheet"])
+    pd.testing.assert_frame_equal(result, expected)
+
+    # projection on the configured columns, in the order of the sheet
+    usecols = list(config["cols_to_use"])
+    result = read_ods_sheet(path2ods, config["variable_sheet"], usecols=usecols)
+    expected_columns = [col for col in expected.columns if col in usecols]
+    pd.testing.assert_frame_equal(result, expected[expected_columns])
@@ -1,11 +1,33 @@
+import os
+
 import pandas as pd
 import pytest
 
-from agriphyto_schema.constants import COLNAME_CODE, COLNAME_LIBELLE
+from agriphyto_schema.constants import (
+    AVAILABLE_DICOS,
+    COLNAME_CODE,
+    COLNAME_LIBELLE,
+    COLNAME_NOMENCLATURE,
+    COLNAME_TYPE,
+    COLNAME_VARIABLE,
+    DIR2DICO,
+    MAP_TYPES,
+    PARSER_VERSION,
+    USELESS_MODALITIES,
+)
+from agriphyto_schema.data import manifest, nomenclature_store, sheet_cache
 from agriphyto_schema.data.parse_dicos import (
     clean_modalities,
+    clean_modalities_batch,
     clean_nomenclature_name,
+    detect_table_section_from_casd_csv,
+    infer_type_from_varname,
+    infer_types_from_varnames,
+    map_type,
+    map_types,
+    split_casd_variables,
 )
+from agriphyto_schema.data.workbook import WorkbookSession
 
 
 def test_clean_varname():
@@ -95,3 +117,284 @@ def test_clean_modalities(
     # Last row assertions
     assert result.iloc[-1][COLNAME_CODE] == expected_last_var
     assert result.iloc[-1][COLNAME_LIBELLE] == expected_last_label
+
+
+def assert_batch_equals_per_row(raw_nomenclatures: pd.Series, code_first: bool):
+    """Compare clean_modalities_batch with clean_modalities on each string."""
+    result = clean_modalities_batch(raw_nomenclatures, code_first=code_first)
+    expected = [
+        clean_modalities(raw_nomenclature, code_first=code_first)
+        for raw_nomenclature in raw_nomenclatures
+    ]
+    expected_index = [
+        index
+        for index, modalities in zip(
+            raw_nomenclatures.index, expected, strict=True
+        )
+        for _ in range(len(modalities))
+    ]
+    assert list(result.columns) == [COLNAME_CODE, COLNAME_LIBELLE]
+    assert list(result.index) == expected_index
+    assert result.to_numpy().tolist() == [
+        row for modalities in expected for row in modalities.to_numpy().tolist()
+    ]
+
+
+@pytest.mark.parametrize("code_first", [True, False])
+def test_clean_modalities_batch(code_first):
+    """Test clean_modalities_batch against clean_modalities on edge cases."""
+    raw_nomenclatures = pd.Series(
+        [
+            "1 - Option One\n2 - Option Two\n3 - Option Three",
+            "02:Carotte\n    03:Choux fleur, Brocoli\n    11:Tomate",
+            "1:a2:b3:",
+            "Label - 1;Other - 2",
+            "1 = Oui | 2 = Non",
+            "orages, 03:Grêle",
+            "Sans séparateur",
+            '"0 - Non";"1 - Oui"',
+            "oui/non",
+            "  ",
+            '"',
+        ],
+        index=["a", "b", "c", "d", "e", "f", "g", "h", "i", "j", "a"],
+    )
+    assert_batch_equals_per_row(raw_nomenclatures, code_first)
+
+
+@pytest.mark.parametrize(
+    "db_name",
+    [
+        db_name
+        for db_name, config in AVAILABLE_DICOS.items()
+        if COLNAME_NOMENCLATURE in config.get("cols_to_use", {}).values()
+        or config["parser"] == "dico_from_casd_csv"
+    ],
+)
+def test_clean_modalities_batch_on_dicos(db_name):
+    """Test clean_modalities_batch against clean_modalities on the dictionaries."""
+    config = AVAILABLE_DICOS[db_name]
+    if config["parser"] == "dico_from_casd_csv":
+        table_sections = detect_table_section_from_casd_csv(
+            filepath2dico=config["filename"],
+            skiprows=config["skiprows"],
+            encoding=config["encoding"],
+        )
+        # read as by dico_from_casd_csv
+        with open(DIR2DICO / config["filename"]) as f:
+            lines = f.readlines()
+        for section in table_sections.values():
+            raw_nomenclatures = split_casd_variables(
+                lines[section["start_line"] : section["end_line"]]
+            )[COLNAME_NOMENCLATURE]
+            raw_nomenclatures = raw_nomenclatures[
+                raw_nomenclatures.notna()
+                & (raw_nomenclatures != "")
+                & ~raw_nomenclatures.isin(USELESS_MODALITIES)
+            ]
+            assert_batch_equals_per_row(raw_nomenclatures, code_first=True)
+        return
+    sheet_names = config["variable_sheet"]
+    if not isinstance(sheet_names, list):
+        sheet_names = [sheet_names]
+    cols_to_use = config["cols_to_use"]
+    with WorkbookSession(
+        config["filename"],
+        engine=config.get("engine", "pandas"),
+        use_cache=False,
+    ) as session:
+        for sheet_name in sheet_names:
+            dico = session.read(
+                sheet_name,
+                skiprows=config.get("skiprows", 0),
+                usecols=list(cols_to_use),
+            ).rename(columns=cols_to_use)
+            raw_nomenclatures = dico[COLNAME_NOMENCLATURE]
+            raw_nomenclatures = raw_nomenclatures[
+                raw_nomenclatures.notna() & (raw_nomenclatures != "")
+            ]
+            assert_batch_equals_per_row(raw_nomenclatures, code_first=True)
+
+
+def naive_map_type(x):
+    """Reference implementation of map_type, scanning MAP_TYPES in order."""
+    for k, v in MAP_TYPES.items():
+        if isinstance(x, str) and k.lower() in x.lower():
+            return v
+    return "string"
+
+
+def naive_infer_type_from_varname(var_name: str) -> str:
+    """Reference implementation of infer_type_from_varname."""
+    pandera_type = "string"
+    if any(
+        pattern in var_name.upper()
+        for pattern in [
+            "NB",
+            "COEF",
+            "SUPP",
+            "DIST",
+            "DENIT",
+            "REND",
+            "PRIX",
+            "AGE",
+            "DOSE",
+            "QTE",
+            "QDOSE",
+        ]
+    ):
+        pandera_type = "float"
+    return pandera_type
+
+
+def dico_strings(db_name: str) -> pd.Series:
+    """
+    All the types and variable names of a dictionary (every field of the csv
+    dictionaries).
+    """
+    config = AVAILABLE_DICOS[db_name]
+    if config["parser"] == "dico_from_casd_csv":
+        with open(
+            DIR2DICO / config["filename"], encoding=config["encoding"]
+        ) as f:
+            return pd.Series([
+                field for line in f for field in line.strip().split(";")
+            ])
+    sheet_names = config["variable_sheet"]
+    if not isinstance(sheet_names, list):
+        sheet_names = [sheet_names]
+    cols_to_use = config["cols_to_use"]
+    strings = []
+    with WorkbookSession(
+        config["filename"],
+        engine=config.get("engine", "pandas"),
+        use_cache=False,
+    ) as session:
+        for sheet_name in sheet_names:
+            dico = session.read(
+                sheet_name,
+                skiprows=config.get("skiprows", 0),
+                usecols=list(cols_to_use),
+            ).rename(columns=cols_to_use)
+            strings.extend([dico[COLNAME_TYPE], dico[COLNAME_VARIABLE]])
+    return pd.concat(strings, ignore_index=True)
+
+
+@pytest.mark.parametrize(
+    "type_or_varname",
+    ["Numérique", "Code numérique", "NUMÉRIQUE", "Date (Chaîne)", "", "NB_AN"],
+)
+def test_map_type(type_or_varname):
+    """Test map_type and infer_type_from_varname against the naive versions."""
+    assert map_type(type_or_varname) == naive_map_type(type_or_varname)
+    assert infer_type_from_varname(
+        type_or_varname
+    ) == naive_infer_type_from_varname(type_or_varname)
+
+
+@pytest.mark.parametrize("db_name", list(AVAILABLE_DICOS))
+def test_map_types_on_dicos(db_name):
+    """Test the type classifiers against the naive versions on the dictionaries."""
+    strings = dico_strings(db_name)
+    assert map_types(strings).tolist() == [naive_map_type(x) for x in strings]
+    var_names = strings.dropna().astype(str)
+    assert infer_types_from_varnames(var_names).tolist() == [
+        naive_infer_type_from_varname(var_name) for var_name in var_names
+    ]
+
+
+@pytest.fixture
+def raw_dico(tmp_path, monkeypatch):
+    """A raw dictionary with its schema and its nomenclature partition."""
+    for module in [manifest, sheet_cache]:
+        monkeypatch.setattr(module, "DIR2DICO", tmp_path / "raw")
+    monkeypatch.setattr(manifest, "DIR2SCHEMA", tmp_path / "schemas")
+    monkeypatch.setattr(
+        manifest, "AVAILABLE_DICOS", {"DB_2020": {"filename": "dico.csv"}}
+    )
+    monkeypatch.setattr(
+        nomenclature_store, "DIR2NOMENCLATURES", tmp_path / "nomenclatures"
+    )
+    monkeypatch.setattr(sheet_cache, "DIR2SHEET_CACHE", tmp_path / "cache")
+    for path, content in [
+        (tmp_path / "raw" / "dico.csv", "variable,label\nSAU,Surface\n"),
+        (tmp_path / "schemas" / "DB_2020__table.json", "{}"),
+        (tmp_path / "nomenclatures" / "DB_2020.csv", "code,label\n"),
+    ]:
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def test_build_manifest(raw_dico, monkeypatch):
+    """A dictionary is parsed again when its inputs or outputs change."""
+    build_manifest = manifest.load_manifest(raw_dico / "manifest.json")
+    assert not manifest.is_dico_up_to_date("DB_2020", build_manifest)
+    manifest.record_dico(
+        "DB_2020", build_manifest, manifest.dico_fingerprint("DB_2020")
+    )
+    manifest.save_manifest(build_manifest, raw_dico / "manifest.json")
+    build_manifest = manifest.load_manifest(raw_dico / "manifest.json")
+    assert build_manifest["parse"]["DB_2020"]["schemas"] == [
+        "DB_2020__table.json"
+    ]
+    assert manifest.is_dico_up_to_date("DB_2020", build_manifest)
+
+    # a changed input file
+    path2raw = raw_dico / "raw" / "dico.csv"
+    content = path2raw.read_text()
+    path2raw.write_text(content.replace("Surface", "Superficie"))
+    assert not manifest.is_dico_up_to_date("DB_2020", build_manifest)
+    path2raw.write_text(content)
+    assert manifest.is_dico_up_to_date("DB_2020", build_manifest)
+
+    # a changed parser version
+    with monkeypatch.context() as context:
+        context.setattr(manifest, "PARSER_VERSION", PARSER_VERSION + 1)
+        assert not manifest.is_dico_up_to_date("DB_2020", build_manifest)
+
+    # a missing output: a schema or the nomenclature partition
+    for path2output in [
+        raw_dico / "schemas" / "DB_2020__table.json",
+        raw_dico / "nomenclatures" / "DB_2020.csv",
+    ]:
+        output = path2output.read_text()
+        path2output.unlink()
+        assert not manifest.is_dico_up_to_date("DB_2020", build_manifest)
+        path2output.write_text(output)
+        assert manifest.is_dico_up_to_date("DB_2020", build_manifest)
+
+
+def test_sheet_cache_invalidation(raw_dico):
+    """A snapshot is only loaded while its raw file did not change."""
+    path2raw = raw_dico / "raw" / "dico.csv"
+    sheet = pd.DataFrame({"variable": ["SAU"], "label": ["Surface"]})
+    assert sheet_cache.load_snapshot("dico.csv", "Variables") is None
+    sheet_cache.save_snapshot(sheet, "dico.csv", "Variables")
+    pd.testing.assert_frame_equal(
+        sheet_cache.load_snapshot("dico.csv", "Variables"), sheet
+    )
+    # another sheet of the same file is not cached
+    assert sheet_cache.load_snapshot("dico.csv", "Modalities") is None
+
+    # a new mtime with the same content: the hash matches, the snapshot is kept
+    stat = path2raw.stat()
+    os.utime(path2raw, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert sheet_cache.load_snapshot("dico.csv", "Variables") is not None
+
+    # a new mtime and another content of the same size: the hash differs
+    stat = path2raw.stat()
+    path2raw.write_text(path2raw.read_text().replace("SAU", "SAT"))
+    os.utime(path2raw, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert sheet_cache.load_snapshot("dico.csv", "Variables") is None
+
+    # a new size, even with the same mtime
+    sheet_cache.save_snapshot(sheet, "dico.csv", "Variables")
+    stat = path2raw.stat()
+    path2raw.write_text(path2raw.read_text() + "SURF,Surface\n")
+    os.utime(path2raw, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert sheet_cache.load_snapshot("dico.csv", "Variables") is None
+
+    sheet_cache.save_snapshot(sheet, "dico.csv", "Variables")
+    sheet_cache.clear_sheet_cache()
+    assert sheet_cache.load_snapshot("dico.csv", "Variables") is None
@@ -1,8 +1,51 @@
+import json
+import os
+import shutil
 import tempfile
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
 import pandera.pandas as pa
+import pytest
 
+from agriphyto_schema.app.catalog import (
+    Catalog,
+    page_bounds,
+    sort_ranks,
+    sort_rows,
+)
+from agriphyto_schema.app.search_index import SearchIndex
+from agriphyto_schema.constants import (
+    AGRIPHYTO_DICO_NAME,
+    COLNAME_CODE,
+    COLNAME_OUT_DB,
+    COLNAME_TABLE,
+    COLNAME_VARIABLE,
+    COLNAME_VARIABLE_NAME,
+    DIR2DATA,
+    DIR2NOMENCLATURES,
+    DIR2SCHEMA,
+)
+from agriphyto_schema.data import create_agriphyto_dico, manifest
+from agriphyto_schema.data.app_artifacts import (
+    NomenclatureIndex,
+    read_app_dico,
+    read_app_nomenclatures,
+    write_app_artifacts,
+)
+from agriphyto_schema.data.create_agriphyto_dico import (
+    aggregate_schemas,
+    pandera_schema2df,
+    schema_json2columns,
+)
+from agriphyto_schema.data.nomenclature_store import read_nomenclatures
+from agriphyto_schema.data.schema_bundle import (
+    SchemaBundle,
+    write_schema_bundle,
+)
+from agriphyto_schema.data.schema_registry import SchemaRegistry
+from agriphyto_schema.data.sqlite_catalog import write_sqlite_catalog
 from agriphyto_schema.utils import (
     pandera_from_json,
     pandera_to_json,
@@ -39,3 +82,214 @@ def test_pandera_to_from_json():
         # Nettoyer le fichier temporaire
         if temp_path.exists():
             temp_path.unlink()
+
+
+def test_schema_registry(tmp_path):
+    """The registry loads the schemas on demand and reloads the modified ones."""
+    for table_name in ["T1", "T2"]:
+        pandera_to_json(
+            pa.DataFrameSchema(
+                {"test_col": pa.Column(pa.Int)}, name=f"DB__{table_name}"
+            ),
+            tmp_path / f"DB__{table_name}.json",
+        )
+    registry = SchemaRegistry(tmp_path, maxsize=1)
+    assert registry.names() == ["DB__T1", "DB__T2"]
+    assert registry.db_names() == ["DB"]
+    assert "DB__T3" not in registry
+    with pytest.raises(ValueError, match="No schema DB__T3"):
+        registry.get("DB__T3")
+
+    schema = registry.get("DB__T1")
+    assert registry.get("DB__T1") is schema
+    # the least recently used schema is evicted beyond maxsize
+    registry.get("DB__T2")
+    assert registry.get("DB__T1") is not schema
+
+    schema = registry.get("DB__T1")
+    pandera_to_json(
+        pa.DataFrameSchema({"other_col": pa.Column(pa.Int)}, name="DB__T1"),
+        tmp_path / "DB__T1.json",
+    )
+    os.utime(tmp_path / "DB__T1.json", ns=(0, 0))
+    assert list(registry.get("DB__T1").columns) == ["other_col"]
+
+
+def test_schema_bundle(tmp_path):
+    """The bundled schemas are loaded as from their schema files."""
+    dir2schema = tmp_path / "schemas"
+    dir2schema.mkdir()
+    for schema_name in ["BTS_2021__post", "PKLeg_2013__PKLEG13_FUMO"]:
+        (dir2schema / f"{schema_name}.json").write_bytes(
+            (DIR2SCHEMA / f"{schema_name}.json").read_bytes()
+        )
+    path2bundle = write_schema_bundle(dir2schema, tmp_path / "schemas.bin")
+    bundle = SchemaBundle(path2bundle)
+    assert bundle.names() == ["BTS_2021__post", "PKLeg_2013__PKLEG13_FUMO"]
+    for schema_name in bundle.names():
+        schema = bundle.load(schema_name)
+        expected = pandera_from_json(dir2schema / f"{schema_name}.json")
+        assert schema.to_json() == expected.to_json()
+        assert [column.metadata for column in schema.columns.values()] == [
+            column.metadata for column in expected.columns.values()
+        ]
+
+    # a schema modified since it was bundled is loaded from its file
+    registry = SchemaRegistry(dir2schema, path2bundle=path2bundle)
+    assert list(registry.get("BTS_2021__post").columns) == list(
+        bundle.load("BTS_2021__post").columns
+    )
+    pandera_to_json(
+        pa.DataFrameSchema({"test_col": pa.Column(pa.Int)}),
+        dir2schema / "BTS_2021__post.json",
+    )
+    os.utime(dir2schema / "BTS_2021__post.json", ns=(0, 0))
+    assert list(registry.get("BTS_2021__post").columns) == ["test_col"]
+
+
+def test_schema_bundle_numeric_fields(tmp_path):
+    """The numeric titles are not read as positions of interned strings."""
+    serialized = json.loads(
+        (DIR2SCHEMA / "PKLeg_2013__PKLEG13_FUMO.json").read_text()
+    )
+    first, second, *_ = serialized["columns"]
+    serialized["columns"][first]["title"] = 3
+    serialized["columns"][second]["title"] = 10**6
+    (tmp_path / "PKLeg_2013__numeric.json").write_text(json.dumps(serialized))
+    bundle = SchemaBundle(write_schema_bundle(tmp_path, tmp_path / "s.bin"))
+    assert bundle.serialized("PKLeg_2013__numeric") == serialized
+    schema = bundle.load("PKLeg_2013__numeric")
+    assert schema.columns[first].title == 3
+    assert schema.columns[second].title == 10**6
+
+
+def test_schema_json2columns():
+    """The rows read from the JSON schemas are those of the pandera schemas."""
+    for schema_path in sorted(DIR2SCHEMA.glob("*.json"))[:10]:
+        db_name, table_name = schema_path.stem.split("__", 1)
+        expected = pandera_schema2df(
+            pandera_from_json(schema_path), db_name, table_name
+        )
+        rows = pd.DataFrame(schema_json2columns(schema_path))
+        pd.testing.assert_frame_equal(rows, expected, check_dtype=False)
+
+
+def test_aggregate_schemas_up_to_date(tmp_path, monkeypatch):
+    """The dictionary read back when up to date is the rebuilt one."""
+    for module in [create_agriphyto_dico, manifest]:
+        monkeypatch.setattr(module, "DIR2DATA", tmp_path)
+    rebuilt_dico = aggregate_schemas(force=True)
+    assert rebuilt_dico.isna().any(axis=None)
+    pd.testing.assert_frame_equal(aggregate_schemas(), rebuilt_dico)
+
+
+def test_app_artifacts(tmp_path):
+    """The parquet artifacts hold the values of the csv outputs."""
+    shutil.copy(DIR2DATA / f"{AGRIPHYTO_DICO_NAME}.csv", tmp_path)
+    shutil.copytree(DIR2NOMENCLATURES, tmp_path / "nomenclatures")
+    write_app_artifacts(tmp_path)
+    dico = pd.read_csv(DIR2DATA / f"{AGRIPHYTO_DICO_NAME}.csv")
+    pd.testing.assert_frame_equal(
+        read_app_dico(tmp_path).astype(dico.dtypes.to_dict()), dico
+    )
+    nomenclatures = read_nomenclatures(["RA_2020"])
+    app_nomenclatures = read_app_nomenclatures(["RA_2020"], tmp_path)
+    pd.testing.assert_frame_equal(
+        app_nomenclatures[nomenclatures.columns].astype(str), nomenclatures
+    )
+    assert (
+        app_nomenclatures[COLNAME_VARIABLE_NAME].astype(str)
+        == nomenclatures[COLNAME_VARIABLE].str.split("__").str[-1]
+    ).all()
+
+    # the index slices hold the modalities of each nomenclature
+    nomenclature_index = NomenclatureIndex(app_nomenclatures)
+    for (_, table_name, nomenclature), modalities in nomenclatures.groupby([
+        COLNAME_OUT_DB,
+        COLNAME_TABLE,
+        COLNAME_VARIABLE,
+    ]):
+        assert (
+            nomenclature_index
+            .get("RA_2020", table_name, nomenclature)[COLNAME_CODE]
+            .astype(str)
+            .tolist()
+            == modalities[COLNAME_CODE].tolist()
+        )
+    assert len(nomenclature_index.get("RA_2020", "unknown", "unknown")) == 0
+
+
+def test_search_index():
+    """The index answers substring, anchored and regex queries."""
+    df = pd.DataFrame({
+        "label": ["Surface agricole", "Département", None, "Coef (ha)"],
+        "variable": ["SAU", "DEP", "SURF_BIO", "COEF"],
+    })
+    search_index = SearchIndex(df, ["label", "variable"])
+    assert search_index.search("surf").tolist() == [0, 2]
+    assert search_index.search(" DEPART ").tolist() == [1]
+    assert search_index.search("département").tolist() == [1]
+    assert search_index.search("^coef").tolist() == [3]
+    assert search_index.search("agricole$").tolist() == [0]
+    assert search_index.search("^sau$").tolist() == [0]
+    assert search_index.search("^agricole").tolist() == []
+    assert search_index.search("s.*bio").tolist() == [2]
+    # invalid regex, searched as a substring
+    assert search_index.search("(ha").tolist() == [3]
+    assert search_index.search("").tolist() == [0, 1, 2, 3]
+
+
+def test_sort_rows():
+    """The filtered rows are sorted by rank and paged by position."""
+    df = pd.DataFrame({
+        "label": ["b", None, "a", "c", "a"],
+        "code": pd.Categorical(["x", "z", "y", "x", "z"]),
+    })
+    ranks = sort_ranks(df)
+    assert ranks["label"].tolist() == [2, 4, 0, 3, 1]
+    rows = np.array([0, 1, 2, 4])
+    assert sort_rows(rows, ranks["label"]).tolist() == [2, 4, 0, 1]
+    assert sort_rows(rows, ranks["code"], descending=True).tolist() == [
+        4,
+        1,
+        2,
+        0,
+    ]
+    # the positions of the page rows map the selection to the records
+    page_rows = rows[slice(*page_bounds(len(rows), page=2, page_size=3))]
+    assert page_rows.tolist() == [4]
+    assert page_bounds(0, page=1, page_size=3) == (0, 0)
+
+
+def test_sqlite_catalog(tmp_path):
+    """The SQLite catalog answers as the parquet artifacts and their indexes."""
+    shutil.copy(DIR2DATA / f"{AGRIPHYTO_DICO_NAME}.csv", tmp_path)
+    shutil.copytree(DIR2NOMENCLATURES, tmp_path / "nomenclatures")
+    write_app_artifacts(tmp_path)
+    write_sqlite_catalog(tmp_path)
+    parquet_catalog = Catalog(tmp_path, backend="parquet")
+    sqlite_catalog = Catalog(tmp_path, backend="sqlite")
+    pd.testing.assert_frame_equal(sqlite_catalog.dico, parquet_catalog.dico)
+    pd.testing.assert_frame_equal(
+        sqlite_catalog.nomenclatures, parquet_catalog.nomenclatures
+    )
+    for query in ["surf", "^coef", "agricole$", "s.*bio", "(ha", "ha", ""]:
+        assert np.array_equal(
+            sqlite_catalog.dico_search_index.search(query),
+            parquet_catalog.dico_search_index.search(query),
+        )
+        assert np.array_equal(
+            sqlite_catalog.nomenclature_search_index.search(query),
+            parquet_catalog.nomenclature_search_index.search(query),
+        )
+    lookup = ("BNS_2020", "bns_acoss_2020", "bns_acoss_2020__SX")
+    assert (
+        sqlite_catalog.modalities(*lookup)[COLNAME_CODE].tolist()
+        == parquet_catalog
+        .modalities(*lookup)[COLNAME_CODE]
+        .astype(str)
+        .tolist()
+    )
+    assert len(sqlite_catalog.modalities("BNS_2020", "unknown", "unknown")) == 0
+    with pytest.raises(ValueError, match="Unknown catalog backend"):
+        Catalog(tmp_path, backend="csv")
@@ -0,0 +1,331 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from agriphyto_schema.constants import DIR2SCHEMA, VALIDATION_CACHE_VERSION
+from agriphyto_schema.data.schema_registry import SchemaRegistry
+from agriphyto_schema.validation import result_cache
+from agriphyto_schema.validation.batch import (
+    match_schema,
+    path2failures,
+    validate_files,
+)
+from agriphyto_schema.validation.failure_sink import (
+    FailureSink,
+    read_failure_cases,
+)
+from agriphyto_schema.validation.nomenclature_checks import (
+    compile_schema,
+    nomenclature_check,
+    nomenclature_codes,
+)
+from agriphyto_schema.validation.parquet import validate_row_group
+from agriphyto_schema.validation.validate import (
+    list_schema_names,
+    load_schema,
+    validate_file,
+)
+
+VALID_VALUES = {
+    "bool": "True",
+    "datetime64[ns]": "2020-01-01",
+    "float64": "1.5",
+    "int64": "1",
+    "string[python]": "a",
+}
+
+
+def test_validate_file_by_chunks(tmp_path):
+    """Chunked validation reports the failures of the whole file, once."""
+    schema_name = "BTS_2021__post"
+    schema = load_schema(schema_name)
+    data = pd.DataFrame(
+        {
+            name: VALID_VALUES[str(column.dtype)]
+            for name, column in schema.columns.items()
+        },
+        index=range(10),
+    )
+    data.loc[[1, 8], "nbheur"] = "x"
+    # a missing column is reported once, not once per chunk
+    data = data.drop(columns="a6")
+    path2csv = tmp_path / "post.csv"
+    data.to_csv(path2csv, index=False)
+    data.to_parquet(tmp_path / "post.parquet")
+
+    def sorted_failure_cases(report):
+        return report.failure_cases.sort_values(
+            ["index", "check"], na_position="first", ignore_index=True
+        )
+
+    expected = validate_file(
+        schema_name, path2csv, chunksize=100, check_nomenclatures=False
+    )
+    assert expected.n_chunks == 1
+    assert not expected.is_valid
+    for path2data in [path2csv, tmp_path / "post.parquet"]:
+        report = validate_file(
+            schema_name, path2data, chunksize=3, check_nomenclatures=False
+        )
+        assert report.n_rows == 10
+        assert report.n_chunks == 4
+        pd.testing.assert_frame_equal(
+            sorted_failure_cases(report), sorted_failure_cases(expected)
+        )
+    failure_rows = expected.failure_cases["index"].dropna().astype(int)
+    assert sorted(set(failure_rows)) == [1, 8]
+
+
+def test_validate_files_in_pool(tmp_path):
+    """The files of a delivery are matched to their schema and validated."""
+    schema_names = list_schema_names()
+    assert (
+        match_schema(Path("pkleg13_fumo.csv"), schema_names)
+        == "PKLeg_2013__PKLEG13_FUMO"
+    )
+    with pytest.raises(ValueError, match="Expected one schema"):
+        match_schema(Path("post.csv"), schema_names, db_name="PKLeg_2013")
+
+    for table_name in ["PKLEG13_FUMO", "PKLEG13_MECENT"]:
+        schema = load_schema(f"PKLeg_2013__{table_name}")
+        pd.DataFrame(
+            {
+                name: VALID_VALUES[str(column.dtype)]
+                for name, column in schema.columns.items()
+            },
+            index=range(5),
+        ).to_csv(tmp_path / f"{table_name.lower()}.csv", index=False)
+    # a budget smaller than any file: the validations run one at a time
+    reports = validate_files(
+        [tmp_path],
+        db_name="PKLeg_2013",
+        jobs=2,
+        memory_budget_mb=0,
+        check_nomenclatures=False,
+        use_cache=False,
+    )
+    assert [report.schema_name for report in reports] == [
+        "PKLeg_2013__PKLEG13_FUMO",
+        "PKLeg_2013__PKLEG13_MECENT",
+    ]
+    assert all(report.is_valid and report.n_rows == 5 for report in reports)
+
+    # the failures of same-named files in different directories do not collide
+    root = Path("delivery")
+    assert {
+        path2failures(tmp_path, root / year / "ra.csv", root)
+        for year in ["2020", "2021"]
+    } == {
+        tmp_path / "2020" / "ra_failures.csv",
+        tmp_path / "2021" / "ra_failures.csv",
+    }
+
+
+def test_validate_parquet_by_row_groups(tmp_path):
+    """Row groups validated in parallel report the failures of the table."""
+    schema_name = "PKLeg_2013__PKLEG13_FUMO"
+    schema = load_schema(schema_name)
+    data = pd.DataFrame(
+        {
+            name: VALID_VALUES[str(column.dtype)]
+            for name, column in schema.columns.items()
+        },
+        index=range(10),
+    )
+    float_column = next(
+        name
+        for name, column in schema.columns.items()
+        if str(column.dtype) == "float64"
+    )
+    data.loc[[2, 7], float_column] = "x"
+    data["not_in_schema"] = 0
+    path2parquet = tmp_path / "fumo.parquet"
+    data.to_parquet(path2parquet, row_group_size=4)
+
+    path2failures = tmp_path / "failures.csv"
+    report = validate_file(
+        schema_name,
+        path2parquet,
+        jobs=2,
+        path2failures=path2failures,
+        check_nomenclatures=False,
+    )
+    assert report.n_rows == 10
+    assert report.n_chunks == 3
+    failure_cases = pd.read_csv(path2failures)
+    assert len(failure_cases) == report.n_failure_cases
+    assert "not_in_schema" in set(failure_cases["failure_case"])
+    failure_rows = failure_cases["index"].dropna().astype(int)
+    assert sorted(set(failure_rows)) == [2, 7]
+    # the part files of the workers are merged then removed
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "failures.csv",
+        "fumo.parquet",
+    ]
+
+    # a worker only sends back the counts and a bounded sample
+    data[float_column] = "x"
+    data.to_parquet(path2parquet, row_group_size=10)
+    columns = [column for column in data.columns if column in schema.columns]
+    n_rows, n_batches, sink, schema_failures = validate_row_group(
+        schema_name, path2parquet, 0, 0, columns, 3, False, None, 2
+    )
+    assert (n_rows, n_batches) == (10, 4)
+    assert sink.n_failure_cases == sum(sink.counts.values()) >= len(data)
+    assert len(sink.examples) == 2
+    assert schema_failures["index"].isna().all()
+
+    # the columns are reported from the footer of a file without row groups
+    arrow_schema = pa.Schema.from_pandas(
+        data.drop(columns=float_column), preserve_index=False
+    )
+    pq.ParquetWriter(path2parquet, arrow_schema).close()
+    assert pq.read_metadata(path2parquet).num_row_groups == 0
+    report = validate_file(schema_name, path2parquet, check_nomenclatures=False)
+    assert report.n_rows == 0
+    assert set(report.failure_cases["failure_case"]) == {
+        float_column,
+        "not_in_schema",
+    }
+
+
+def test_compile_schema_nomenclature_checks():
+    """The codes of the columns with a nomenclature are checked."""
+    schema_name = "BTS_2021__post"
+    schema = compile_schema(schema_name)
+    assert compile_schema(schema_name) is schema
+    codes = nomenclature_codes("BTS_2021")["post__a6"]
+    check = schema.columns["a6"].checks[-1]
+    series = pd.Series([codes[0], codes[-1], "not a code", None])
+    assert check(series).check_output.tolist() == [True, True, False]
+
+    # integer codes are checked with a lookup table
+    check = nomenclature_check("x", np.array(["01", "3", "NA"]), "int64")
+    assert check(pd.Series([1, 2, 3, -1])).check_output.tolist() == [
+        True,
+        False,
+        True,
+        False,
+    ]
+    check = nomenclature_check("x", np.array(["1", "3"]), "float64")
+    series = pd.Series([1.0, 1.5, 3.0, np.nan])
+    assert check(series).check_output.tolist() == [True, False, True]
+
+
+def test_descriptive_nomenclatures_not_checked(tmp_path):
+    """The nomenclatures describing their values do not reject them."""
+    schema_name = "BNS_2020__bns_acoss_2020"
+    schema = load_schema(schema_name)
+    # a single modality whose code is its label, a link to the official list
+    assert "bns_acoss_2020__DEPNAI" not in nomenclature_codes("BNS_2020")
+    assert "bns_acoss_2020__SX" in nomenclature_codes("BNS_2020")
+    data = pd.DataFrame(
+        {
+            name: VALID_VALUES[str(column.dtype)]
+            for name, column in schema.columns.items()
+        },
+        index=range(3),
+    )
+    data["DEPNAI"] = ["75", "13", "2A"]
+    data["SX"] = ["1", "2", "3"]
+    path2csv = tmp_path / "bns_acoss_2020.csv"
+    data.to_csv(path2csv, index=False)
+    report = validate_file(schema_name, path2csv)
+    failing_columns = set(report.failure_cases["column"].dropna())
+    assert "DEPNAI" not in failing_columns
+    assert "SX" in failing_columns
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".parquet", ".csv"])
+def test_failure_sink(tmp_path, suffix):
+    """The sink counts and writes all the failure cases but samples a few."""
+    path2failures = tmp_path / f"failures{suffix}"
+    sink = FailureSink(path2failures, n_examples=10)
+    for start in range(0, 100, 25):
+        sink.write(
+            pd.DataFrame({
+                "schema_context": "Column",
+                "column": ["a", "b"] * 12 + ["a"],
+                "check": "isin",
+                "check_number": 0,
+                "failure_case": "x",
+                "index": range(start, start + 25),
+            })
+        )
+    sink.close()
+
+    assert sink.n_failure_cases == 100
+    assert sink.counts == {("a", "isin"): 52, ("b", "isin"): 48}
+    examples = sink.examples
+    assert len(examples) == 10
+    assert examples["index"].is_unique
+    failure_cases = read_failure_cases(path2failures)
+    assert failure_cases["index"].tolist() == list(range(100))
+    assert set(examples["index"]) <= set(failure_cases["index"])
+
+
+def test_validation_cache(tmp_path, monkeypatch):
+    """Unchanged inputs reuse the cached report, a schema edit invalidates it."""
+    monkeypatch.setattr(
+        result_cache, "DIR2VALIDATION_CACHE", tmp_path / "cache"
+    )
+    schema_name = "PKLeg_2013__PKLEG13_FUMO"
+    schema = load_schema(schema_name)
+    path2csv = tmp_path / "fumo.csv"
+    pd.DataFrame(
+        {
+            name: VALID_VALUES[str(column.dtype)]
+            for name, column in schema.columns.items()
+        },
+        index=range(5),
+    ).to_csv(path2csv, index=False)
+
+    report = result_cache.validate_file_cached(schema_name, path2csv)
+    key = result_cache.report_key(schema_name, path2csv)
+    cached_report = result_cache.load_report(key)
+    assert cached_report is not None
+    assert cached_report.summary() == report.summary()
+    assert (
+        result_cache.validate_file_cached(schema_name, path2csv).summary()
+        == report.summary()
+    )
+
+    # editing a schema only changes the keys of its table
+    dir2schema = tmp_path / "schemas"
+    dir2schema.mkdir()
+    other_schema_name = "PKLeg_2013__PKLEG13_MECENT"
+    for name in [schema_name, other_schema_name]:
+        (dir2schema / f"{name}.json").write_bytes(
+            (DIR2SCHEMA / f"{name}.json").read_bytes()
+        )
+    monkeypatch.setattr(
+        result_cache, "schema_registry", SchemaRegistry(dir2schema)
+    )
+    keys = {
+        name: result_cache.report_key(name, path2csv)
+        for name in [schema_name, other_schema_name]
+    }
+    with open(dir2schema / f"{schema_name}.json", "a") as f:
+        f.write("\n")
+    assert result_cache.report_key(schema_name, path2csv) != keys[schema_name]
+    assert (
+        result_cache.report_key(other_schema_name, path2csv)
+        == keys[other_schema_name]
+    )
+
+    # a new version of the validation code invalidates all the reports
+    monkeypatch.setattr(
+        result_cache, "VALIDATION_CACHE_VERSION", VALIDATION_CACHE_VERSION + 1
+    )
+    assert (
+        result_cache.report_key(other_schema_name, path2csv)
+        != keys[other_schema_name]
+    )
+
+    # the least recently used reports are evicted beyond the size cap
+    result_cache.evict_reports(max_size_mb=0)
+    assert result_cache.load_report(key) is None